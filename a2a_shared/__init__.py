@@ -0,0 +1 @@
+"""Project-local helpers shared by the A2A agents (mounted at /app/a2a_shared)."""
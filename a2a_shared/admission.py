@@ -0,0 +1,425 @@
+import asyncio
+import concurrent.futures
+import heapq
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+
+from common.types import JSONRPCError, TaskSendParams
+from a2a_shared.deadline import Deadline, DeadlineExceeded
+from a2a_shared.tracing import record_span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_TRACKED_KEYS = 10000 # Idle rate-limit buckets beyond this are evicted (least recently used first)
+
+
+class RateLimitExceededError(JSONRPCError):
+    code: int = -32010
+    message: str = "Rate limit exceeded"
+    data: Any | None = None
+
+
+class ServerBusyError(JSONRPCError):
+    code: int = -32011
+    message: str = "Too many queued tasks for this client"
+    data: Any | None = None
+
+
+class QueueFullError(Exception):
+    """Raised by FairScheduler.slot when a tenant already has the maximum number of queued tasks."""
+
+
+class RateLimiter:
+    """Token buckets keyed by an arbitrary string (session id, client id).
+
+    Each key may spend `burst` requests at once and refills at `rate` requests per second.
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int = DEFAULT_MAX_TRACKED_KEYS):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict() # key -> (tokens, last refill time)
+
+    def acquire(self, key: str, now: Optional[float] = None) -> float:
+        """Takes one token for key. Returns 0 when allowed, otherwise the seconds until a token is available."""
+        now = time.monotonic() if now is None else now
+        tokens, last = self._buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        if tokens >= 1:
+            tokens -= 1
+            retry_after = 0.0
+        else:
+            retry_after = (1 - tokens) / self.rate
+        self._buckets[key] = (tokens, now) # Re-insert at the end: most recently used
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class _SlotHold:
+    """Work started under a slot that the event loop cannot cancel (e.g. a kickoff on an executor thread)."""
+
+    def __init__(self):
+        self.pending: List[concurrent.futures.Future] = []
+
+
+_current_hold: ContextVar[Optional[_SlotHold]] = ContextVar("a2a_admission_slot", default=None)
+
+
+def keep_slot_until(future: concurrent.futures.Future):
+    """Keeps the current admission slot taken until future is done, even if the slot's block exits first.
+
+    A deadline or a client disconnect ends the block, but not a thread already running the task's
+    work; the slot stays with that thread so the scheduler never starts more work than there are
+    free threads. Outside a slot (admission disabled, warm-up) this does nothing.
+    """
+    hold = _current_hold.get()
+    if hold is not None:
+        hold.pending.append(future)
+
+
+class _Lane:
+    """One scheduling lane: its own concurrency cap, fair queue and virtual clock."""
+
+    def __init__(self, name: str, max_concurrency: int):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.running = 0
+        self.heap: List[Tuple[float, int, str, asyncio.Future]] = []
+        self.virtual_time = 0.0
+        self.last_finish: Dict[str, float] = {}
+        # Metrics
+        self.started_total = 0
+        self.wait_seconds_sum = 0.0
+        self.wait_seconds_max = 0.0
+
+    def pop_cancelled(self):
+        while self.heap and self.heap[0][3].cancelled():
+            heapq.heappop(self.heap)
+
+    def queued(self) -> int:
+        return sum(1 for entry in self.heap if not entry[3].cancelled())
+
+
+class FairScheduler:
+    """Weighted fair queue with priority lanes in front of task execution.
+
+    At most `max_concurrency` tasks run at once, and at most the lane's cap within each lane.
+    Free slots go to the highest-priority lane (first in `lanes`) that has waiting work and
+    room under its cap, so interactive work jumps ahead of queued batch work; a lower cap on
+    the batch lane keeps slots in reserve for interactive tasks. Within a lane, waiting tasks
+    are ordered by virtual finish time (start-time fair queuing): each tenant's tasks are
+    spaced 1/weight apart, so a tenant's burst only gets its weighted share of the lane.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue_per_tenant: int, weights: Optional[Dict[str, float]] = None,
+                 default_weight: float = 1.0, lanes: Optional[Dict[str, int]] = None):
+        self.max_concurrency = max_concurrency
+        self.max_queue_per_tenant = max_queue_per_tenant
+        self.weights = weights or {}
+        self.default_weight = default_weight
+        # Lane name -> lane, in priority order (dicts keep insertion order)
+        self.lanes: Dict[str, _Lane] = {name: _Lane(name, cap) for name, cap in (lanes or {"default": max_concurrency}).items()}
+        self.running = 0
+        self._seq = itertools.count()
+        self._queued: Dict[str, int] = {}
+        self.rejected_total = 0
+        self.expired_total = 0 # Tasks whose deadline passed before they got a slot
+        self.orphaned = 0 # Slots kept past their block by work still running (keep_slot_until)
+        self.orphaned_total = 0
+
+    @property
+    def queued(self) -> int:
+        return sum(self._queued.values())
+
+    def reconfigure(self, other: "FairScheduler"):
+        """Takes over the limits, weights and lanes of other (built from a reloaded config).
+
+        Running tasks keep their slots; a lower cap only holds back new starts until enough of them
+        finish. Tasks queued in a lane that no longer exists move to the lowest-priority lane.
+        """
+        self.max_concurrency = other.max_concurrency
+        self.max_queue_per_tenant = other.max_queue_per_tenant
+        self.weights = other.weights
+        self.default_weight = other.default_weight
+        lanes = {}
+        for name, lane in other.lanes.items():
+            lanes[name] = self.lanes.get(name, lane)
+            lanes[name].max_concurrency = lane.max_concurrency
+        fallback = list(lanes.values())[-1]
+        for name, lane in self.lanes.items():
+            if name not in lanes:
+                for entry in lane.heap:
+                    heapq.heappush(fallback.heap, entry)
+                lane.heap = []
+        self.lanes = lanes
+        self._dispatch() # A higher cap frees slots for queued tasks right away
+
+    @asynccontextmanager
+    async def slot(self, tenant: str, lane: Optional[str] = None, deadline: Optional[Deadline] = None) -> AsyncIterator[None]:
+        """Holds one execution slot in the lane (default: lowest priority) for the duration of the block.
+
+        With a deadline, a task that is already past it is not queued, and a queued task leaves the
+        queue when it passes (both raise DeadlineExceeded), so no slot is spent on work nobody awaits.
+        Work registered with keep_slot_until keeps the slot taken until it is done.
+        """
+        lane_obj = self.lanes.get(lane) or list(self.lanes.values())[-1]
+        if deadline is None:
+            lane_obj = await self._acquire(tenant, lane_obj)
+        else:
+            try:
+                if deadline.expired():
+                    raise asyncio.TimeoutError()
+                lane_obj = await asyncio.wait_for(self._acquire(tenant, lane_obj), deadline.remaining())
+            except asyncio.TimeoutError:
+                self.expired_total += 1
+                raise DeadlineExceeded() from None
+        hold = _SlotHold()
+        token = _current_hold.set(hold)
+        try:
+            yield
+        finally:
+            try:
+                _current_hold.reset(token)
+            except ValueError:
+                pass # Generator resumed in another context; nothing to restore there
+            self._release_when_done(lane_obj, hold)
+
+    async def _acquire(self, tenant: str, lane: _Lane) -> _Lane:
+        """Waits for a slot; returns the lane that granted it (another one if a reload removed this lane)."""
+        if self._queued.get(tenant, 0) >= self.max_queue_per_tenant:
+            self.rejected_total += 1
+            raise QueueFullError(tenant)
+
+        weight = self.weights.get(tenant, self.default_weight)
+        finish = max(lane.virtual_time, lane.last_finish.get(tenant, 0.0)) + 1.0 / weight
+        lane.last_finish[tenant] = finish
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(lane.heap, (finish, next(self._seq), tenant, future))
+        self._queued[tenant] = self._queued.get(tenant, 0) + 1
+        enqueued_at = time.monotonic()
+        self._dispatch() # Grants the slot right away when one is free and nothing of higher priority is waiting
+        try:
+            lane = await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release(future.result()) # The slot was granted just as the waiter was cancelled
+            else:
+                self._dequeued(tenant) # Still in the heap; _dispatch skips cancelled futures
+            raise
+        waited = time.monotonic() - enqueued_at
+        lane.started_total += 1
+        lane.wait_seconds_sum += waited
+        lane.wait_seconds_max = max(lane.wait_seconds_max, waited)
+        return lane
+
+    def _release_when_done(self, lane: _Lane, hold: _SlotHold):
+        """Releases the slot now, or once the work still running under it (keep_slot_until) is done."""
+        pending = [future for future in hold.pending if not future.done()]
+        if not pending:
+            self._release(lane)
+            return
+        loop = asyncio.get_running_loop()
+        self.orphaned += 1
+        self.orphaned_total += 1
+
+        remaining = len(pending)
+
+        def finished(_):
+            nonlocal remaining
+            remaining -= 1
+            if remaining == 0:
+                self.orphaned -= 1
+                self._release(lane)
+
+        def on_done(future):
+            try:
+                loop.call_soon_threadsafe(finished, future) # Done callbacks run on the executor thread
+            except RuntimeError:
+                pass # The loop is closed (shutdown)
+
+        for future in pending:
+            future.add_done_callback(on_done)
+
+    def _release(self, lane: _Lane):
+        lane.running -= 1
+        self.running -= 1
+        self._dispatch()
+
+    def _dequeued(self, tenant: str):
+        remaining = self._queued.get(tenant, 0) - 1
+        if remaining > 0:
+            self._queued[tenant] = remaining
+        else:
+            self._queued.pop(tenant, None)
+
+    def _next_lane(self) -> Optional[_Lane]:
+        for lane in self.lanes.values():
+            lane.pop_cancelled()
+            if lane.heap and lane.running < lane.max_concurrency:
+                return lane
+        return None
+
+    def _dispatch(self):
+        while self.running < self.max_concurrency:
+            lane = self._next_lane()
+            if lane is None:
+                break
+            finish, _, tenant, future = heapq.heappop(lane.heap)
+            self._dequeued(tenant)
+            lane.virtual_time = finish
+            lane.running += 1
+            self.running += 1
+            future.set_result(lane)
+        for lane in self.lanes.values():
+            if not lane.heap and len(lane.last_finish) > DEFAULT_MAX_TRACKED_KEYS:
+                # Tenants whose last finish tag is behind the virtual clock would restart from it anyway
+                lane.last_finish = {t: f for t, f in lane.last_finish.items() if f > lane.virtual_time}
+
+
+class AdmissionController:
+    """Rate limits and fair scheduling for one agent, configured from the `admission` section of the agent YAML.
+
+    Session limits are keyed by the task's sessionId; client limits by `metadata.client_id`
+    (falling back to the sessionId). The same client key is the tenant of the fair queue.
+    The lane comes from `metadata.priority`, else from `skill_lanes[metadata.skill_id]`,
+    else `default_lane`.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.enabled = config.get("enabled", True)
+        self.session_limiter = self._limiter(config.get("session_rate"), config.get("session_burst"))
+        self.client_limiter = self._limiter(config.get("client_rate"), config.get("client_burst"))
+        self.scheduler = FairScheduler(
+            max_concurrency=config.get("max_concurrency", 4),
+            max_queue_per_tenant=config.get("max_queue_per_tenant", 16),
+            weights=config.get("weights"),
+            lanes=config.get("lanes") or {"interactive": config.get("max_concurrency", 4)},
+        )
+        self.default_lane = config.get("default_lane") or next(iter(self.scheduler.lanes))
+        self.skill_lanes: Dict[str, str] = config.get("skill_lanes") or {}
+        self.rate_limited_total = {"session": 0, "client": 0}
+        self.admitted_total = 0
+
+    @staticmethod
+    def _limiter(rate: Optional[float], burst: Optional[float]) -> Optional[RateLimiter]:
+        if not rate:
+            return None
+        return RateLimiter(rate=rate, burst=burst or rate)
+
+    @staticmethod
+    def _reconfigured_limiter(current: Optional[RateLimiter], new: Optional[RateLimiter]) -> Optional[RateLimiter]:
+        if current is None or new is None:
+            return new
+        current.rate, current.burst = new.rate, new.burst # Keeps the buckets: a reload does not refill them
+        return current
+
+    def reconfigure(self, other: "AdmissionController"):
+        """Takes over the settings of other (built from a reloaded config), keeping the token buckets,
+        queued and running tasks and counters."""
+        self.enabled = other.enabled
+        self.session_limiter = self._reconfigured_limiter(self.session_limiter, other.session_limiter)
+        self.client_limiter = self._reconfigured_limiter(self.client_limiter, other.client_limiter)
+        self.scheduler.reconfigure(other.scheduler)
+        self.default_lane = other.default_lane
+        self.skill_lanes = other.skill_lanes
+
+    @staticmethod
+    def client_key(params: TaskSendParams) -> str:
+        return str((params.metadata or {}).get("client_id") or params.sessionId)
+
+    def lane_for(self, params: TaskSendParams) -> str:
+        metadata = params.metadata or {}
+        priority = metadata.get("priority")
+        if priority in self.scheduler.lanes:
+            return priority
+        return self.skill_lanes.get(metadata.get("skill_id"), self.default_lane)
+
+    def check(self, params: TaskSendParams) -> Optional[JSONRPCError]:
+        """Applies the rate limits to a tasks/send(Subscribe) request; returns the error to send back, if any."""
+        if not self.enabled:
+            return None
+        for scope, limiter, key in (("session", self.session_limiter, params.sessionId), ("client", self.client_limiter, self.client_key(params))):
+            if limiter is None:
+                continue
+            retry_after = limiter.acquire(key)
+            if retry_after > 0:
+                self.rate_limited_total[scope] += 1
+                logger.info(f"Rate limited {scope} {key} (retry after {retry_after:.2f}s)")
+                return RateLimitExceededError(data={"scope": scope, "retry_after": round(retry_after, 3)})
+        self.admitted_total += 1
+        return None
+
+    @asynccontextmanager
+    async def slot(self, params: TaskSendParams, deadline: Optional[Deadline] = None) -> AsyncIterator[None]:
+        """Execution slot for the task (raises QueueFullError if its client has too many queued tasks,
+        DeadlineExceeded if the deadline passes before a slot is free)."""
+        if not self.enabled:
+            yield
+            return
+        tenant, lane = self.client_key(params), self.lane_for(params)
+        enqueued_ns = time.time_ns()
+        async with self.scheduler.slot(tenant, lane, deadline):
+            record_span("admission.queue_wait", enqueued_ns, time.time_ns(), {"admission.tenant": tenant, "admission.lane": lane})
+            yield
+
+    def metrics_text(self) -> str:
+        """Renders the counters in the Prometheus text exposition format."""
+        s = self.scheduler
+        lines = [
+            "# TYPE a2a_admission_admitted_total counter",
+            f"a2a_admission_admitted_total {self.admitted_total}",
+            "# TYPE a2a_admission_rate_limited_total counter",
+        ]
+        lines += [f'a2a_admission_rate_limited_total{{scope="{scope}"}} {count}' for scope, count in self.rate_limited_total.items()]
+        lines += [
+            "# TYPE a2a_scheduler_rejected_total counter",
+            f"a2a_scheduler_rejected_total {s.rejected_total}",
+            "# TYPE a2a_scheduler_expired_total counter",
+            f"a2a_scheduler_expired_total {s.expired_total}",
+            "# TYPE a2a_scheduler_running gauge",
+            f"a2a_scheduler_running {s.running}",
+            "# TYPE a2a_scheduler_orphaned gauge",
+            f"a2a_scheduler_orphaned {s.orphaned}",
+            "# TYPE a2a_scheduler_orphaned_total counter",
+            f"a2a_scheduler_orphaned_total {s.orphaned_total}",
+            "# TYPE a2a_scheduler_max_concurrency gauge",
+            f"a2a_scheduler_max_concurrency {s.max_concurrency}",
+        ]
+        lanes = s.lanes.values()
+        lines.append("# TYPE a2a_scheduler_lane_running gauge")
+        lines += [f'a2a_scheduler_lane_running{{lane="{lane.name}"}} {lane.running}' for lane in lanes]
+        lines.append("# TYPE a2a_scheduler_lane_max_concurrency gauge")
+        lines += [f'a2a_scheduler_lane_max_concurrency{{lane="{lane.name}"}} {lane.max_concurrency}' for lane in lanes]
+        lines.append("# TYPE a2a_scheduler_lane_queued gauge")
+        lines += [f'a2a_scheduler_lane_queued{{lane="{lane.name}"}} {lane.queued()}' for lane in lanes]
+        lines.append("# TYPE a2a_scheduler_queue_wait_seconds summary")
+        for lane in lanes:
+            lines.append(f'a2a_scheduler_queue_wait_seconds_sum{{lane="{lane.name}"}} {lane.wait_seconds_sum:.6f}')
+            lines.append(f'a2a_scheduler_queue_wait_seconds_count{{lane="{lane.name}"}} {lane.started_total}')
+        lines.append("# TYPE a2a_scheduler_queue_wait_seconds_max gauge")
+        lines += [f'a2a_scheduler_queue_wait_seconds_max{{lane="{lane.name}"}} {lane.wait_seconds_max:.6f}' for lane in lanes]
+        lines.append("# TYPE a2a_admission_tracked_keys gauge")
+        for scope, limiter in (("session", self.session_limiter), ("client", self.client_limiter)):
+            lines.append(f'a2a_admission_tracked_keys{{scope="{scope}"}} {len(limiter) if limiter else 0}')
+        return "\n".join(lines) + "\n"
+
+    async def metrics_endpoint(self, request: Request) -> PlainTextResponse:
+        """GET /metrics"""
+        return PlainTextResponse(self.metrics_text(), media_type="text/plain; version=0.0.4")
+
+    def add_routes(self, app):
+        app.add_route("/metrics", self.metrics_endpoint, methods=["GET"])
@@ -0,0 +1,40 @@
+from typing import Iterator, Optional
+from common.types import Artifact, TextPart
+
+DEFAULT_CHUNK_SIZE = 4096 # Characters per streamed artifact chunk
+
+
+class ArtifactChunker:
+    """Builds successive chunks of one artifact using A2A append/lastChunk semantics.
+
+    The first chunk replaces any artifact at the same index (append=False);
+    later chunks are appended to it on the client side (append=True).
+    """
+
+    def __init__(self, name: str, index: int = 0, description: Optional[str] = None):
+        self.name = name
+        self.index = index
+        self.description = description
+        self._started = False
+
+    def chunk(self, text: str, last: bool = False) -> Artifact:
+        artifact = Artifact(
+            name=self.name,
+            description=None if self._started else self.description,
+            parts=[TextPart(text=text)],
+            index=self.index,
+            append=self._started,
+            lastChunk=last,
+        )
+        self._started = True
+        return artifact
+
+
+def iter_artifact_chunks(text: str, name: str, index: int = 0, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Artifact]:
+    """Splits text into artifact chunks of at most chunk_size characters."""
+    chunker = ArtifactChunker(name=name, index=index)
+    if not text:
+        yield chunker.chunk("", last=True)
+        return
+    for start in range(0, len(text), chunk_size):
+        yield chunker.chunk(text[start:start + chunk_size], last=start + chunk_size >= len(text))
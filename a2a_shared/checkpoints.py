@@ -0,0 +1,198 @@
+import dataclasses
+import logging
+import sys
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from pydantic import BaseModel
+
+from common.types import Message
+
+logger = logging.getLogger(__name__)
+
+# Agents ask for input by answering with this prefix; the task then waits in input-required for the reply
+QUESTION_PREFIX = "QUESTION:"
+CLARIFY_INSTRUCTION = f"If you cannot complete this without more information from the user, reply only with '{QUESTION_PREFIX} <your question>'."
+
+DEFAULT_MAX_PARKED = 1000
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_TTL_SECONDS = 30 * 60
+
+
+def parse_question(text: Optional[str]) -> Optional[str]:
+    """The question of an answer that asks the user for input, else None."""
+    text = (text or "").strip()
+    if not text.startswith(QUESTION_PREFIX):
+        return None
+    return text[len(QUESTION_PREFIX):].strip() or "The agent needs more information."
+
+
+class InputRequired(Exception):
+    """Raised by task execution that cannot go on without an answer from the user.
+
+    checkpoint holds what the agent needs to resume the run from where it stopped.
+    """
+
+    def __init__(self, question: str, checkpoint: Any = None):
+        super().__init__(question)
+        self.question = question
+        self.checkpoint = checkpoint
+
+
+def approximate_size(value: Any) -> int:
+    """Rough memory footprint of a checkpoint in bytes: the text it holds plus a small per-object overhead."""
+    if isinstance(value, (str, bytes, bytearray)):
+        return len(value)
+    if isinstance(value, dict):
+        return 64 + sum(approximate_size(key) + approximate_size(item) for key, item in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return 56 + sum(approximate_size(item) for item in value)
+    if isinstance(value, BaseModel):
+        return approximate_size(value.__dict__)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return approximate_size(vars(value))
+    return sys.getsizeof(value)
+
+
+class ParkedTask:
+    """A task waiting in input-required: its checkpoint and the messages exchanged so far."""
+
+    def __init__(self, task_id: str, session_id: Optional[str], checkpoint: Any, history: List[Message]):
+        self.task_id = task_id
+        self.session_id = session_id
+        self.checkpoint = checkpoint
+        self.history = history
+        self.size_bytes = approximate_size(checkpoint) + approximate_size(history)
+        self.parked_at = time.monotonic()
+
+
+class CheckpointStore:
+    """Bounded in-memory store of tasks parked in input-required (the `parked_tasks` config section).
+
+    When a run stops to ask the user a question, the agent parks the task with its checkpoint;
+    the reply (tasks/send with the same task id and sessionId) takes it back out and resumes the
+    run from the checkpoint instead of starting over. Parked tasks are dropped after ttl_seconds
+    and, oldest first, beyond max_tasks or max_bytes of checkpoints; on_expire(task_id, reason)
+    is called for each so the agent can cancel the task. Eviction runs whenever a task is parked
+    or taken. A resumed run takes its task through resuming(), which puts it back if the run fails.
+    """
+
+    def __init__(self, enabled: bool = True, max_tasks: int = DEFAULT_MAX_PARKED, max_bytes: int = DEFAULT_MAX_BYTES,
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS, on_expire: Optional[Callable[[str, str], None]] = None):
+        self.enabled = enabled
+        self.max_tasks = max_tasks
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.on_expire = on_expire
+        self.size_bytes = 0
+        self._parked: "OrderedDict[str, ParkedTask]" = OrderedDict() # Oldest first
+        # Metrics
+        self.parked_total = 0
+        self.resumed_total = 0
+        self.expired_total = 0
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]], on_expire: Optional[Callable[[str, str], None]] = None) -> "CheckpointStore":
+        config = config or {}
+        return cls(
+            enabled=config.get("enabled", True),
+            max_tasks=config.get("max_tasks", DEFAULT_MAX_PARKED),
+            max_bytes=config.get("max_bytes", DEFAULT_MAX_BYTES),
+            ttl_seconds=config.get("ttl_seconds", DEFAULT_TTL_SECONDS),
+            on_expire=on_expire,
+        )
+
+    def reconfigure(self, other: "CheckpointStore"):
+        """Takes over the bounds of other (built from a reloaded config); tighter bounds evict right away."""
+        self.enabled = other.enabled
+        self.max_tasks = other.max_tasks
+        self.max_bytes = other.max_bytes
+        self.ttl_seconds = other.ttl_seconds
+        self._evict()
+
+    def park(self, task_id: str, session_id: Optional[str], checkpoint: Any, history: List[Message]) -> bool:
+        """Parks a task with the checkpoint to resume it from; False when parking is disabled or the checkpoint alone exceeds max_bytes."""
+        self.discard(task_id)
+        if not self.enabled:
+            return False
+        parked = ParkedTask(task_id, session_id, checkpoint, history)
+        if parked.size_bytes > self.max_bytes:
+            logger.warning(f"Not parking task {task_id}: its checkpoint ({parked.size_bytes} bytes) exceeds max_bytes")
+            return False
+        self._parked[task_id] = parked
+        self.size_bytes += parked.size_bytes
+        self.parked_total += 1
+        self._evict()
+        return task_id in self._parked
+
+    def get(self, task_id: str) -> Optional[ParkedTask]:
+        """The parked task, left in the store."""
+        self._evict()
+        return self._parked.get(task_id)
+
+    def take(self, task_id: str, session_id: Optional[str]) -> Optional[ParkedTask]:
+        """Removes and returns the parked task to resume it; None if it is not parked (or under another session)."""
+        self._evict()
+        parked = self._parked.get(task_id)
+        if parked is None or parked.session_id != session_id:
+            return None
+        self._remove(task_id)
+        self.resumed_total += 1
+        return parked
+
+    def restore(self, parked: ParkedTask):
+        """Puts back a taken task whose resumed run failed, so the reply can be sent again; its TTL starts over."""
+        self.discard(parked.task_id)
+        parked.parked_at = time.monotonic()
+        self._parked[parked.task_id] = parked
+        self.size_bytes += parked.size_bytes
+        self._evict()
+
+    @contextmanager
+    def resuming(self, task_id: str, session_id: Optional[str]) -> Iterator[Optional[ParkedTask]]:
+        """Takes the parked task (None if there is none) for a run resuming it in this block.
+
+        If the block fails with anything but InputRequired (which parks the task anew), the task
+        is restored: a deadline, a full queue, an error or a dropped connection does not lose the
+        user's reply, which can simply be sent again.
+        """
+        parked = self.take(task_id, session_id)
+        try:
+            yield parked
+        except InputRequired:
+            raise
+        except BaseException:
+            if parked is not None:
+                self.restore(parked)
+            raise
+
+    def discard(self, task_id: str) -> bool:
+        """Drops a parked task without resuming it (e.g. tasks/cancel); False if it was not parked."""
+        return self._remove(task_id) is not None
+
+    def _remove(self, task_id: str) -> Optional[ParkedTask]:
+        parked = self._parked.pop(task_id, None)
+        if parked is not None:
+            self.size_bytes -= parked.size_bytes
+        return parked
+
+    def _evict(self):
+        now = time.monotonic()
+        while self._parked:
+            task_id, oldest = next(iter(self._parked.items()))
+            if now - oldest.parked_at > self.ttl_seconds:
+                reason = "No reply to the agent's question in time."
+            elif len(self._parked) > self.max_tasks or self.size_bytes > self.max_bytes:
+                reason = "Too many tasks are waiting for input."
+            else:
+                break
+            self._remove(task_id)
+            self.expired_total += 1
+            logger.info(f"Dropped parked task {task_id}: {reason}")
+            if self.on_expire is not None:
+                self.on_expire(task_id, reason)
+
+    def __len__(self) -> int:
+        return len(self._parked)
@@ -0,0 +1,197 @@
+import json
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Optional
+
+import httpx
+from httpx_sse import SSEError, aconnect_sse
+from pydantic import ValidationError
+
+from common.client.client import A2AClient
+from common.types import (
+    AgentCard, A2AClientHTTPError, A2AClientJSONError, JSONRPCRequest,
+    SendTaskRequest, SendTaskResponse, GetTaskRequest, GetTaskResponse,
+    SendTaskStreamingRequest, SendTaskStreamingResponse,
+)
+from a2a_shared.deadline import TIMEOUT_HEADER, DeadlineExceeded, current_deadline, inject_metadata as inject_deadline
+from a2a_shared.pool import Replica, ReplicaPool
+from a2a_shared.tracing import TRACEPARENT, current_traceparent, inject_metadata, start_span
+
+
+class FastA2AClient(A2AClient):
+    """A2AClient with a faster JSON path.
+
+    - Requests are serialized by pydantic-core (model_dump_json) instead of model_dump + json.dumps.
+    - send_task/get_task responses are validated straight from the response bytes.
+    - An httpx.AsyncClient can be shared across calls to reuse connections, including by
+      send_task_streaming (the stock one reads SSE with a blocking httpx.Client per call).
+
+    Each call is traced as an "a2a.client <method>" span whose context is sent in the
+    traceparent header and in params.metadata. Inside a deadline_scope, the remaining budget is
+    sent as the a2a-timeout-ms header and params.metadata.timeout_ms, and caps the HTTP timeout;
+    a call whose deadline has already passed is not sent (DeadlineExceeded).
+    """
+
+    def __init__(self, agent_card: AgentCard = None, url: str = None, http_client: Optional[httpx.AsyncClient] = None, timeout: float = 30):
+        super().__init__(agent_card=agent_card, url=url)
+        self.http_client = http_client
+        self.timeout = timeout
+
+    @asynccontextmanager
+    async def _client(self) -> AsyncIterator[httpx.AsyncClient]:
+        if self.http_client is not None:
+            yield self.http_client
+        else:
+            async with httpx.AsyncClient() as client:
+                yield client
+
+    def _prepare_headers(self, request: JSONRPCRequest) -> Dict[str, str]:
+        """Headers for the request; adds the trace context and the remaining deadline to headers and params.metadata."""
+        headers = {"Content-Type": "application/json"}
+        traceparent = current_traceparent()
+        if traceparent is not None:
+            headers[TRACEPARENT] = traceparent
+            if hasattr(request.params, "metadata"):
+                request.params.metadata = inject_metadata(request.params.metadata)
+        deadline = current_deadline()
+        if deadline is not None:
+            deadline.check()
+            headers[TIMEOUT_HEADER] = str(int(deadline.remaining() * 1000))
+            if hasattr(request.params, "metadata"):
+                request.params.metadata = inject_deadline(request.params.metadata)
+        return headers
+
+    async def _post(self, request: JSONRPCRequest, url: Optional[str] = None) -> bytes:
+        """POSTs the JSON-RPC request (to url, default self.url) and returns the raw response body."""
+        url = url or self.url
+        with start_span(f"a2a.client {request.method}", {"rpc.method": request.method, "server.url": url}) as span:
+            headers = self._prepare_headers(request)
+            deadline = current_deadline()
+            timeout = min(self.timeout, deadline.remaining()) if deadline is not None else self.timeout
+            content = request.model_dump_json()
+            try:
+                async with self._client() as client:
+                    response = await client.post(url, content=content, headers=headers, timeout=timeout)
+                response.raise_for_status()
+            except httpx.HTTPStatusError as e:
+                raise A2AClientHTTPError(e.response.status_code, str(e)) from e
+            except httpx.TimeoutException as e:
+                if deadline is not None and deadline.expired():
+                    raise DeadlineExceeded() from e # The caller's budget ran out; not the replica's fault
+                raise
+            if span is not None:
+                span.set_attribute("http.status_code", response.status_code)
+                span.set_attribute("http.response_content_length", len(response.content))
+            return response.content
+
+    async def _send_request(self, request: JSONRPCRequest) -> dict[str, Any]:
+        try:
+            return json.loads(await self._post(request))
+        except json.JSONDecodeError as e:
+            raise A2AClientJSONError(str(e)) from e
+
+    async def _send_typed(self, request: JSONRPCRequest, response_type):
+        body = await self._post(request)
+        try:
+            return response_type.model_validate_json(body)
+        except ValidationError as e:
+            if any(err["type"] == "json_invalid" for err in e.errors()):
+                raise A2AClientJSONError(str(e)) from e
+            raise
+
+    async def send_task(self, payload: dict[str, Any]) -> SendTaskResponse:
+        return await self._send_typed(SendTaskRequest(params=payload), SendTaskResponse)
+
+    async def get_task(self, payload: dict[str, Any]) -> GetTaskResponse:
+        return await self._send_typed(GetTaskRequest(params=payload), GetTaskResponse)
+
+    async def send_task_streaming(self, payload: dict[str, Any]) -> AsyncIterable[SendTaskStreamingResponse]:
+        """tasks/sendSubscribe over the async client; errors are raised as by A2AClient.
+
+        A failed connect raises the httpx error itself (nothing was sent); transport and SSE errors
+        (e.g. a non-SSE response) while streaming are wrapped in A2AClientHTTPError, with the
+        response's status code when it is an HTTP error status and 400 otherwise.
+        """
+        async for response in self._stream(SendTaskStreamingRequest(params=payload)):
+            yield response
+
+    async def _stream(self, request: SendTaskStreamingRequest, url: Optional[str] = None) -> AsyncIterable[SendTaskStreamingResponse]:
+        """Sends the streaming request (to url, default self.url) and yields its events."""
+        headers = self._prepare_headers(request)
+        async with self._client() as client:
+            async with aconnect_sse(client, "POST", url or self.url, content=request.model_dump_json(), headers=headers, timeout=None) as event_source:
+                try:
+                    async for sse in event_source.aiter_sse():
+                        yield SendTaskStreamingResponse.model_validate_json(sse.data)
+                except ValidationError as e:
+                    if any(err["type"] == "json_invalid" for err in e.errors()):
+                        raise A2AClientJSONError(str(e)) from e
+                    raise
+                except httpx.RequestError as e:
+                    status_code = event_source.response.status_code
+                    raise A2AClientHTTPError(status_code if status_code >= 400 else 400, str(e)) from e
+
+
+def affinity_keys(params: Any) -> List[str]:
+    """Replica affinity keys of a request: its sessionId (conversation state) and its task id (task store)."""
+    keys = []
+    session_id = getattr(params, "sessionId", None)
+    if session_id:
+        keys.append(f"session:{session_id}")
+    task_id = getattr(params, "id", None)
+    if task_id:
+        keys.append(f"task:{task_id}")
+    return keys
+
+
+class PooledA2AClient(FastA2AClient):
+    """FastA2AClient that spreads requests over the replicas of a ReplicaPool.
+
+    Each request, streaming ones included, goes to the replica its sessionId / task id is
+    bound to, else to the replica chosen by the pool's balancing; failures feed the pool's
+    ejection. A request that could not connect (nothing was sent) is retried on the other replicas.
+    """
+
+    def __init__(self, pool: ReplicaPool, http_client: Optional[httpx.AsyncClient] = None, timeout: float = 30):
+        super().__init__(url=pool.urls[0], http_client=http_client, timeout=timeout)
+        self.pool = pool
+
+    async def _post(self, request: JSONRPCRequest, url: Optional[str] = None) -> bytes:
+        if url is not None:
+            return await super()._post(request, url)
+        keys = affinity_keys(request.params)
+        failed: List[Replica] = []
+        while True:
+            replica = None
+            try:
+                async with self.pool.acquire(keys, exclude=failed) as replica:
+                    return await super()._post(request, replica.url)
+            except httpx.ConnectError:
+                failed.append(replica)
+                if len(failed) >= len(self.pool.replicas):
+                    raise
+
+    async def send_task_streaming(self, payload: dict[str, Any]) -> AsyncIterable[SendTaskStreamingResponse]:
+        """tasks/sendSubscribe on a pooled replica; the stream counts as an outstanding request until it ends.
+
+        A connection lost mid-stream counts as a failure of the replica (not retried: events were
+        already delivered); a non-SSE response with a 5xx status does as well.
+        """
+        request = SendTaskStreamingRequest(params=payload)
+        keys = affinity_keys(request.params)
+        failed: List[Replica] = []
+        while True:
+            replica = None
+            try:
+                async with self.pool.acquire(keys, exclude=failed) as replica:
+                    try:
+                        async for response in self._stream(request, replica.url):
+                            yield response
+                    except A2AClientHTTPError as e:
+                        if isinstance(e.__cause__, httpx.TransportError) and not isinstance(e.__cause__, SSEError):
+                            self.pool.record_failure(replica)
+                        raise
+                return
+            except httpx.ConnectError:
+                failed.append(replica)
+                if len(failed) >= len(self.pool.replicas):
+                    raise
@@ -0,0 +1,147 @@
+import zlib
+from typing import Any, Dict, List, Optional
+
+try:
+    import zstandard
+except ImportError: # zstd is optional; gzip is always available
+    zstandard = None
+
+DEFAULT_MINIMUM_SIZE = 1024
+COMPRESSIBLE_TYPES = ("application/json", "text/event-stream", "text/plain")
+
+
+class _GzipStream:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes, flush: bool) -> bytes:
+        # Z_SYNC_FLUSH emits everything so far without ending the stream, so each SSE event is decodable on arrival
+        return self._compressor.compress(data) + (self._compressor.flush(zlib.Z_SYNC_FLUSH) if flush else b"")
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _ZstdStream:
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes, flush: bool) -> bytes:
+        return self._compressor.compress(data) + (self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK) if flush else b"")
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+def _accepted_encodings(headers: List) -> Dict[str, float]:
+    """Parses Accept-Encoding into {coding: q}."""
+    value = ",".join(v.decode("latin-1") for k, v in headers if k.lower() == b"accept-encoding")
+    accepted = {}
+    for item in value.split(","):
+        coding, _, params = item.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+class CompressionMiddleware:
+    """ASGI middleware that compresses responses with the best encoding the client accepts (zstd, then gzip).
+
+    - Complete responses (JSON-RPC results, tasks/get with long histories) are compressed when
+      at least minimum_size bytes.
+    - text/event-stream responses are compressed as one stream, flushed after every event, so
+      events arrive without delay while later events reuse the dictionary of earlier ones
+      (the repeated JSON-RPC envelope compresses to a few bytes).
+    Only JSON, SSE and plain-text bodies are touched; file downloads and already-encoded
+    responses pass through.
+    """
+
+    def __init__(self, app, minimum_size: int = DEFAULT_MINIMUM_SIZE, gzip_level: int = 6, zstd_level: int = 3, sse: bool = True):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.zstd_level = zstd_level
+        self.sse = sse
+
+    def _choose(self, scope) -> Optional[str]:
+        accepted = _accepted_encodings(scope.get("headers", []))
+        if zstandard is not None and accepted.get("zstd", 0) > 0:
+            return "zstd"
+        if accepted.get("gzip", 0) > 0:
+            return "gzip"
+        return None
+
+    def _stream(self, encoding: str):
+        return _ZstdStream(self.zstd_level) if encoding == "zstd" else _GzipStream(self.gzip_level)
+
+    async def __call__(self, scope, receive, send):
+        encoding = self._choose(scope) if scope["type"] == "http" else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Dict[str, Any]] = None
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message # Held back until the first body chunk decides whether to compress
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                headers = {k.lower(): v for k, v in start_message["headers"]}
+                content_type = headers.get(b"content-type", b"").decode("latin-1").split(";")[0].strip()
+                is_sse = content_type == "text/event-stream"
+                if (b"content-encoding" in headers or content_type not in COMPRESSIBLE_TYPES
+                        or (is_sse and not self.sse)
+                        or (not more_body and len(body) < self.minimum_size)
+                        or (more_body and not is_sse)):
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                compressor = self._stream(encoding)
+                start_message["headers"] = [(k, v) for k, v in start_message["headers"] if k.lower() != b"content-length"] + [
+                    (b"content-encoding", encoding.encode()), (b"vary", b"Accept-Encoding")]
+                if not more_body:
+                    compressed = compressor.compress(body, flush=False) + compressor.finish()
+                    start_message["headers"].append((b"content-length", str(len(compressed)).encode()))
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+                await send(start_message)
+
+            chunk = compressor.compress(body, flush=True)
+            if not more_body:
+                chunk += compressor.finish()
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+def add_compression(app, config: Optional[Dict[str, Any]]):
+    """Installs CompressionMiddleware on a Starlette app from the `compression` config section."""
+    config = config or {}
+    if not config.get("enabled", True):
+        return
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=config.get("minimum_size", DEFAULT_MINIMUM_SIZE),
+        gzip_level=config.get("gzip_level", 6),
+        zstd_level=config.get("zstd_level", 3),
+        sse=config.get("sse", True),
+    )
@@ -0,0 +1,121 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, TypeVar
+
+from common.types import JSONRPCError
+
+T = TypeVar("T")
+
+# The remaining time budget travels as a relative timeout (like gRPC's grpc-timeout), so hosts need
+# no synchronized clocks; each hop turns it into a local deadline and forwards what is left of it.
+TIMEOUT_HEADER = "a2a-timeout-ms"
+TIMEOUT_METADATA = "timeout_ms"
+
+
+class DeadlineExceededError(JSONRPCError):
+    code: int = -32012
+    message: str = "Deadline exceeded"
+    data: Any | None = None
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request's deadline passes while it is queued or running."""
+
+
+def _parse_timeout_ms(value: Any) -> Optional[float]:
+    try:
+        timeout_ms = float(value)
+    except (TypeError, ValueError):
+        return None
+    return timeout_ms if timeout_ms == timeout_ms else None # Drops NaN
+
+
+class Deadline:
+    """A point in time (time.monotonic) after which the caller no longer waits for the result."""
+
+    __slots__ = ("expires_at",)
+
+    def __init__(self, expires_at: float):
+        self.expires_at = expires_at
+
+    @classmethod
+    def after(cls, seconds: float) -> "Deadline":
+        return cls(time.monotonic() + seconds)
+
+    @classmethod
+    def from_metadata(cls, metadata: Optional[Dict[str, Any]]) -> Optional["Deadline"]:
+        """The deadline of a request from its metadata.timeout_ms (None when the caller set none)."""
+        timeout_ms = _parse_timeout_ms((metadata or {}).get(TIMEOUT_METADATA))
+        return cls.after(timeout_ms / 1000) if timeout_ms is not None else None
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def check(self):
+        if self.expired():
+            raise DeadlineExceeded()
+
+
+def merge_timeout_header(metadata: Optional[Dict[str, Any]], header_value: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Folds an a2a-timeout-ms header into params.metadata (the tighter of the two wins)."""
+    header_ms = _parse_timeout_ms(header_value)
+    if header_ms is None:
+        return metadata
+    metadata_ms = _parse_timeout_ms((metadata or {}).get(TIMEOUT_METADATA))
+    return {**(metadata or {}), TIMEOUT_METADATA: header_ms if metadata_ms is None else min(header_ms, metadata_ms)}
+
+
+_current: ContextVar[Optional[Deadline]] = ContextVar("a2a_deadline", default=None)
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]) -> Iterator[Optional[Deadline]]:
+    """Makes deadline the current one for the block, so peer calls made from it forward the remaining budget."""
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        try:
+            _current.reset(token)
+        except ValueError:
+            pass # Generator resumed in another context; nothing to restore there
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+
+def inject_metadata(metadata: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Returns metadata with timeout_ms set to what is left of the current deadline (unchanged without one)."""
+    deadline = _current.get()
+    if deadline is None:
+        return metadata
+    return {**(metadata or {}), TIMEOUT_METADATA: max(int(deadline.remaining() * 1000), 0)}
+
+
+async def run_within(deadline: Optional[Deadline], awaitable: Awaitable[T]) -> T:
+    """Awaits awaitable, cancelling it and raising DeadlineExceeded once the deadline passes."""
+    if deadline is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, max(deadline.remaining(), 0))
+    except asyncio.TimeoutError as e:
+        raise DeadlineExceeded() from e
+
+
+def deadline_guard(deadline: Optional[Deadline], callback: Optional[Callable] = None) -> Optional[Callable]:
+    """Wraps a callback invoked by work running on another thread (e.g. a crew's step/task callback)
+    so that it raises DeadlineExceeded there once the deadline has passed, aborting the work."""
+    if deadline is None:
+        return callback
+
+    def guarded(*args, **kwargs):
+        deadline.check()
+        if callback is not None:
+            return callback(*args, **kwargs)
+    return guarded
@@ -0,0 +1,337 @@
+import asyncio
+import base64
+import binascii
+import hmac
+import logging
+import mmap
+import os
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterable, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+import httpx
+from starlette.requests import Request
+from starlette.responses import FileResponse, JSONResponse
+
+from common.types import FilePart, Message, TextPart
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SPOOL_DIR = os.environ.get("A2A_FILE_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "a2a_file_spool"))
+SPOOL_TTL_SECONDS = 60 * 60 # Uploaded files older than this are removed
+SWEEP_INTERVAL_SECONDS = 5 * 60
+MAX_UPLOAD_BYTES = 512 * 1024 * 1024
+MAX_SPOOL_BYTES = 4 * 1024 * 1024 * 1024 # All spooled files together
+BASE64_DECODE_CHUNK = 64 * 1024 # Must be a multiple of 4
+TEXT_PREVIEW_BYTES = 16 * 1024 # Bytes of a text file passed on to the agent as input text
+TEXT_MIME_TYPES = ("application/json", "application/xml", "application/x-yaml")
+
+
+@dataclass
+class SpooledFile:
+    """A file received by the agent and kept on local disk."""
+    file_id: str
+    path: Path
+    name: Optional[str]
+    mime_type: Optional[str]
+    size: int
+    transient: bool = True # Inline/remote content only needed for one task; uploads are kept until the TTL
+
+    @contextmanager
+    def mmap(self) -> Iterator[mmap.mmap]:
+        """Maps the file read-only so it can be read without loading it into memory."""
+        if self.size == 0:
+            yield b"" # mmap cannot map empty files
+            return
+        with open(self.path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                yield mm
+            finally:
+                mm.close()
+
+    def is_text(self) -> bool:
+        mime_type = self.mime_type or ""
+        return mime_type.startswith("text/") or mime_type in TEXT_MIME_TYPES
+
+    def describe(self, preview_bytes: int = TEXT_PREVIEW_BYTES) -> str:
+        """Builds a short textual description of the file, including a preview for text files."""
+        header = f"[File: {self.name or self.file_id} ({self.mime_type or 'unknown type'}, {self.size} bytes)]"
+        if not self.is_text():
+            return header
+        with self.mmap() as mm:
+            preview = mm[:preview_bytes].decode("utf-8", errors="replace")
+        suffix = "\n[...truncated]" if self.size > preview_bytes else ""
+        return f"{header}\n{preview}{suffix}"
+
+
+class SpoolFullError(ValueError):
+    """The spooled files together would exceed the spool's max_total_bytes."""
+
+
+class FileSpool:
+    """Spools incoming file content (uploads, inline base64, remote URIs) to disk.
+
+    URI-referenced files are resolved only when they are this agent's own uploads or live on a
+    host in allowed_hosts: fetching arbitrary URIs would let clients make the agent read internal
+    services (SSRF). Uploads need upload_token when one is set, and are bounded per file
+    (max_bytes) and in total (max_total_bytes); files older than ttl_seconds are swept, except
+    while a task holds them (from resolve() until release()). Taking a file refreshes its mtime,
+    so the TTL counts from its last use.
+    """
+
+    def __init__(self, spool_dir: str = DEFAULT_SPOOL_DIR, public_url: Optional[str] = None, max_bytes: int = MAX_UPLOAD_BYTES,
+                 max_total_bytes: int = MAX_SPOOL_BYTES, allowed_hosts: Iterable[str] = (), upload_token: Optional[str] = None,
+                 ttl_seconds: float = SPOOL_TTL_SECONDS, sweep_interval: float = SWEEP_INTERVAL_SECONDS):
+        self.dir = Path(spool_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.public_url = public_url.rstrip("/") if public_url else None
+        self.max_bytes = max_bytes
+        self.max_total_bytes = max_total_bytes
+        self.allowed_hosts = {host.lower() for host in allowed_hosts}
+        self.upload_token = upload_token
+        self.ttl_seconds = ttl_seconds
+        self.sweep_interval = sweep_interval
+        self.total_bytes = 0 # Registered files plus bytes being written
+        self._files: dict[str, SpooledFile] = {}
+        self._holds: Dict[str, int] = {} # file id -> number of tasks using the file
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]], public_url: Optional[str] = None) -> "FileSpool":
+        """Builds the spool from a `files` config section; the upload token falls back to A2A_FILE_UPLOAD_TOKEN."""
+        config = config or {}
+        return cls(
+            spool_dir=config.get("spool_dir") or DEFAULT_SPOOL_DIR,
+            public_url=public_url,
+            max_bytes=config.get("max_upload_bytes", MAX_UPLOAD_BYTES),
+            max_total_bytes=config.get("max_spool_bytes", MAX_SPOOL_BYTES),
+            allowed_hosts=config.get("allowed_hosts") or (),
+            upload_token=config.get("upload_token") or os.environ.get("A2A_FILE_UPLOAD_TOKEN"),
+            ttl_seconds=config.get("ttl_seconds", SPOOL_TTL_SECONDS),
+            sweep_interval=config.get("sweep_interval_seconds", SWEEP_INTERVAL_SECONDS),
+        )
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def uri_for(self, file_id: str) -> str:
+        return f"{self.public_url}/files/{file_id}"
+
+    def _new_file(self, name: Optional[str], mime_type: Optional[str]) -> SpooledFile:
+        file_id = uuid.uuid4().hex
+        return SpooledFile(file_id=file_id, path=self.dir / file_id, name=name, mime_type=mime_type, size=0)
+
+    def _register(self, spooled: SpooledFile) -> SpooledFile:
+        spooled.size = spooled.path.stat().st_size
+        self._files[spooled.file_id] = spooled
+        return spooled
+
+    def _reserve(self, size: int):
+        """Counts size more bytes against max_total_bytes; raises SpoolFullError (counting nothing) beyond it."""
+        if self.total_bytes + size > self.max_total_bytes:
+            raise SpoolFullError(f"The file spool is full ({self.max_total_bytes} bytes)")
+        self.total_bytes += size
+
+    async def save_stream(self, chunks: AsyncIterable[bytes], name: Optional[str] = None, mime_type: Optional[str] = None) -> SpooledFile:
+        """Writes a byte stream to disk chunk by chunk (the writes run in the default executor)."""
+        loop = asyncio.get_running_loop()
+        spooled = self._new_file(name, mime_type)
+        written = 0
+        try:
+            with open(spooled.path, "wb") as f:
+                async for chunk in chunks:
+                    if written + len(chunk) > self.max_bytes:
+                        raise ValueError(f"File exceeds the maximum size of {self.max_bytes} bytes")
+                    self._reserve(len(chunk))
+                    written += len(chunk)
+                    await loop.run_in_executor(None, f.write, chunk)
+        except BaseException:
+            spooled.path.unlink(missing_ok=True)
+            self.total_bytes -= written
+            raise
+        return self._register(spooled)
+
+    @staticmethod
+    def _write_base64(path: Path, data: str):
+        with open(path, "wb") as f:
+            for start in range(0, len(data), BASE64_DECODE_CHUNK):
+                f.write(base64.b64decode(data[start:start + BASE64_DECODE_CHUNK], validate=True))
+
+    async def save_base64(self, data: str, name: Optional[str] = None, mime_type: Optional[str] = None) -> SpooledFile:
+        """Decodes inline base64 content to disk in slices, without building the full decoded bytes.
+
+        The decoded size is known from the length of the data, so the limits are checked before
+        anything is written; decoding and writing run in the default executor.
+        """
+        if len(data) % 4:
+            raise ValueError(f"Invalid base64 content for file {name}")
+        size = len(data) // 4 * 3 - data[-2:].count("=")
+        if size > self.max_bytes:
+            raise ValueError(f"File exceeds the maximum size of {self.max_bytes} bytes")
+        self._reserve(size)
+        spooled = self._new_file(name, mime_type)
+        write = asyncio.get_running_loop().run_in_executor(None, self._write_base64, spooled.path, data)
+        try:
+            await asyncio.shield(write)
+        except BaseException as e:
+            # A cancelled caller does not stop the write; the file is removed once the executor is done with it
+            write.add_done_callback(lambda _: spooled.path.unlink(missing_ok=True))
+            spooled.path.unlink(missing_ok=True)
+            self.total_bytes -= size
+            if isinstance(e, (binascii.Error, ValueError)):
+                raise ValueError(f"Invalid base64 content for file {name}") from None
+            raise
+        return self._register(spooled)
+
+    def _own_file_id(self, uri: str) -> Optional[str]:
+        """The file id of a URI of this agent's GET /files/{file_id}, else None."""
+        if self.public_url and uri.startswith(f"{self.public_url}/files/"):
+            return uri[len(self.public_url) + len("/files/"):]
+        return None
+
+    async def fetch_uri(self, uri: str, name: Optional[str] = None, mime_type: Optional[str] = None) -> SpooledFile:
+        """Resolves a URI-referenced file: our own uploads are looked up locally, http(s) URIs on an allowed host are streamed to disk."""
+        file_id = self._own_file_id(uri)
+        if file_id is not None:
+            spooled = self._files.get(file_id)
+            if spooled is None:
+                raise FileNotFoundError(f"Uploaded file not found: {uri}")
+            return spooled
+        parts = urlsplit(uri)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported file URI scheme: {uri}")
+        if (parts.hostname or "").lower() not in self.allowed_hosts:
+            raise PermissionError(f"File URI host is not allowed: {parts.hostname}")
+        # Redirects are not followed (raise_for_status rejects them), so an allowed host cannot bounce the fetch elsewhere
+        async with httpx.AsyncClient(timeout=60, follow_redirects=False) as client:
+            async with client.stream("GET", uri) as response:
+                response.raise_for_status()
+                return await self.save_stream(response.aiter_bytes(), name=name, mime_type=mime_type or response.headers.get("content-type"))
+
+    async def resolve(self, part: FilePart) -> SpooledFile:
+        """Materializes a FilePart on local disk and holds it for the calling task until release()."""
+        if part.file.uri:
+            spooled = await self.fetch_uri(part.file.uri, name=part.file.name, mime_type=part.file.mimeType)
+        else:
+            spooled = await self.save_base64(part.file.bytes, name=part.file.name, mime_type=part.file.mimeType)
+        self._hold(spooled)
+        return spooled
+
+    def _hold(self, spooled: SpooledFile):
+        self._holds[spooled.file_id] = self._holds.get(spooled.file_id, 0) + 1
+        try:
+            os.utime(spooled.path) # The TTL of an upload counts from its last use
+        except FileNotFoundError:
+            pass
+
+    def is_held(self, file_id: str) -> bool:
+        """Whether a task is still using the file (held files are never swept)."""
+        return file_id in self._holds
+
+    def get(self, file_id: str) -> Optional[SpooledFile]:
+        return self._files.get(file_id)
+
+    def _remove(self, spooled: SpooledFile):
+        spooled.path.unlink(missing_ok=True)
+        if self._files.pop(spooled.file_id, None) is not None:
+            self.total_bytes -= spooled.size
+
+    def release(self, files: List[SpooledFile]):
+        """Ends a finished task's hold on its files; transient files no other task holds are deleted."""
+        for spooled in files:
+            remaining = self._holds.get(spooled.file_id, 0) - 1
+            if remaining > 0:
+                self._holds[spooled.file_id] = remaining
+                continue
+            self._holds.pop(spooled.file_id, None)
+            if spooled.transient:
+                self._remove(spooled)
+
+    def cleanup_expired(self, ttl_seconds: Optional[float] = None):
+        """Removes spooled files older than the TTL that no task holds."""
+        ttl_seconds = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        now = time.time()
+        for spooled in list(self._files.values()):
+            if self.is_held(spooled.file_id):
+                continue
+            try:
+                expired = now - spooled.path.stat().st_mtime > ttl_seconds
+            except FileNotFoundError:
+                expired = True
+            if expired:
+                self._remove(spooled)
+
+    async def run_sweeper(self):
+        """Removes expired files every sweep_interval seconds until cancelled."""
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            self.cleanup_expired()
+
+    def start(self) -> asyncio.Task:
+        """Starts the periodic sweep; call from the running event loop."""
+        return asyncio.get_running_loop().create_task(self.run_sweeper())
+
+    def _authorized(self, request: Request) -> bool:
+        if not self.upload_token:
+            return True
+        return hmac.compare_digest(request.headers.get("authorization", ""), f"Bearer {self.upload_token}")
+
+    # --- Starlette endpoints ---
+    async def upload_endpoint(self, request: Request) -> JSONResponse:
+        """POST /files: streams the request body to disk and returns a URI usable in a FilePart."""
+        if not self._authorized(request):
+            return JSONResponse({"error": "Unauthorized"}, status_code=401)
+        declared = request.headers.get("content-length")
+        if declared and declared.isdigit() and int(declared) > self.max_bytes:
+            return JSONResponse({"error": f"File exceeds the maximum size of {self.max_bytes} bytes"}, status_code=413)
+        name = unquote(request.headers.get("x-file-name", "")) or None # URL-encoded by the client (non-ASCII names)
+        mime_type = request.headers.get("content-type")
+        try:
+            spooled = await self.save_stream(request.stream(), name=name, mime_type=mime_type)
+        except SpoolFullError as e:
+            return JSONResponse({"error": str(e)}, status_code=507)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=413)
+        spooled.transient = False
+        logger.info(f"Spooled upload {spooled.file_id} ({spooled.size} bytes)")
+        return JSONResponse({"uri": self.uri_for(spooled.file_id), "size": spooled.size})
+
+    async def download_endpoint(self, request: Request):
+        """GET /files/{file_id}: serves a spooled file (for peers that received its URI)."""
+        spooled = self._files.get(request.path_params["file_id"])
+        if spooled is None:
+            return JSONResponse({"error": "File not found"}, status_code=404)
+        return FileResponse(spooled.path, media_type=spooled.mime_type, filename=spooled.name)
+
+    def add_routes(self, app):
+        app.add_route("/files", self.upload_endpoint, methods=["POST"])
+        app.add_route("/files/{file_id}", self.download_endpoint, methods=["GET"])
+
+
+async def extract_message_input(message: Message, spool: Optional[FileSpool]) -> Tuple[str, List[SpooledFile]]:
+    """Extracts the input text from the message parts, spooling any FileParts to disk.
+
+    Text files contribute a bounded preview (read via mmap) to the input text. If a part cannot be
+    read, the files already spooled for the earlier parts are released before the error propagates.
+    """
+    chunks: List[str] = [] # Joined once at the end; repeated += copies the text for every part
+    files: List[SpooledFile] = []
+    if message and message.parts:
+        try:
+            for part in message.parts:
+                if isinstance(part, TextPart):
+                    chunks.append(part.text)
+                elif isinstance(part, FilePart) and spool is not None:
+                    spooled = await spool.resolve(part)
+                    files.append(spooled)
+                    chunks.append(await asyncio.get_running_loop().run_in_executor(None, spooled.describe))
+        except BaseException:
+            if spool is not None:
+                spool.release(files)
+            raise
+    return "\n".join(chunks).strip(), files
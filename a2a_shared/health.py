@@ -0,0 +1,37 @@
+import time
+from typing import Optional
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+
+class HealthChecks:
+    """Liveness and readiness endpoints for an agent.
+
+    /healthz answers as soon as the server is bound, independently of heavy framework
+    imports that may still be loading in the background, so orchestrators can tell a
+    live process from a hung one during cold start. /readyz returns 503 until the agent
+    calls mark_ready() (e.g. after its warm-up), so traffic is only routed to warm replicas.
+    """
+
+    def __init__(self, ready: bool = True):
+        self.started_at = time.monotonic()
+        self.ready = ready
+        self.detail: Optional[str] = None if ready else "starting"
+
+    def mark_ready(self, detail: Optional[str] = None):
+        self.ready = True
+        self.detail = detail
+
+    async def healthz(self, request: Request) -> JSONResponse:
+        return JSONResponse({"status": "ok", "uptime_seconds": round(time.monotonic() - self.started_at, 3)})
+
+    async def readyz(self, request: Request) -> JSONResponse:
+        body = {"status": "ready" if self.ready else "not_ready"}
+        if self.detail:
+            body["detail"] = self.detail
+        return JSONResponse(body, status_code=200 if self.ready else 503)
+
+    def add_routes(self, app):
+        app.add_route("/healthz", self.healthz, methods=["GET"])
+        app.add_route("/readyz", self.readyz, methods=["GET"])
@@ -0,0 +1,140 @@
+import logging
+from typing import Any, Dict, Optional
+
+from common.types import FilePart, JSONRPCError, JSONRPCResponse, TextPart
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BODY_BYTES = 8 * 1024 * 1024 # Larger inputs belong in POST /files uploads
+DEFAULT_MAX_PARTS = 32
+DEFAULT_MAX_PART_BYTES = 2 * 1024 * 1024
+
+
+class RequestTooLargeError(JSONRPCError):
+    code: int = -32013
+    message: str = "Request too large"
+    data: Any | None = None
+
+
+class RequestLimits:
+    """Size limits of JSON-RPC requests (the `limits` config section).
+
+    - max_body_bytes bounds the raw request body; RequestLimitsMiddleware enforces it while the
+      body is received, so an oversized request is never buffered whole.
+    - max_parts bounds the parts of a tasks/send(Subscribe) message, and max_part_bytes the UTF-8
+      size of one TextPart or the base64 data of one inline FilePart (checked by FastA2AServer).
+    """
+
+    def __init__(self, max_body_bytes: int = DEFAULT_MAX_BODY_BYTES, max_parts: int = DEFAULT_MAX_PARTS,
+                 max_part_bytes: int = DEFAULT_MAX_PART_BYTES):
+        self.max_body_bytes = max_body_bytes
+        self.max_parts = max_parts
+        self.max_part_bytes = max_part_bytes
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> Optional["RequestLimits"]:
+        """Builds the limits from the `limits` config section (None when disabled)."""
+        config = config or {}
+        if not config.get("enabled", True):
+            return None
+        return cls(
+            max_body_bytes=config.get("max_body_bytes", DEFAULT_MAX_BODY_BYTES),
+            max_parts=config.get("max_parts", DEFAULT_MAX_PARTS),
+            max_part_bytes=config.get("max_part_bytes", DEFAULT_MAX_PART_BYTES),
+        )
+
+    def reconfigure(self, other: "RequestLimits"):
+        """Takes over the limits of other (built from a reloaded config); the middleware and server read them per request."""
+        self.max_body_bytes = other.max_body_bytes
+        self.max_parts = other.max_parts
+        self.max_part_bytes = other.max_part_bytes
+
+    def check_message(self, params: Any) -> Optional[RequestTooLargeError]:
+        """Returns an error when the message of the request params exceeds max_parts or max_part_bytes."""
+        message = getattr(params, "message", None)
+        if message is None:
+            return None
+        if len(message.parts) > self.max_parts:
+            return RequestTooLargeError(data={"limit": "max_parts", "max": self.max_parts, "actual": len(message.parts)})
+        for index, part in enumerate(message.parts):
+            if isinstance(part, TextPart):
+                size = _utf8_size(part.text, self.max_part_bytes)
+            elif isinstance(part, FilePart) and part.file.bytes:
+                size = len(part.file.bytes)
+            else:
+                continue
+            if size > self.max_part_bytes:
+                return RequestTooLargeError(data={"limit": "max_part_bytes", "max": self.max_part_bytes, "actual": size, "part": index})
+        return None
+
+
+def _utf8_size(text: str, limit: int) -> int:
+    """UTF-8 size of text, for comparing with limit: text within it even at 4 bytes per character is not encoded."""
+    if len(text) * 4 <= limit:
+        return len(text)
+    return len(text.encode("utf-8"))
+
+
+def _error_body(error: RequestTooLargeError, request_id: Any = None) -> bytes:
+    return JSONRPCResponse(id=request_id, error=error).model_dump_json(exclude_none=True).encode()
+
+
+class RequestLimitsMiddleware:
+    """ASGI middleware that rejects JSON-RPC bodies larger than max_body_bytes with HTTP 413.
+
+    A declared Content-Length is checked before anything is read; otherwise the body is counted
+    as it arrives and the request is rejected as soon as it crosses the limit. Accepted bodies are
+    replayed to the app chunk by chunk. Only POSTs to the JSON-RPC path are inspected (file
+    uploads have their own limit).
+    """
+
+    def __init__(self, app, limits: RequestLimits, path: str = "/"):
+        self.app = app
+        self.limits = limits
+        self.path = path
+
+    async def _reject(self, send, size: int):
+        logger.warning(f"Rejected a JSON-RPC request body of {size}+ bytes (max_body_bytes={self.limits.max_body_bytes})")
+        body = _error_body(RequestTooLargeError(data={"limit": "max_body_bytes", "max": self.limits.max_body_bytes}))
+        await send({"type": "http.response.start", "status": 413, "headers": [
+            (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()), (b"connection", b"close")]})
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] != self.path:
+            await self.app(scope, receive, send)
+            return
+
+        max_bytes = self.limits.max_body_bytes
+        content_length = dict(scope.get("headers", [])).get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > max_bytes:
+            await self._reject(send, int(content_length))
+            return
+
+        messages = []
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            size += len(message.get("body", b""))
+            if size > max_bytes:
+                await self._reject(send, size)
+                return
+            messages.append(message)
+            if not message.get("more_body", False):
+                break
+
+        pending = iter(messages)
+
+        async def replay():
+            # After the body, fall through to the real receive (SSE responses wait on it for the disconnect)
+            return next(pending, None) or await receive()
+
+        await self.app(scope, replay, send)
+
+
+def add_request_limits(app, limits: Optional[RequestLimits], path: str = "/"):
+    """Installs RequestLimitsMiddleware for the JSON-RPC endpoint at path (no-op when limits is None)."""
+    if limits is not None:
+        app.add_middleware(RequestLimitsMiddleware, limits=limits, path=path)
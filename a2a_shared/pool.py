@@ -0,0 +1,200 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_AFFINITY = 10000
+
+
+class Replica:
+    """One URL of a pool, with its in-flight request count and health state."""
+
+    __slots__ = ("url", "outstanding", "failures", "ejected_until", "requests")
+
+    def __init__(self, url: str):
+        self.url = url
+        self.outstanding = 0
+        self.failures = 0 # Consecutive failures; reset by any success
+        self.ejected_until = 0.0 # monotonic time until which the replica receives no new requests
+        self.requests = 0
+
+    def available(self, now: float) -> bool:
+        return self.ejected_until <= now
+
+
+class ReplicaPool:
+    """Client-side load balancing over replicas of one agent (same card, different URLs).
+
+    - balancing "p2c" (default) samples two available replicas and takes the one with fewer
+      outstanding requests; "least_outstanding" scans all of them.
+    - Requests carrying an affinity key (sessionId, task id) stick to the replica that served
+      the key first, so conversation state and the task store stay on one replica; the key map
+      is LRU-bounded by max_affinity.
+    - A replica is ejected for eject_seconds after eject_after_failures consecutive transport
+      errors or 5xx responses, or when its health endpoint stops answering 200. Affine keys of an
+      ejected replica move to another one. If every replica is ejected, all of them are used.
+
+    Bookkeeping is guarded by a threading.Lock so one pool can be shared across event loops
+    (e.g. Streamlit sessions running in different threads).
+    """
+
+    def __init__(self, urls: Iterable[str], balancing: str = "p2c", eject_after_failures: int = 3, eject_seconds: float = 30,
+                 health_path: str = "/readyz", health_interval: float = 10, max_affinity: int = DEFAULT_MAX_AFFINITY):
+        self.replicas = [Replica(url) for url in dict.fromkeys(urls)]
+        if not self.replicas:
+            raise ValueError("A replica pool needs at least one URL")
+        if balancing not in ("p2c", "least_outstanding"):
+            raise ValueError(f"Unknown balancing strategy: {balancing}")
+        self.balancing = balancing
+        self.eject_after_failures = eject_after_failures
+        self.eject_seconds = eject_seconds
+        self.health_path = health_path
+        self.health_interval = health_interval
+        self.max_affinity = max_affinity
+        self._affinity: "OrderedDict[str, Replica]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]], default_port: int) -> "ReplicaPool":
+        """Builds a pool from a target_agent section: `replicas: [url, ...]`, or a single address/port."""
+        config = config or {}
+        urls = config.get("replicas") or [f"http://{config.get('address', 'localhost')}:{config.get('port', default_port)}/"]
+        health = config.get("health") or {}
+        return cls(
+            urls,
+            balancing=config.get("balancing", "p2c"),
+            eject_after_failures=health.get("eject_after_failures", 3),
+            eject_seconds=health.get("eject_seconds", 30),
+            health_path=health.get("path", "/readyz"),
+            health_interval=health.get("interval_seconds", 10),
+        )
+
+    def reconfigure(self, other: "ReplicaPool"):
+        """Takes over the replicas and settings of other (built from a reloaded config).
+
+        Replicas kept across the reload keep their outstanding counts, failures, ejection and
+        affine keys; keys bound to removed replicas are rebound on their next request. Requests
+        in flight to a removed replica finish normally.
+        """
+        with self._lock:
+            current = {replica.url: replica for replica in self.replicas}
+            self.replicas = [current.get(replica.url, replica) for replica in other.replicas]
+            kept = set(map(id, self.replicas))
+            self._affinity = OrderedDict((key, replica) for key, replica in self._affinity.items() if id(replica) in kept)
+            self.balancing = other.balancing
+            self.eject_after_failures = other.eject_after_failures
+            self.eject_seconds = other.eject_seconds
+            self.health_path = other.health_path
+            self.health_interval = other.health_interval
+            self.max_affinity = other.max_affinity
+
+    @property
+    def urls(self) -> List[str]:
+        return [replica.url for replica in self.replicas]
+
+    def _choose(self, now: float, exclude: List[Replica]) -> Replica:
+        candidates = [replica for replica in self.replicas if replica not in exclude] or self.replicas
+        candidates = [replica for replica in candidates if replica.available(now)] or candidates
+        if self.balancing == "p2c" and len(candidates) > 2:
+            candidates = random.sample(candidates, 2)
+        return min(candidates, key=lambda replica: replica.outstanding)
+
+    def pick(self, affinity_keys: Iterable[str] = (), exclude: Iterable[Replica] = ()) -> Replica:
+        """Returns the replica for a request and binds its affinity keys to it (the first bound, available key wins).
+
+        Replicas in exclude (e.g. ones a retry already failed on) are skipped, and the keys move off them.
+        """
+        affinity_keys = [key for key in affinity_keys if key]
+        exclude = list(exclude)
+        now = time.monotonic()
+        with self._lock:
+            replica = None
+            for key in affinity_keys:
+                bound = self._affinity.get(key)
+                if bound is not None and bound.available(now) and bound not in exclude:
+                    replica = bound
+                    break
+            if replica is None:
+                replica = self._choose(now, exclude)
+            for key in affinity_keys:
+                self._affinity[key] = replica
+                self._affinity.move_to_end(key)
+            while len(self._affinity) > self.max_affinity:
+                self._affinity.popitem(last=False)
+            return replica
+
+    def record_success(self, replica: Replica):
+        with self._lock:
+            replica.failures = 0
+            replica.ejected_until = 0.0
+
+    def record_failure(self, replica: Replica):
+        with self._lock:
+            replica.failures += 1
+            if replica.failures >= self.eject_after_failures and replica.available(time.monotonic()):
+                replica.ejected_until = time.monotonic() + self.eject_seconds
+                logger.warning(f"Ejected replica {replica.url} for {self.eject_seconds}s after {replica.failures} consecutive failures")
+
+    @asynccontextmanager
+    async def acquire(self, affinity_keys: Iterable[str] = (), exclude: Iterable[Replica] = ()) -> AsyncIterator[Replica]:
+        """Picks a replica and counts the block as one outstanding request on it.
+
+        Transport errors and exceptions carrying a 5xx status_code count as replica failures;
+        other exceptions (e.g. JSON-RPC errors) are the request's problem, not the replica's.
+        """
+        replica = self.pick(affinity_keys, exclude)
+        with self._lock:
+            replica.outstanding += 1
+            replica.requests += 1
+        try:
+            yield replica
+        except Exception as e:
+            if isinstance(e, httpx.TransportError) or getattr(e, "status_code", 0) >= 500:
+                self.record_failure(replica)
+            raise
+        else:
+            self.record_success(replica)
+        finally:
+            with self._lock:
+                replica.outstanding -= 1
+
+    async def check_health(self, http_client: httpx.AsyncClient):
+        """Probes every replica's health endpoint once; non-200 answers eject the replica immediately."""
+        async def probe(replica: Replica):
+            try:
+                response = await http_client.get(replica.url.rstrip("/") + self.health_path, timeout=self.health_interval)
+                healthy = response.status_code == 200
+            except httpx.HTTPError:
+                healthy = False
+            if healthy:
+                if not replica.available(time.monotonic()):
+                    logger.info(f"Replica {replica.url} is healthy again")
+                self.record_success(replica)
+            else:
+                with self._lock:
+                    if replica.available(time.monotonic()):
+                        logger.warning(f"Ejected replica {replica.url}: health check failed")
+                    replica.ejected_until = time.monotonic() + self.eject_seconds
+        await asyncio.gather(*(probe(replica) for replica in self.replicas))
+
+    async def run_health_checks(self):
+        """Probes the replicas every health_interval seconds until cancelled; a single replica is not probed
+        (it gets every request either way) until a reload adds more."""
+        async with httpx.AsyncClient() as http_client:
+            while True:
+                if len(self.replicas) > 1:
+                    await self.check_health(http_client)
+                await asyncio.sleep(self.health_interval)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        return [{"url": replica.url, "outstanding": replica.outstanding, "requests": replica.requests,
+                 "ejected": not replica.available(now)} for replica in self.replicas]
@@ -0,0 +1,214 @@
+import asyncio
+import hmac
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from typing import Any, Dict, Optional
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+
+from a2a_shared.resources import ResourceMonitor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SECONDS = 30
+_WATCHDOG_THREAD_NAME = "a2a-loop-watchdog"
+
+
+def admin_token_from_config(config: Optional[Dict[str, Any]]) -> Optional[str]:
+    """The admin token of a `profiling` section, falling back to the A2A_ADMIN_TOKEN environment variable."""
+    return (config or {}).get("admin_token") or os.environ.get("A2A_ADMIN_TOKEN") or None
+
+
+def admin_authorized(request: Request, admin_token: Optional[str]) -> bool:
+    """Whether the request carries "Authorization: Bearer <admin_token>"; always False without a token."""
+    if not admin_token:
+        return False
+    return hmac.compare_digest(request.headers.get("authorization", ""), f"Bearer {admin_token}")
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})"
+
+
+def sample_stacks(seconds: float, interval: float) -> Counter:
+    """Samples the stacks of all threads (except the sampler and the lag watchdog) every interval for seconds.
+
+    Returns a Counter of folded stacks "thread;outermost;...;innermost" -> samples, the input
+    format of flamegraph.pl and speedscope. Blocks the calling thread, so run it off the event loop.
+    """
+    me = threading.get_ident()
+    stacks: Counter = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me or names.get(ident) == _WATCHDOG_THREAD_NAME:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            stacks[";".join([names.get(ident, str(ident))] + labels[::-1])] += 1
+        time.sleep(interval)
+    return stacks
+
+
+class LoopLagMonitor:
+    """Detects event-loop stalls: callbacks that block the loop longer than threshold.
+
+    A heartbeat coroutine wakes every interval and measures how late it was. A watchdog thread
+    checks the heartbeat, and while the loop is stalled it logs the loop thread's current stack
+    (i.e. the code that is blocking it), once per stall.
+    """
+
+    def __init__(self, interval: float = 0.1, threshold: float = 0.2):
+        self.interval = interval
+        self.threshold = threshold
+        self.max_lag = 0.0 # Worst lag seen, in seconds
+        self.stalls = 0
+        self._heartbeat = time.monotonic()
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._loop_thread = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._beat())
+        threading.Thread(target=self._watch, name=_WATCHDOG_THREAD_NAME, daemon=True).start()
+
+    async def _beat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._heartbeat = now
+            lag = now - expected
+            self.max_lag = max(self.max_lag, lag)
+            if lag > self.threshold:
+                self.stalls += 1
+                logger.warning(f"Event loop was blocked for {lag * 1000:.0f} ms")
+
+    def _watch(self):
+        reported = None
+        while self._task is not None and not self._task.done():
+            time.sleep(self.interval)
+            heartbeat = self._heartbeat
+            if time.monotonic() - heartbeat > self.interval + self.threshold and reported != heartbeat:
+                reported = heartbeat
+                frame = sys._current_frames().get(self._loop_thread)
+                stack = "".join(traceback.format_stack(frame)) if frame is not None else "(unavailable)"
+                logger.warning(f"Event loop blocked for over {self.threshold * 1000:.0f} ms, loop thread is at:\n{stack}")
+
+
+class ProfilingEndpoints:
+    """Admin endpoints for on-demand profiling, plus the event-loop lag monitor.
+
+    GET /admin/profile?seconds=5&interval_ms=10 samples every thread (event loop and executor
+    threads) and returns folded stacks; GET /admin/loop reports the lag monitor's counters.
+    GET /admin/resources?top=10 samples the process resources (see ResourceMonitor) and, while
+    tracemalloc is tracing, the top allocations; POST /admin/resources/tracemalloc?action=
+    start|baseline|stop controls tracing. The endpoints are off unless admin_endpoints is set,
+    and are only mounted with an admin_token: requests must send "Authorization: Bearer <admin_token>".
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.enabled = config.get("admin_endpoints", False)
+        self.admin_token = admin_token_from_config(config)
+        self.max_seconds = config.get("max_seconds", DEFAULT_MAX_SECONDS)
+        lag_config = config.get("loop_lag") or {}
+        self.lag_monitor = None
+        if lag_config.get("enabled", True):
+            self.lag_monitor = LoopLagMonitor(lag_config.get("interval_ms", 100) / 1000, lag_config.get("threshold_ms", 200) / 1000)
+        self._profiling = threading.Lock()
+        tracemalloc_config = config.get("tracemalloc") or {}
+        self.resources = ResourceMonitor(tracemalloc_frames=tracemalloc_config.get("frames", 1))
+        if tracemalloc_config.get("enabled", False):
+            self.resources.start_tracemalloc()
+
+    def start(self):
+        """Starts the lag monitor; call from the running event loop."""
+        if self.lag_monitor is not None:
+            self.lag_monitor.start()
+
+    def _authorized(self, request: Request) -> bool:
+        return admin_authorized(request, self.admin_token)
+
+    async def profile_endpoint(self, request: Request):
+        if not self._authorized(request):
+            return PlainTextResponse("Unauthorized\n", status_code=401)
+        try:
+            seconds = min(float(request.query_params.get("seconds", 5)), self.max_seconds)
+            interval = max(float(request.query_params.get("interval_ms", 10)), 1) / 1000
+        except ValueError:
+            return PlainTextResponse("seconds and interval_ms must be numbers\n", status_code=400)
+        if not self._profiling.acquire(blocking=False):
+            return PlainTextResponse("A profile is already being captured\n", status_code=409)
+        try:
+            logger.info(f"Capturing a {seconds:.1f}s sampling profile ({interval * 1000:.0f} ms interval)")
+            stacks = await asyncio.get_running_loop().run_in_executor(None, sample_stacks, seconds, interval)
+        finally:
+            self._profiling.release()
+        body = "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+        return PlainTextResponse(body, headers={"Content-Disposition": "inline; filename=profile.folded"})
+
+    async def loop_endpoint(self, request: Request):
+        if not self._authorized(request):
+            return PlainTextResponse("Unauthorized\n", status_code=401)
+        monitor = self.lag_monitor
+        if monitor is None:
+            return JSONResponse({"enabled": False})
+        return JSONResponse({
+            "enabled": True,
+            "threshold_ms": monitor.threshold * 1000,
+            "max_lag_ms": round(monitor.max_lag * 1000, 1),
+            "stalls": monitor.stalls,
+        })
+
+    async def resources_endpoint(self, request: Request):
+        if not self._authorized(request):
+            return PlainTextResponse("Unauthorized\n", status_code=401)
+        try:
+            top = int(request.query_params.get("top", 10))
+        except ValueError:
+            return PlainTextResponse("top must be an integer\n", status_code=400)
+        body = self.resources.sample()
+        if "tracemalloc" in body:
+            body["tracemalloc"]["top"] = await asyncio.get_running_loop().run_in_executor(None, self.resources.top_allocations, top)
+        return JSONResponse(body)
+
+    async def tracemalloc_endpoint(self, request: Request):
+        if not self._authorized(request):
+            return PlainTextResponse("Unauthorized\n", status_code=401)
+        action = request.query_params.get("action")
+        if action == "start":
+            self.resources.start_tracemalloc()
+        elif action == "stop":
+            self.resources.stop_tracemalloc()
+        elif action == "baseline":
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self.resources.take_baseline)
+            except RuntimeError as e:
+                return PlainTextResponse(f"{e}\n", status_code=409)
+        else:
+            return PlainTextResponse("action must be start, baseline or stop\n", status_code=400)
+        logger.info(f"tracemalloc: {action}")
+        return JSONResponse({"action": action})
+
+    def add_routes(self, app):
+        if not self.enabled:
+            return
+        if not self.admin_token:
+            logger.warning("profiling.admin_endpoints is set but no admin_token (or A2A_ADMIN_TOKEN) is configured; /admin/* endpoints are not mounted")
+            return
+        app.add_route("/admin/profile", self.profile_endpoint, methods=["GET"])
+        app.add_route("/admin/loop", self.loop_endpoint, methods=["GET"])
+        app.add_route("/admin/resources", self.resources_endpoint, methods=["GET"])
+        app.add_route("/admin/resources/tracemalloc", self.tracemalloc_endpoint, methods=["POST"])
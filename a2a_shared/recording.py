@@ -0,0 +1,191 @@
+import atexit
+import gzip
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Message content is redacted by default; the masks keep the original lengths so replayed payloads stay realistic
+DEFAULT_REDACT = ("params.message.parts.*.text", "params.message.parts.*.file.bytes", "params.message.parts.*.data")
+# Request headers that change how the server handles a request (replayed as recorded)
+RECORDED_HEADERS = ("content-type", "accept-encoding", "a2a-timeout-ms")
+
+
+def _mask(value: Any) -> Any:
+    if isinstance(value, str):
+        return "x" * len(value)
+    if isinstance(value, dict):
+        return {key: _mask(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_mask(item) for item in value]
+    return value if isinstance(value, bool) or value is None else 0
+
+
+def redact(obj: Any, paths: Iterable[str]) -> Any:
+    """Masks the values at dotted paths in obj in place ("*" matches every list item or dict key) and returns obj."""
+    for path in paths:
+        _redact_path(obj, path.split("."))
+    return obj
+
+
+def _redact_path(obj: Any, keys: List[str]):
+    key, rest = keys[0], keys[1:]
+    if isinstance(obj, dict):
+        targets = list(obj) if key == "*" else [key] if key in obj else []
+    elif isinstance(obj, list):
+        targets = range(len(obj)) if key == "*" else [int(key)] if key.isdigit() and int(key) < len(obj) else []
+    else:
+        return
+    for target in targets:
+        if rest:
+            _redact_path(obj[target], rest)
+        else:
+            obj[target] = _mask(obj[target])
+
+
+def _open_log(path: str, mode: str):
+    return gzip.open(path, mode + "t", encoding="utf-8") if path.endswith(".gz") else open(path, mode, encoding="utf-8")
+
+
+def read_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Yields the records of a traffic log (gzip when the name ends in .gz), tolerating a truncated tail."""
+    with _open_log(path, "r") as log:
+        try:
+            for line in log:
+                if line.strip():
+                    yield json.loads(line)
+        except (EOFError, json.JSONDecodeError): # Log of a recorder that was still running or was killed
+            logger.warning(f"{path} ends with a truncated record")
+
+
+class TrafficRecorder:
+    """Appends sampled JSON-RPC requests, with their timing, to a JSONL traffic log for tools/replay.py.
+
+    Each record holds the request (redacted at the `redact` paths), the recorded headers, its offset
+    from the start of the recording and the status, latency, time to first byte and sizes of the
+    response. Parsing, redaction and writing happen on a writer thread, so recording adds no JSON
+    work to the event loop. Recording stops after max_records.
+    """
+
+    def __init__(self, path: str, sample_rate: float = 1.0, redact_paths: Iterable[str] = DEFAULT_REDACT, max_records: int = 100000):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.redact_paths = list(redact_paths)
+        self.max_records = max_records
+        self.records = 0
+        self.started = time.perf_counter()
+        self._queue: "queue.SimpleQueue[Optional[Tuple[Dict[str, Any], bytes]]]" = queue.SimpleQueue()
+        self._writer = threading.Thread(target=self._write_loop, name="traffic-recorder", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def should_record(self) -> bool:
+        return self.records < self.max_records and (self.sample_rate >= 1 or random.random() < self.sample_rate)
+
+    def offset(self) -> float:
+        """Seconds since the recording started."""
+        return time.perf_counter() - self.started
+
+    def submit(self, record: Dict[str, Any], body: bytes):
+        """Queues a record and its raw request body for the writer thread."""
+        self.records += 1
+        self._queue.put((record, body))
+
+    def close(self):
+        """Writes the queued records and closes the log."""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout=5)
+
+    def _write_loop(self):
+        with _open_log(self.path, "a") as log:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+                record, body = item
+                try:
+                    record["request"] = redact(json.loads(body), self.redact_paths)
+                except ValueError:
+                    continue # Not JSON (e.g. a body cut off by the size limit); nothing to replay
+                log.write(json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n")
+                if self._queue.empty():
+                    log.flush()
+
+
+class RecordingMiddleware:
+    """ASGI middleware that hands POSTs to the JSON-RPC path, with their timing, to a TrafficRecorder.
+
+    The request body is collected as the app reads it and the response is only measured (status,
+    time to first byte, bytes, end of the body or SSE stream), never buffered.
+    """
+
+    def __init__(self, app, recorder: TrafficRecorder, path: str = "/"):
+        self.app = app
+        self.recorder = recorder
+        self.path = path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] != self.path or not self.recorder.should_record():
+            await self.app(scope, receive, send)
+            return
+
+        offset = self.recorder.offset()
+        started = time.perf_counter()
+        headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in scope.get("headers", [])}
+        chunks: List[bytes] = []
+        response = {"status": None, "stream": False, "first_byte": None, "bytes_out": 0}
+
+        async def receive_recorded():
+            message = await receive()
+            if message["type"] == "http.request":
+                chunks.append(message.get("body", b""))
+            return message
+
+        async def send_measured(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                content_type = dict(message.get("headers", [])).get(b"content-type", b"")
+                response["stream"] = content_type.startswith(b"text/event-stream")
+            elif message["type"] == "http.response.body":
+                if response["first_byte"] is None:
+                    response["first_byte"] = time.perf_counter()
+                response["bytes_out"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_recorded, send_measured)
+        finally:
+            finished = time.perf_counter()
+            body = b"".join(chunks)
+            self.recorder.submit({
+                "t": round(offset, 4),
+                "headers": {name: headers[name] for name in RECORDED_HEADERS if name in headers},
+                "status": response["status"],
+                "stream": response["stream"],
+                "latency_ms": round((finished - started) * 1000, 3),
+                "ttfb_ms": round((response["first_byte"] - started) * 1000, 3) if response["first_byte"] else None,
+                "bytes_in": len(body),
+                "bytes_out": response["bytes_out"],
+            }, body)
+
+
+def add_recording(app, config: Optional[Dict[str, Any]], path: str = "/") -> Optional[TrafficRecorder]:
+    """Installs RecordingMiddleware from the `recording` config section (disabled by default)."""
+    config = config or {}
+    if not config.get("enabled", False):
+        return None
+    recorder = TrafficRecorder(
+        config.get("path", "traffic.jsonl.gz"),
+        sample_rate=config.get("sample_rate", 1.0),
+        redact_paths=config.get("redact", DEFAULT_REDACT),
+        max_records=config.get("max_records", 100000),
+    )
+    app.add_middleware(RecordingMiddleware, recorder=recorder, path=path)
+    logger.info(f"Recording JSON-RPC traffic to {recorder.path} (sample rate {recorder.sample_rate})")
+    return recorder
@@ -0,0 +1,182 @@
+import asyncio
+import copy
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+import yaml
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+
+from a2a_shared.profiling import admin_authorized
+
+logger = logging.getLogger(__name__)
+
+# prepare(new section) validates it and builds what it needs, raising on invalid settings; the
+# callable it returns commits the change and must not fail
+Prepare = Callable[[Optional[Dict[str, Any]]], Callable[[], None]]
+T = TypeVar("T")
+
+
+class ReloadError(Exception):
+    """The new config was rejected; nothing was applied."""
+
+
+def reloadable(build: Callable[[Any], T], apply: Callable[[T], None]) -> Prepare:
+    """Prepare function that builds the new settings with build(section) and commits them with apply(new),
+    e.g. reloadable(TaskStore.from_config, task_store.reconfigure)."""
+    def prepare(section):
+        new = build(section)
+        return lambda: apply(new)
+    return prepare
+
+
+class ConfigReloader:
+    """Reloads the agent's YAML config while it runs, on a file change or POST /admin/reload.
+
+    Components register the top-level sections they can change at runtime (rate limits, pool
+    sizes, store sizes, peer endpoints). A reload runs in two phases: every changed section is
+    prepared first (new objects built, settings validated), and only when all of them succeed are
+    the changes committed, one after another without yielding to the event loop, so no request
+    sees half of a reload. A rejected config leaves everything as it was. Components keep their
+    state when they take over new settings: queued and running tasks, token buckets, replica
+    health and stored tasks survive a reload.
+
+    Changed sections nobody registered (listen_port, middleware, tracing, ...), removed sections
+    and a section's static_keys keep their running values and are reported as needing a restart.
+    """
+
+    def __init__(self, path: str, config: Dict[str, Any], reload_config: Optional[Dict[str, Any]] = None,
+                 admin_token: Optional[str] = None):
+        reload_config = reload_config or {}
+        self.path = path
+        self.active = copy.deepcopy(config) # Settings in effect: the file's, except where a restart is pending
+        self.watch_enabled = reload_config.get("watch", True)
+        self.watch_interval = reload_config.get("interval_seconds", 2)
+        self.admin_endpoint = reload_config.get("admin_endpoint", True)
+        self.admin_token = admin_token
+        self.generation = 0
+        self.last_result: Optional[Dict[str, Any]] = None
+        self._sections: Dict[str, Tuple[Prepare, Tuple[str, ...]]] = {}
+        self._mtime = self._stat()
+        self._lock = asyncio.Lock()
+
+    def register(self, section: str, prepare: Prepare, static_keys: Iterable[str] = ()):
+        """Makes section reloadable; keys in static_keys only change with a restart."""
+        self._sections[section] = (prepare, tuple(static_keys))
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, "r") as f:
+                config = yaml.safe_load(f)
+        except (OSError, yaml.YAMLError) as e:
+            raise ReloadError(f"Cannot load {self.path}: {e}") from e
+        if not isinstance(config, dict):
+            raise ReloadError(f"{self.path} does not contain a mapping")
+        return config
+
+    def _plan(self, config: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Tuple[str, Callable[[], None]]], List[str]]:
+        """Prepares every changed section. Returns the new active config, the commits and the settings needing a restart."""
+        active = copy.deepcopy(self.active)
+        commits = []
+        restart_required = []
+        for section in sorted(set(config) | set(self.active)):
+            old, new = self.active.get(section), config.get(section)
+            if old == new:
+                continue
+            if section not in self._sections or new is None:
+                restart_required.append(section)
+                continue
+            prepare, static_keys = self._sections[section]
+            if static_keys and isinstance(new, dict) and isinstance(old, dict):
+                for key in static_keys:
+                    if old.get(key) != new.get(key):
+                        restart_required.append(f"{section}.{key}")
+                new = {**{k: v for k, v in new.items() if k not in static_keys},
+                       **{k: old[k] for k in static_keys if k in old}}
+                if new == old:
+                    continue
+            try:
+                commits.append((section, prepare(copy.deepcopy(new))))
+            except Exception as e:
+                raise ReloadError(f"Invalid {section} section: {e}") from e
+            active[section] = new
+        return active, commits, restart_required
+
+    async def reload(self) -> Dict[str, Any]:
+        """Re-reads the config file and applies it; raises ReloadError (changing nothing) when it is invalid."""
+        async with self._lock:
+            self._mtime = self._stat()
+            try:
+                config = await asyncio.get_running_loop().run_in_executor(None, self._read)
+                active, commits, restart_required = self._plan(config)
+            except ReloadError as e:
+                logger.error(f"Kept the running config: {e}")
+                self.last_result = {"generation": self.generation, "error": str(e), "reloaded_at": time.time()}
+                raise
+            # Commit phase: no awaits, so requests see either the old or the new settings
+            for section, commit in commits:
+                try:
+                    commit()
+                except Exception:
+                    logger.exception(f"Applying the reloaded {section} section failed")
+            self.active = active
+            self.generation += 1
+            result = {
+                "generation": self.generation,
+                "applied": [section for section, _ in commits],
+                "restart_required": restart_required,
+                "reloaded_at": time.time(),
+            }
+            self.last_result = result
+        if commits:
+            logger.info(f"Reloaded {self.path} (generation {self.generation}): applied {', '.join(result['applied'])}")
+        if restart_required:
+            logger.warning(f"Changed settings in {self.path} take effect only after a restart: {', '.join(restart_required)}")
+        return result
+
+    async def watch(self):
+        """Reloads whenever the config file's modification time or size changes, until cancelled."""
+        while True:
+            await asyncio.sleep(self.watch_interval)
+            mtime = self._stat()
+            if mtime is None or mtime == self._mtime:
+                continue
+            try:
+                await self.reload()
+            except ReloadError:
+                pass # Logged; the next change of the file is tried again
+
+    def start(self) -> Optional[asyncio.Task]:
+        """Starts the file watch (if enabled); call from the running event loop."""
+        if not self.watch_enabled:
+            return None
+        logger.info(f"Watching {self.path} for changes every {self.watch_interval}s")
+        return asyncio.get_running_loop().create_task(self.watch())
+
+    async def reload_endpoint(self, request: Request):
+        if not admin_authorized(request, self.admin_token):
+            return PlainTextResponse("Unauthorized\n", status_code=401)
+        if request.method == "GET":
+            return JSONResponse({"generation": self.generation, "last_result": self.last_result})
+        try:
+            return JSONResponse(await self.reload())
+        except ReloadError as e:
+            return JSONResponse({"generation": self.generation, "error": str(e)}, status_code=400)
+
+    def add_routes(self, app):
+        """Mounts GET/POST /admin/reload; only with an admin token, so nobody else can trigger reloads."""
+        if not self.admin_endpoint:
+            return
+        if not self.admin_token:
+            logger.warning("No profiling.admin_token (or A2A_ADMIN_TOKEN) is configured; /admin/reload is not mounted (the file watch still reloads)")
+            return
+        app.add_route("/admin/reload", self.reload_endpoint, methods=["GET", "POST"])
@@ -0,0 +1,120 @@
+import asyncio
+import gc
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import resource
+except ImportError: # Not available on Windows
+    resource = None
+
+
+def rss_bytes() -> Optional[int]:
+    """Current resident set size (from /proc on Linux; elsewhere the peak RSS from getrusage)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    return None
+
+
+def open_fds() -> Optional[int]:
+    for fd_dir in ("/proc/self/fd", "/dev/fd"):
+        try:
+            return len(os.listdir(fd_dir))
+        except OSError:
+            continue
+    return None
+
+
+def os_threads() -> Optional[int]:
+    """Threads of the process, including ones not started through threading (e.g. native libraries)."""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("Threads:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+class ResourceMonitor:
+    """Samples the process resources that grow when something leaks, for GET /admin/resources.
+
+    A sample holds RSS, open file descriptors, Python and OS thread counts, asyncio tasks, live
+    gc-tracked objects and registered gauges (sizes of the agent's own stores). While tracemalloc
+    is tracing, top_allocations() lists the source lines holding the most memory, or with a
+    baseline snapshot, the lines whose allocations grew the most since it was taken.
+    """
+
+    def __init__(self, tracemalloc_frames: int = 1):
+        self.tracemalloc_frames = tracemalloc_frames
+        self.started = time.monotonic()
+        self._gauges: Dict[str, Callable[[], Any]] = {}
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+
+    def add_gauge(self, name: str, value: Callable[[], Any]):
+        """Reports value() under gauges.<name> in every sample."""
+        self._gauges[name] = value
+
+    def sample(self) -> Dict[str, Any]:
+        """Takes a sample; call on the event loop thread (asyncio_tasks counts that loop's tasks)."""
+        try:
+            asyncio_tasks = len(asyncio.all_tasks())
+        except RuntimeError: # No running loop
+            asyncio_tasks = None
+        sample = {
+            "uptime_seconds": round(time.monotonic() - self.started, 1),
+            "rss_bytes": rss_bytes(),
+            "open_fds": open_fds(),
+            "threads": threading.active_count(),
+            "os_threads": os_threads(),
+            "asyncio_tasks": asyncio_tasks,
+            "gc_objects": len(gc.get_objects()),
+            "gauges": {name: value() for name, value in self._gauges.items()},
+        }
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            sample["tracemalloc"] = {"current_bytes": current, "peak_bytes": peak, "baseline": self._baseline is not None}
+        return sample
+
+    def start_tracemalloc(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.tracemalloc_frames)
+        self._baseline = None
+
+    def stop_tracemalloc(self):
+        tracemalloc.stop()
+        self._baseline = None
+
+    def take_baseline(self):
+        """Snapshots the traced allocations; later top_allocations() report growth since this point.
+        Blocks for a while on large heaps, so run it off the event loop."""
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not tracing")
+        self._baseline = self._snapshot()
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+
+    def top_allocations(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Source lines with the most traced memory (or the most growth since the baseline). Run off the event loop."""
+        if not tracemalloc.is_tracing():
+            return []
+        snapshot = self._snapshot()
+        if self._baseline is not None:
+            stats = snapshot.compare_to(self._baseline, "lineno")
+            return [{"location": str(stat.traceback), "size_bytes": stat.size, "size_diff_bytes": stat.size_diff,
+                     "count": stat.count, "count_diff": stat.count_diff} for stat in stats[:limit]]
+        return [{"location": str(stat.traceback), "size_bytes": stat.size, "count": stat.count}
+                for stat in snapshot.statistics("lineno")[:limit]]
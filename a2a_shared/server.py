@@ -0,0 +1,123 @@
+import json
+import time
+from typing import Any, AsyncIterable, Optional
+
+from pydantic import ValidationError
+from starlette.requests import Request
+from starlette.responses import Response
+
+from common.server.server import A2AServer
+from common.types import (
+    A2ARequest, JSONRPCResponse, JSONParseError, InvalidRequestError,
+    GetTaskRequest, SendTaskRequest, SendTaskStreamingRequest, CancelTaskRequest,
+    SetTaskPushNotificationRequest, GetTaskPushNotificationRequest, TaskResubscriptionRequest,
+)
+from a2a_shared.deadline import TIMEOUT_HEADER, merge_timeout_header
+from a2a_shared.limits import RequestLimits
+from a2a_shared.tracing import TRACEPARENT, SpanContext, parse_traceparent, record_span, start_span
+
+# JSON-RPC request type -> TaskManager handler name
+_HANDLERS = {
+    GetTaskRequest: "on_get_task",
+    SendTaskRequest: "on_send_task",
+    SendTaskStreamingRequest: "on_send_task_subscribe",
+    CancelTaskRequest: "on_cancel_task",
+    SetTaskPushNotificationRequest: "on_set_task_push_notification",
+    GetTaskPushNotificationRequest: "on_get_task_push_notification",
+    TaskResubscriptionRequest: "on_resubscribe_to_task",
+}
+
+
+class JSONBytesResponse(Response):
+    """Response whose body is already serialized JSON."""
+    media_type = "application/json"
+
+
+class FastA2AServer(A2AServer):
+    """A2AServer with a faster JSON path.
+
+    - Requests are validated straight from the raw body (A2ARequest.validate_json)
+      instead of json.loads followed by validate_python.
+    - JSONRPCResponse results are serialized by pydantic-core (model_dump_json)
+      instead of model_dump + json.dumps; server-built models are not re-validated.
+    - The agent card is serialized once and served from the cached bytes.
+
+    Each request is traced as an "a2a.server <method>" span (with parse and serialize children),
+    continuing the trace from the traceparent HTTP header or params.metadata.traceparent.
+    An a2a-timeout-ms header is folded into params.metadata.timeout_ms, where the task
+    manager reads the request's deadline. With limits, messages with too many or too large
+    parts are rejected with RequestTooLargeError before reaching the task manager (the body
+    size itself is bounded by RequestLimitsMiddleware).
+    """
+
+    def __init__(self, *args, limits: Optional[RequestLimits] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.limits = limits
+        self.refresh_agent_card()
+
+    def refresh_agent_card(self):
+        """Re-serializes the cached agent card (call after modifying self.agent_card)."""
+        self._agent_card_json = self.agent_card.model_dump_json(exclude_none=True) if self.agent_card else "{}"
+
+    def _get_agent_card(self, request: Request) -> Response:
+        return JSONBytesResponse(self._agent_card_json)
+
+    async def _process_request(self, request: Request):
+        received_ns = time.time_ns()
+        try:
+            body = await request.body()
+            json_rpc_request = A2ARequest.validate_json(body)
+        except Exception as e:
+            return self._handle_exception(e)
+        parsed_ns = time.time_ns()
+
+        limit_error = self.limits.check_message(json_rpc_request.params) if self.limits else None
+        if limit_error:
+            return JSONBytesResponse(JSONRPCResponse(id=json_rpc_request.id, error=limit_error).model_dump_json(exclude_none=True))
+        timeout_header = request.headers.get(TIMEOUT_HEADER)
+        if timeout_header is not None and hasattr(json_rpc_request.params, "metadata"):
+            json_rpc_request.params.metadata = merge_timeout_header(json_rpc_request.params.metadata, timeout_header)
+        metadata = getattr(json_rpc_request.params, "metadata", None) or {}
+        parent = parse_traceparent(request.headers.get(TRACEPARENT)) or parse_traceparent(metadata.get(TRACEPARENT))
+        attributes = {"rpc.method": json_rpc_request.method, "rpc.id": json_rpc_request.id, "a2a.task_id": getattr(json_rpc_request.params, "id", None)}
+        with start_span(f"a2a.server {json_rpc_request.method}", attributes, parent=parent, start_ns=received_ns) as span:
+            record_span("a2a.server.parse", received_ns, parsed_ns, {"http.request_content_length": len(body)})
+            try:
+                handler = getattr(self.task_manager, _HANDLERS[type(json_rpc_request)])
+                result = await handler(json_rpc_request)
+                if span is not None and isinstance(result, AsyncIterable):
+                    result = self._traced_stream(result, span.context)
+                with start_span("a2a.server.serialize"):
+                    return self._create_response(result)
+            except Exception as e:
+                return self._handle_exception(e)
+
+    @staticmethod
+    async def _traced_stream(stream: AsyncIterable, parent: SpanContext) -> AsyncIterable:
+        """Iterates a streaming result inside an "a2a.server.stream" span.
+
+        The SSE response consumes the stream in its own task after the request span has ended,
+        so the agent's spans during streaming are parented here instead.
+        """
+        with start_span("a2a.server.stream", parent=parent) as span:
+            events = 0
+            async for event in stream:
+                events += 1
+                yield event
+            span.set_attribute("a2a.stream_events", events)
+
+    def _handle_exception(self, e: Exception) -> Response:
+        # validate_json reports malformed JSON as a ValidationError; map it to a parse error like json.loads would
+        if isinstance(e, ValidationError) and any(err["type"] == "json_invalid" for err in e.errors()):
+            response = JSONRPCResponse(id=None, error=JSONParseError())
+            return JSONBytesResponse(response.model_dump_json(exclude_none=True), status_code=400)
+        if isinstance(e, ValidationError):
+            response = JSONRPCResponse(id=None, error=InvalidRequestError(data=json.loads(e.json())))
+            return JSONBytesResponse(response.model_dump_json(exclude_none=True), status_code=400)
+        return super()._handle_exception(e)
+
+    def _create_response(self, result: Any):
+        if isinstance(result, JSONRPCResponse):
+            return JSONBytesResponse(result.model_dump_json(exclude_none=True))
+        # Streaming results already use model_dump_json per event
+        return super()._create_response(result)
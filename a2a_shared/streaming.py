@@ -0,0 +1,43 @@
+import asyncio
+from typing import Any, AsyncIterator, List, Optional
+
+_CLOSED = object()
+
+
+class ThreadEventBridge:
+    """Forwards events produced on a worker thread to an asyncio queue owned by the event loop.
+
+    put() and close() are safe to call from any thread; the consumer iterates
+    batches() on the loop until the producer closes the bridge.
+    """
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.loop = loop or asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self._closed = False
+
+    def put(self, event: Any):
+        if not self._closed:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, event)
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, _CLOSED)
+
+    async def batches(self) -> AsyncIterator[List[Any]]:
+        """Yields every event queued so far as one batch, waiting only when the queue is empty.
+
+        Batching lets the consumer coalesce bursts (e.g. LLM tokens) into fewer, larger messages.
+        """
+        while True:
+            batch = [await self.queue.get()]
+            while not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            done = any(event is _CLOSED for event in batch)
+            if done:
+                batch = batch[:batch.index(_CLOSED)]
+            if batch:
+                yield batch
+            if done:
+                return
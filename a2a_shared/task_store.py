@@ -0,0 +1,202 @@
+import asyncio
+import itertools
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Coroutine, Dict, List, Optional, Union
+
+from common.types import (
+    Artifact, JSONRPCError, Message, Task, TaskArtifactUpdateEvent, TaskSendParams, TaskState, TaskStatus, TaskStatusUpdateEvent, TextPart,
+)
+
+FINAL_STATES = (TaskState.COMPLETED, TaskState.FAILED, TaskState.CANCELED)
+# The run stopped until the client replies: streams end here, and the task is evictable like a finished one
+# (its checkpoint lives in the agent's CheckpointStore, not here)
+END_OF_STREAM_STATES = FINAL_STATES + (TaskState.INPUT_REQUIRED,)
+DEFAULT_MAX_TASKS = 1000
+DEFAULT_TTL_SECONDS = 60 * 60 # Finished tasks are kept this long for tasks/get
+
+TaskEvent = Union[TaskStatusUpdateEvent, TaskArtifactUpdateEvent]
+
+
+class TaskAlreadyRunningError(JSONRPCError):
+    code: int = -32014
+    message: str = "A task with this id is still running"
+    data: Any | None = None
+
+
+def is_blocking(params: TaskSendParams) -> bool:
+    """tasks/send waits for the result unless the caller opts out with metadata.blocking=false."""
+    return (params.metadata or {}).get("blocking", True) is not False
+
+
+class TaskStore:
+    """In-memory store of an agent's tasks, for tasks/get, tasks/cancel and tasks/resubscribe.
+
+    Non-blocking tasks run as background asyncio tasks, and tasks/sendSubscribe streams record
+    their events as they yield them; status and artifact updates are recorded here and fanned
+    out to resubscribed clients. The store is bounded: beyond
+    max_tasks (and after ttl_seconds) the oldest finished tasks (or tasks waiting for input)
+    are dropped.
+    """
+
+    def __init__(self, max_tasks: int = DEFAULT_MAX_TASKS, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.max_tasks = max_tasks
+        self.ttl_seconds = ttl_seconds
+        self._tasks: "OrderedDict[str, Task]" = OrderedDict()
+        self._finished_at: Dict[str, float] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+        self._subscribers: Dict[str, List[asyncio.Queue]] = {}
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> "TaskStore":
+        config = config or {}
+        return cls(max_tasks=config.get("max_tasks", DEFAULT_MAX_TASKS), ttl_seconds=config.get("ttl_seconds", DEFAULT_TTL_SECONDS))
+
+    def reconfigure(self, other: "TaskStore"):
+        """Takes over the bounds of other (built from a reloaded config); a smaller bound evicts right away."""
+        self.max_tasks = other.max_tasks
+        self.ttl_seconds = other.ttl_seconds
+        self._evict()
+
+    def get(self, task_id: str, history_length: Optional[int] = None) -> Optional[Task]:
+        task = self._tasks.get(task_id)
+        if task is None or history_length is None or not task.history:
+            return task
+        return task.model_copy(update={"history": task.history[-history_length:] if history_length > 0 else []})
+
+    def put(self, task: Task):
+        """Records a task (e.g. the result of a blocking tasks/send) so tasks/get can find it."""
+        self._tasks[task.id] = task
+        self._tasks.move_to_end(task.id)
+        self._mark_state(task.id, task.status.state)
+        self._evict()
+
+    def is_running(self, task_id: str) -> bool:
+        """Whether a background run of the task is still in progress."""
+        background = self._running.get(task_id)
+        return background is not None and not background.done()
+
+    def start(self, task: Task, coro: Coroutine) -> bool:
+        """Records a submitted task and runs coro in the background to execute it.
+
+        False (coro is closed unrun) while an earlier run of the same task id is still in progress.
+        """
+        if self.is_running(task.id):
+            coro.close()
+            return False
+        self.put(task)
+        background = asyncio.create_task(coro)
+        self._running[task.id] = background
+
+        def finished(_):
+            if self._running.get(task.id) is background: # A later run of the same id registers its own entry
+                del self._running[task.id]
+
+        background.add_done_callback(finished)
+        return True
+
+    def update_status(self, task_id: str, status: TaskStatus, message_to_history: bool = True):
+        task = self._tasks.get(task_id)
+        if task is None:
+            return
+        task.status = status
+        if message_to_history and status.message:
+            task.history = (task.history or []) + [status.message]
+        final = status.state in END_OF_STREAM_STATES
+        self._mark_state(task_id, status.state)
+        self._publish(task_id, TaskStatusUpdateEvent(id=task_id, status=status, final=final))
+        if final:
+            self._evict() # Tasks finishing between puts must not grow the store past its bounds
+
+    def add_artifact(self, task_id: str, artifact: Artifact):
+        """Stores an artifact, or with append=True adds its parts to the stored artifact of the same index."""
+        task = self._tasks.get(task_id)
+        if task is None:
+            return
+        current = next((a for a in task.artifacts or [] if a.index == artifact.index), None)
+        if artifact.append and current is not None:
+            current.parts.extend(artifact.parts) # In place: a long stream of chunks stays linear
+            current.lastChunk = artifact.lastChunk
+        else:
+            task.artifacts = [a for a in (task.artifacts or []) if a.index != artifact.index] + [artifact.model_copy(update={"parts": list(artifact.parts)})]
+        self._publish(task_id, TaskArtifactUpdateEvent(id=task_id, artifact=artifact))
+
+    def record(self, event: TaskEvent, message_to_history: bool = True) -> TaskEvent:
+        """Applies an event of a tasks/sendSubscribe stream to the stored task and returns it, to be yielded as well."""
+        if isinstance(event, TaskArtifactUpdateEvent):
+            self.add_artifact(event.id, event.artifact)
+        else:
+            self.update_status(event.id, event.status, message_to_history)
+        return event
+
+    def cancel_unfinished(self, task_id: str, reason: str):
+        """Marks a task CANCELED unless it already ended (e.g. its stream was closed before the task finished)."""
+        task = self._tasks.get(task_id)
+        if task is not None and task.status.state not in END_OF_STREAM_STATES:
+            self.update_status(task_id, TaskStatus(state=TaskState.CANCELED, message=Message(role="agent", parts=[TextPart(text=reason)])))
+
+    async def cancel(self, task_id: str, timeout: float = 1.0) -> bool:
+        """Cancels a running background task and waits briefly for it to record CANCELED; False if it is not running."""
+        background = self._running.get(task_id)
+        if background is None or background.done():
+            return False
+        background.cancel()
+        await asyncio.wait([background], timeout=timeout)
+        return True
+
+    def _publish(self, task_id: str, event: TaskEvent):
+        for queue in self._subscribers.get(task_id, []):
+            queue.put_nowait(event)
+
+    async def subscribe(self, task_id: str) -> AsyncIterator[TaskEvent]:
+        """Yields the task's current artifacts and status, then its updates until it reaches a final state or input-required."""
+        task = self._tasks.get(task_id)
+        if task is None:
+            return
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(task_id, []).append(queue)
+        try:
+            for artifact in task.artifacts or []:
+                yield TaskArtifactUpdateEvent(id=task_id, artifact=artifact)
+            final = task.status.state in END_OF_STREAM_STATES
+            yield TaskStatusUpdateEvent(id=task_id, status=task.status, final=final)
+            while not final:
+                event = await queue.get()
+                if event is None: # The task was dropped from the store
+                    return
+                yield event
+                final = isinstance(event, TaskStatusUpdateEvent) and event.final
+        finally:
+            subscribers = self._subscribers.get(task_id, [])
+            if queue in subscribers:
+                subscribers.remove(queue)
+            if not subscribers:
+                self._subscribers.pop(task_id, None)
+
+    def _mark_state(self, task_id: str, state: TaskState):
+        # Popped first so _finished_at stays ordered by finish time (oldest first)
+        self._finished_at.pop(task_id, None) # Running again (e.g. resumed after input-required)
+        if state in END_OF_STREAM_STATES:
+            self._finished_at[task_id] = time.monotonic()
+
+    def _evict(self):
+        now = time.monotonic()
+        while self._finished_at:
+            task_id, finished_at = next(iter(self._finished_at.items()))
+            if now - finished_at <= self.ttl_seconds:
+                break
+            self._drop(task_id)
+        excess = len(self._tasks) - self.max_tasks
+        if excess > 0:
+            # Oldest finished tasks first; in-flight tasks are never dropped
+            for task_id in list(itertools.islice(self._finished_at, excess)):
+                self._drop(task_id)
+
+    def _drop(self, task_id: str):
+        self._tasks.pop(task_id, None)
+        self._finished_at.pop(task_id, None)
+        for queue in self._subscribers.pop(task_id, []):
+            queue.put_nowait(None) # Ends the subscription instead of leaving it waiting forever
+
+    def __len__(self) -> int:
+        return len(self._tasks)
@@ -0,0 +1,193 @@
+import json
+import logging
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT = "traceparent" # W3C Trace Context header, also carried in A2A params.metadata
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+class SpanContext(NamedTuple):
+    trace_id: str
+    span_id: str
+
+    def to_traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+
+def parse_traceparent(value: Any) -> Optional[SpanContext]:
+    """Parses a W3C traceparent value; None when absent or malformed."""
+    match = _TRACEPARENT_RE.match(value.strip().lower()) if isinstance(value, str) else None
+    if match is None or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    return SpanContext(match.group(1), match.group(2))
+
+
+_current: ContextVar[Optional[SpanContext]] = ContextVar("a2a_trace_span", default=None)
+
+
+class Span:
+    """A timed operation in a trace, exported as one OpenTelemetry-shaped JSON object when it ends."""
+
+    __slots__ = ("name", "context", "parent_id", "start_ns", "end_ns", "attributes", "status", "service")
+
+    def __init__(self, name: str, context: SpanContext, parent_id: Optional[str], start_ns: int, service: str, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.context = context
+        self.parent_id = parent_id
+        self.start_ns = start_ns
+        self.end_ns: Optional[int] = None
+        self.attributes = dict(attributes or {})
+        self.status = "OK"
+        self.service = service
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException):
+        self.status = "ERROR"
+        self.attributes["error.type"] = type(error).__name__
+        self.attributes["error.message"] = str(error)[:200]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.context.trace_id,
+            "span_id": self.context.span_id,
+            "parent_span_id": self.parent_id,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3) if self.end_ns else None,
+            "status": self.status,
+            "resource": {"service.name": self.service},
+            "attributes": self.attributes,
+        }
+
+
+class ConsoleSpanExporter:
+    """Logs each finished span as a JSON line."""
+
+    def export(self, span: Span):
+        logger.info(f"span {json.dumps(span.to_dict(), default=str)}")
+
+
+class FileSpanExporter:
+    """Appends each finished span as a JSON line to a file (safe to call from executor threads)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+class Tracer:
+    """Creates spans, tracks the current span in a ContextVar and hands finished spans to an exporter.
+
+    Without an exporter tracing is off: spans are not created and no trace context is propagated.
+    asyncio tasks inherit the current span, so work spawned from a request stays in its trace.
+    """
+
+    def __init__(self, service_name: str = "a2a", exporter: Any = None):
+        self.service_name = service_name
+        self.exporter = exporter
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    @contextmanager
+    def start_span(self, name: str, attributes: Optional[Dict[str, Any]] = None, parent: Optional[SpanContext] = None,
+                   start_ns: Optional[int] = None) -> Iterator[Optional[Span]]:
+        """Runs the block in a new span (child of parent, else of the current span); yields None when disabled."""
+        if not self.enabled:
+            yield None
+            return
+        parent = parent or _current.get()
+        context = SpanContext(parent.trace_id if parent else secrets.token_hex(16), secrets.token_hex(8))
+        span = Span(name, context, parent.span_id if parent else None, start_ns or time.time_ns(), self.service_name, attributes)
+        token = _current.set(context)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_error(e)
+            raise
+        finally:
+            try:
+                _current.reset(token)
+            except ValueError:
+                # An async generator resumed in another context (e.g. a streaming response); nothing to restore there
+                pass
+            span.end_ns = time.time_ns()
+            self._export(span)
+
+    def record_span(self, name: str, start_ns: int, end_ns: int, attributes: Optional[Dict[str, Any]] = None, parent: Optional[SpanContext] = None):
+        """Exports an already measured interval (e.g. queue wait) as a child of parent / the current span."""
+        if not self.enabled:
+            return
+        parent = parent or _current.get()
+        context = SpanContext(parent.trace_id if parent else secrets.token_hex(16), secrets.token_hex(8))
+        span = Span(name, context, parent.span_id if parent else None, start_ns, self.service_name, attributes)
+        span.end_ns = end_ns
+        self._export(span)
+
+    def _export(self, span: Span):
+        try:
+            self.exporter.export(span)
+        except Exception as e:
+            logger.warning(f"Failed to export span {span.name}: {e}")
+
+
+_tracer = Tracer()
+
+
+def configure_tracing(service_name: str, config: Optional[Dict[str, Any]]) -> Tracer:
+    """Sets up the process-wide tracer from the `tracing` config section (enabled, exporter, file_path)."""
+    global _tracer
+    config = config or {}
+    exporter = None
+    if config.get("enabled", False):
+        kind = config.get("exporter", "console")
+        if kind == "console":
+            exporter = ConsoleSpanExporter()
+        elif kind == "file":
+            exporter = FileSpanExporter(config.get("file_path", f"traces-{service_name}.jsonl"))
+        else:
+            raise ValueError(f"Unknown tracing exporter: {kind}")
+    _tracer = Tracer(service_name, exporter)
+    return _tracer
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def start_span(name: str, attributes: Optional[Dict[str, Any]] = None, parent: Optional[SpanContext] = None, start_ns: Optional[int] = None):
+    return _tracer.start_span(name, attributes, parent, start_ns)
+
+
+def record_span(name: str, start_ns: int, end_ns: int, attributes: Optional[Dict[str, Any]] = None):
+    _tracer.record_span(name, start_ns, end_ns, attributes)
+
+
+def current_traceparent() -> Optional[str]:
+    context = _current.get()
+    return context.to_traceparent() if context is not None and _tracer.enabled else None
+
+
+def inject_metadata(metadata: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Returns metadata with the current trace context added (unchanged when there is none)."""
+    traceparent = current_traceparent()
+    if traceparent is None:
+        return metadata
+    return {**(metadata or {}), TRACEPARENT: traceparent}
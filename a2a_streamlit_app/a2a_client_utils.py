@@ -1,8 +1,15 @@
 
 import asyncio
+import base64
+import copy
 import httpx
 import logging
-from typing import Optional, Dict, Any, List
+import os
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Optional, Dict, Any, List, BinaryIO, AsyncIterator, Tuple
+from urllib.parse import quote
 # import sys # sys.path 操作は不要になったので削除
 # import os # os モジュールも不要になったので削除
 
@@ -11,7 +18,6 @@ from typing import Optional, Dict, Any, List
 try:
     # Import from the renamed 'common' directory
     from common.client.card_resolver import A2ACardResolver
-    from common.client.client import A2AClient
     # types モジュールを別名でインポートして衝突回避
     from common import types as a2a_types
     # A2AClientJSONError も types からインポート
@@ -22,19 +28,142 @@ except ImportError as e:
     # google_a2a_common 内部の依存関係に問題がある可能性がある
     # フォールバック用のダミー定義は削除 (インポート成功を前提とする)
     raise # エラーを再送出して問題を明確にする
+from httpx_sse import SSEError
+from a2a_shared.client import FastA2AClient
+from a2a_shared.pool import ReplicaPool
+from a2a_shared.deadline import TIMEOUT_METADATA
+from a2a_shared.tracing import configure_tracing, start_span
 
 
 logging.basicConfig(level=logging.INFO)
+
+# --- トレーシング (環境変数 A2A_TRACING_EXPORTER=console|file で有効化、file の出力先は A2A_TRACING_FILE) ---
+# UI からの送信をトレースの起点とし、traceparent をヘッダーと metadata でエージェントへ伝搬する
+_tracing_exporter = os.environ.get("A2A_TRACING_EXPORTER")
+configure_tracing("streamlit_app", {
+    "enabled": bool(_tracing_exporter),
+    "exporter": _tracing_exporter or "console",
+    "file_path": os.environ.get("A2A_TRACING_FILE", "traces-streamlit_app.jsonl"),
+})
+
+# --- ファイル送信のパラメータ ---
+INLINE_FILE_LIMIT = 256 * 1024 # これ以下のファイルは base64 でインライン送信、超える場合はアップロードして URI 参照
+UPLOAD_CHUNK_SIZE = 256 * 1024 # アップロード時に1度に読み込むバイト数
+BASE64_ENCODE_CHUNK = 3 * 64 * 1024 # 3の倍数にすることで、チャンクごとのエンコード結果をそのまま連結できる
+FILE_UPLOAD_TOKEN = os.environ.get("A2A_FILE_UPLOAD_TOKEN") # エージェントの files.upload_token と同じ値 (設定時は POST /files に付与)
+
+# --- HTTP クライアントの共有 ---
+# Streamlit は操作ごとに asyncio.run で新しいイベントループを作るため、httpx.AsyncClient はループをまたいで使えない。
+# http_session() の中 (1回の送信: SSE、ポーリングへの切り替え、tasks/get、レプリカへの送り直し) では1つのクライアントを共有し、
+# 呼び出しごとにクライアント (コネクションプール) を作っては捨てることを避ける
+_session_http_client: ContextVar[Optional[httpx.AsyncClient]] = ContextVar("a2a_session_http_client", default=None)
+
+@asynccontextmanager
+async def http_session() -> AsyncIterator[httpx.AsyncClient]:
+    """ブロック内の A2A 呼び出しで共有する httpx.AsyncClient を用意する (入れ子の場合は外側のものを使う)"""
+    client = _session_http_client.get()
+    if client is not None:
+        yield client
+        return
+    async with httpx.AsyncClient(timeout=None) as client:
+        token = _session_http_client.set(client)
+        try:
+            yield client
+        finally:
+            _session_http_client.reset(token)
+
+# --- タスクの期限 ---
+# metadata.timeout_ms でエージェントに伝え、期限を過ぎたタスクは待ち行列や実行中でも打ち切らせる
+# (エージェントは残り時間をピア呼び出しにも引き継ぐ)
+TASK_DEADLINE_SECONDS = 600
+
+# --- tasks/get ポーリングのパラメータ (ストリーミング非対応エージェント用) ---
+POLL_INITIAL_INTERVAL = 0.2 # 送信直後・状態が変わった直後のポーリング間隔 (秒)
+POLL_MAX_INTERVAL = 2.0 # 状態が変わらない間は間隔を POLL_BACKOFF_FACTOR 倍ずつ、この値まで延ばす
+POLL_BACKOFF_FACTOR = 1.5
+POLL_TIMEOUT = TASK_DEADLINE_SECONDS # これを超えても終わらないタスクはエラーとして扱う (秒)
+# 完了 (これ以上状態が変わらない) または入力待ちの状態
+POLL_STOP_STATES = {"completed", "canceled", "failed", "input-required", "unknown"}
+# ストリーミング自体が使えないことを示す JSON-RPC エラー (MethodNotFound, UnsupportedOperation)
+STREAMING_UNSUPPORTED_CODES = {-32601, -32004}
+
+class StreamingUnavailableError(Exception):
+    """最初のイベントを受け取る前に、エージェントが SSE ストリーミングに応じなかったことを示す"""
+
+# --- レプリカプール (カンマ区切りで登録した複数URLを1つのエージェントとして扱う) ---
+_replica_pools: Dict[str, ReplicaPool] = {} # 登録文字列 -> プール (全セッションで共有し、処理中のリクエスト数を合算する)
+
+def split_replica_urls(server_url: str) -> List[str]:
+    """登録されたサーバーURL (カンマ区切りで複数指定可) をレプリカURLのリストに分ける"""
+    return [url.strip() for url in server_url.split(",") if url.strip()]
+
+def get_replica_pool(server_url: str) -> Optional[ReplicaPool]:
+    """複数のレプリカURLで登録されたエージェントのプールを返す (URLが1つならNone)"""
+    urls = split_replica_urls(server_url)
+    if len(urls) < 2:
+        return None
+    pool = _replica_pools.get(server_url)
+    if pool is None:
+        pool = _replica_pools.setdefault(server_url, ReplicaPool(urls))
+    return pool
+
+# --- 検証済み AgentCard のキャッシュ (URL -> (検証時の辞書のコピー, モデル)) ---
+_agent_card_cache: Dict[str, Tuple[Dict[str, Any], a2a_types.AgentCard]] = {}
+
+def get_agent_card_model(agent_card_dict: Dict[str, Any]) -> a2a_types.AgentCard:
+    """
+    Agent Card の辞書表現を検証済みの AgentCard モデルに変換する。
+
+    送信のたびに model_validate しないよう URL ごとに結果をキャッシュし、
+    辞書の内容が変わった (カードを再取得した) ときだけ検証し直す。
+    """
+    url = agent_card_dict.get("url")
+    cached = _agent_card_cache.get(url)
+    if cached is not None and cached[0] == agent_card_dict:
+        return cached[1]
+    agent_card = a2a_types.AgentCard.model_validate(agent_card_dict)
+    _agent_card_cache[url] = (copy.deepcopy(agent_card_dict), agent_card)
+    return agent_card
+
+def _build_task_params(message_parts_dicts: List[Dict[str, Any]], task_id: str, session_id: str) -> Optional[a2a_types.TaskSendParams]:
+    """
+    送信パラメータを TaskSendParams モデルとして組み立てる (有効なパートがなければNone)。
+
+    モデルのまま渡すことで、辞書へのダンプとリクエスト作成時の再検証を省く。
+    """
+    message_parts: List[a2a_types.MessagePart] = []
+    for part_dict in message_parts_dicts:
+        if part_dict.get("type") == "text":
+            message_parts.append(a2a_types.TextPart.model_validate(part_dict))
+        elif part_dict.get("type") == "file":
+            message_parts.append(a2a_types.FilePart.model_validate(part_dict))
+        else:
+            logging.warning(f"Unsupported message part type: {part_dict.get('type')}")
+    if not message_parts:
+        return None
+    # acceptedOutputModes など、他のパラメータも必要に応じて追加
+    # チャットUIからのタスクは interactive レーンで実行させる (バッチ処理より優先)。期限は送信ごとに TASK_DEADLINE_SECONDS
+    return a2a_types.TaskSendParams(id=task_id, sessionId=session_id, message=a2a_types.Message(role="user", parts=message_parts),
+                                    metadata={"priority": "interactive", TIMEOUT_METADATA: TASK_DEADLINE_SECONDS * 1000})
+
 def get_agent_card(url: str) -> Optional[Dict[str, Any]]:
     """
     指定されたURLからAgent Cardを取得する同期関数。
 
     Args:
-        url: Agent Cardを取得するA2AサーバーのURL。
+        url: Agent Cardを取得するA2AサーバーのURL。カンマ区切りのレプリカURLの場合は、取得できた最初のものを使う
+             (レプリカは同じカードを返す前提)。
 
     Returns:
         取得したAgent Cardの辞書表現。取得失敗時はNone。
     """
+    replica_urls = split_replica_urls(url)
+    if len(replica_urls) > 1:
+        for replica_url in replica_urls:
+            card = get_agent_card(replica_url)
+            if card:
+                return card
+        return None
     try:
         # A2ACardResolver は base_url を必須引数として取る
         resolver = A2ACardResolver(base_url=url)
@@ -59,80 +188,7 @@ def get_agent_card(url: str) -> Optional[Dict[str, Any]]:
         logging.error(f"An unexpected error occurred while getting Agent Card from {url}: {e}")
         return None
 
-# send_a2a_task と stream_a2a_task は非同期のまま (A2AClient のメソッドが非同期のため)
-async def send_a2a_task(agent_card_dict: Dict[str, Any], message_parts_dicts: List[Dict[str, Any]], task_id: str, session_id: str) -> Optional[Dict[str, Any]]:
-    """
-    A2Aタスクを送信する (非ストリーミング)。
-
-    Args:
-        agent_card_dict: Agent Card の辞書表現。
-        message_parts_dicts: 送信するメッセージパートの辞書表現のリスト。
-        task_id: タスクID。
-        session_id: セッションID。
-
-    Returns:
-        取得した Task オブジェクトの辞書表現。取得失敗時はNone。
-    """
-    try:
-        # AgentCard辞書をPydanticモデルにパース (a2a_types を使用)
-        agent_card = a2a_types.AgentCard.model_validate(agent_card_dict)
-
-        # MessagePart辞書をPydanticモデルにパース (a2a_types を使用)
-        message_parts: List[a2a_types.MessagePart] = []
-        for part_dict in message_parts_dicts:
-            if part_dict.get("type") == "text":
-                message_parts.append(a2a_types.TextPart.model_validate(part_dict))
-            # TODO: FilePartの処理 (Step 6)
-            # elif part_dict.get("type") == "file":
-            #     message_parts.append(a2a_types.FilePart.model_validate(part_dict))
-            else:
-                logging.warning(f"Unsupported message part type: {part_dict.get('type')}")
-
-        if not message_parts:
-            logging.error("No valid message parts to send.")
-            return None
-
-        # A2AClient は agent_card または url で初期化 (client 引数は不要)
-        # httpx.AsyncClient のコンテキストマネージャも不要 (内部で管理されるため)
-        client = A2AClient(agent_card=agent_card)
-        logging.info(f"Sending task {task_id} (session: {session_id}) to {agent_card.url}")
-
-        # send_task メソッドは payload 辞書を引数に取る
-        payload = {
-            "id": task_id,
-            "sessionId": session_id,
-            "message": a2a_types.Message(role="user", parts=message_parts).model_dump(mode='json')
-            # acceptedOutputModes など、他のパラメータも必要に応じて追加
-        }
-
-        # a2a_types.Task を使用 (send_task の戻り値は SendTaskResponse だが、中身は Task 相当のはず)
-        # client.py を見ると send_task は SendTaskResponse を返す。中身は Task ではない。
-        # send_task の戻り値は JSONRPCResponse 形式の辞書のはず。
-        # response_dict = await client.send_task(payload) # client.py の send_task は SendTaskResponse を返す
-        # SendTaskResponse は result フィールドに Task を持つはず
-        # response = await client.send_task(payload)
-        # task_result: Optional[a2a_types.Task] = response.result if response else None
-
-        # client.py の send_task は JSONRPCRequest を作成し、_send_request を呼ぶ。
-        # _send_request は辞書を返す。SendTaskResponse でラップして返す。
-        # なので、戻り値は SendTaskResponse オブジェクト。
-        response = await client.send_task(payload)
-
-        if response and response.result:
-            task_result: a2a_types.Task = response.result
-            logging.info(f"Received task result for {task_id}: State={task_result.status.state}")
-            return task_result.model_dump(mode='json')
-        else:
-            logging.warning(f"No valid task result received for {task_id}. Response: {response}")
-            return None
-    except httpx.RequestError as e:
-        logging.error(f"HTTP request error while sending task {task_id}: {e}")
-        return None
-    except Exception as e:
-        logging.error(f"An unexpected error occurred while sending task {task_id}: {e}")
-        return None
-
-
+# stream_a2a_task と poll_a2a_task は非同期 (A2AClient のメソッドが非同期のため)。送信方式の選択は transport.run_a2a_task が行う
 async def stream_a2a_task(agent_card_dict: Dict[str, Any], message_parts_dicts: List[Dict[str, Any]], task_id: str, session_id: str, update_callback: callable):
     """
     A2Aタスクを送信し、ストリーミングでイベントを受け取る非同期ジェネレータ。
@@ -144,68 +200,80 @@ async def stream_a2a_task(agent_card_dict: Dict[str, Any], message_parts_dicts:
         session_id: セッションID。
         update_callback: イベント受信時に呼び出されるコールバック関数。
                          イベントデータ (辞書) を引数として受け取る。
+
+    Raises:
+        StreamingUnavailableError: 最初のイベントより前に、SSE 以外の応答やストリーミング非対応のエラーが返った場合
+                                   (呼び出し側はポーリングに切り替えられる)。
+        httpx.ConnectError: エージェントに接続できなかった場合 (何も送信していないため、送り直せる)。
     """
     final_task_result: Optional[a2a_types.Task] = None # a2a_types を使用
+    received_events = 0
     try:
-        # AgentCard辞書をPydanticモデルにパース (a2a_types を使用)
-        agent_card = a2a_types.AgentCard.model_validate(agent_card_dict)
-
-        # MessagePart辞書をPydanticモデルにパース (a2a_types を使用)
-        message_parts: List[a2a_types.MessagePart] = []
-        for part_dict in message_parts_dicts:
-            if part_dict.get("type") == "text":
-                message_parts.append(a2a_types.TextPart.model_validate(part_dict))
-            # TODO: FilePartの処理 (Step 6)
-            else:
-                logging.warning(f"Unsupported message part type: {part_dict.get('type')}")
-
-        if not message_parts:
+        # 検証済みの AgentCard をキャッシュから取得
+        agent_card = get_agent_card_model(agent_card_dict)
+
+        payload = _build_task_params(message_parts_dicts, task_id, session_id)
+        if payload is None:
             logging.error("No valid message parts to send.")
             await update_callback({"event_type": "error", "message": "No valid message parts."})
             return
 
-        # A2AClient は agent_card または url で初期化 (client 引数は不要)
-        # httpx.AsyncClient のコンテキストマネージャも不要
-        client = A2AClient(agent_card=agent_card)
+        # FastA2AClient の send_task_streaming は共有の httpx.AsyncClient で SSE を非同期に読む
+        # (標準の A2AClient は呼び出しごとに同期の httpx.Client を作り、受信中はイベントループを止める)
         logging.info(f"Streaming task {task_id} (session: {session_id}) to {agent_card.url}")
 
-        # send_task_streaming メソッドは payload 辞書を引数に取る
-        payload = {
-            "id": task_id,
-            "sessionId": session_id,
-            "message": a2a_types.Message(role="user", parts=message_parts).model_dump(mode='json')
-            # acceptedOutputModes など、他のパラメータも必要に応じて追加
-        }
-
         # send_task_streaming は AsyncIterable[SendTaskStreamingResponse] を返す
-        async for response in client.send_task_streaming(payload):
-            # response は SendTaskStreamingResponse オブジェクト
-            # 中身は TaskStatusUpdateEvent, TaskArtifactUpdateEvent, Task のいずれかのはず
-            # client.py を見ると、SSE の data を SendTaskStreamingResponse でラップしている
-            # SendTaskStreamingResponse は result フィールドを持つ
-            if response and response.result:
-                event = response.result # result が実際のイベントデータ (Task, TaskStatusUpdateEvent など)
-                event_dict = event.model_dump(mode='json') # イベントデータを辞書化
-
-                # a2a_types を使用して型チェック
-                if isinstance(event, a2a_types.TaskStatusUpdateEvent):
-                    logging.info(f"Task {task_id} Status Update: {event.status.state} - {event.status.message}") # status オブジェクト経由でアクセス
-                    await update_callback({"event_type": "status_update", **event_dict})
-                elif isinstance(event, a2a_types.TaskArtifactUpdateEvent):
-                    logging.info(f"Task {task_id} Artifact Update: {event.artifact.name if event.artifact else 'N/A'}") # artifact オブジェクト経由
-                    await update_callback({"event_type": "artifact_update", **event_dict})
-                elif isinstance(event, a2a_types.Task): # ストリームの最後はTaskオブジェクト
-                    logging.info(f"Task {task_id} Final Result Received: State={event.status.state}") # status オブジェクト経由
-                    final_task_result = event
-                    # コールバックにも最終結果を送る (一貫性のため)
-                    await update_callback({"event_type": "final_result", **event_dict})
-                else:
-                     logging.warning(f"Received unknown event type in stream: {type(event)}")
-                     await update_callback({"event_type": "unknown", **event_dict})
-            else:
-                logging.warning(f"Received empty or invalid response in stream for task {task_id}: {response}")
+        # traceparent は FastA2AClient がヘッダーと metadata に付与する
+        async with http_session() as http_client:
+            client = FastA2AClient(agent_card=agent_card, http_client=http_client)
+            with start_span("ui.stream_task", {"a2a.task_id": task_id, "a2a.session_id": session_id}):
+                async for response in client.send_task_streaming(payload):
+                    # response は SendTaskStreamingResponse オブジェクト
+                    # 中身は TaskStatusUpdateEvent, TaskArtifactUpdateEvent, Task のいずれかのはず
+                    # client.py を見ると、SSE の data を SendTaskStreamingResponse でラップしている
+                    # SendTaskStreamingResponse は result フィールドを持つ
+                    if response and response.error:
+                        if received_events == 0 and response.error.code in STREAMING_UNSUPPORTED_CODES:
+                            raise StreamingUnavailableError(response.error.message)
+                        logging.error(f"Agent returned an error while streaming task {task_id}: {response.error.message}")
+                        await update_callback({"event_type": "error", "message": response.error.message})
+                        return
+                    if response and response.result:
+                        received_events += 1
+                        event = response.result # result が実際のイベントデータ (Task, TaskStatusUpdateEvent など)
+                        event_dict = event.model_dump(mode='json') # イベントデータを辞書化
+
+                        # a2a_types を使用して型チェック
+                        if isinstance(event, a2a_types.TaskStatusUpdateEvent):
+                            logging.info(f"Task {task_id} Status Update: {event.status.state} - {event.status.message}") # status オブジェクト経由でアクセス
+                            await update_callback({"event_type": "status_update", **event_dict})
+                        elif isinstance(event, a2a_types.TaskArtifactUpdateEvent):
+                            logging.info(f"Task {task_id} Artifact Update: {event.artifact.name if event.artifact else 'N/A'}") # artifact オブジェクト経由
+                            await update_callback({"event_type": "artifact_update", **event_dict})
+                        elif isinstance(event, a2a_types.Task): # ストリームの最後はTaskオブジェクト
+                            logging.info(f"Task {task_id} Final Result Received: State={event.status.state}") # status オブジェクト経由
+                            final_task_result = event
+                            # コールバックにも最終結果を送る (一貫性のため)
+                            await update_callback({"event_type": "final_result", **event_dict})
+                        else:
+                             logging.warning(f"Received unknown event type in stream: {type(event)}")
+                             await update_callback({"event_type": "unknown", **event_dict})
+                    else:
+                        logging.warning(f"Received empty or invalid response in stream for task {task_id}: {response}")
 
+    except StreamingUnavailableError:
+        raise
+    except (SSEError, a2a_types.A2AClientHTTPError) as e:
+        # SSE ではない応答 (プロキシがストリームを通さない、エンドポイントが JSON で返すなど)
+        # FastA2AClient は (A2AClient と同じく) SSEError を A2AClientHTTPError に包んで送出する
+        sse_error = e if isinstance(e, SSEError) else e.__cause__
+        if received_events == 0 and isinstance(sse_error, SSEError):
+            raise StreamingUnavailableError(str(sse_error)) from e
+        logging.error(f"Error during streaming task {task_id}: {e}")
+        await update_callback({"event_type": "error", "message": f"Stream error: {e}"})
     except httpx.RequestError as e:
+        if isinstance(e, httpx.ConnectError) and received_events == 0:
+            raise # 接続できず何も送信していないので、呼び出し側が別のレプリカへ送り直せる
         logging.error(f"HTTP request error during streaming task {task_id}: {e}")
         await update_callback({"event_type": "error", "message": f"HTTP request error: {e}"})
     except Exception as e:
@@ -219,6 +287,76 @@ async def stream_a2a_task(agent_card_dict: Dict[str, Any], message_parts_dicts:
          # await update_callback({"event_type": "error", "message": "Streaming finished without final result."})
 
 
+async def poll_a2a_task(agent_card_dict: Dict[str, Any], message_parts_dicts: List[Dict[str, Any]], task_id: str, session_id: str, update_callback: callable):
+    """
+    A2Aタスクを非ブロッキングで送信し、tasks/get のポーリングで進捗を受け取る (ストリーミング非対応エージェント用)。
+
+    状態が変わるたびに status_update を、終了 (または入力待ち) で final_result を update_callback に渡す
+    (stream_a2a_task と同じイベント形式)。ポーリング間隔は状態が変わった直後は短く、
+    変化がない間は POLL_MAX_INTERVAL まで指数的に延ばす。metadata.blocking=false を解釈しない
+    エージェントは完了済みのタスクを返すので、その場合はポーリングせずに終わる。
+    最初の送信で接続できなかった場合は httpx.ConnectError を送出する (stream_a2a_task と同じ)。
+    """
+    submitted = False
+    try:
+        agent_card = get_agent_card_model(agent_card_dict)
+
+        payload = _build_task_params(message_parts_dicts, task_id, session_id)
+        if payload is None:
+            logging.error("No valid message parts to send.")
+            await update_callback({"event_type": "error", "message": "No valid message parts."})
+            return
+        payload.metadata = {**(payload.metadata or {}), "blocking": False}
+
+        # ポーリング中は同じコネクションを使い回す
+        async with http_session() as http_client:
+            client = FastA2AClient(agent_card=agent_card, http_client=http_client)
+            logging.info(f"Sending task {task_id} (session: {session_id}) to {agent_card.url} and polling for the result")
+            with start_span("ui.poll_task", {"a2a.task_id": task_id, "a2a.session_id": session_id}) as span:
+                response = await client.send_task(payload)
+                submitted = True
+                interval = POLL_INITIAL_INTERVAL
+                deadline = time.monotonic() + POLL_TIMEOUT
+                last_state = None
+                polls = 0
+                while True:
+                    if response.error:
+                        logging.error(f"Agent returned an error for task {task_id}: {response.error.message}")
+                        await update_callback({"event_type": "error", "message": response.error.message})
+                        return
+                    task: a2a_types.Task = response.result
+                    state = task.status.state.value
+                    if state != last_state:
+                        logging.info(f"Task {task_id} Status Update: {state}")
+                        await update_callback({"event_type": "status_update", "id": task_id,
+                                               "status": task.status.model_dump(mode='json'), "final": False})
+                        last_state = state
+                        interval = POLL_INITIAL_INTERVAL # 動きがあった直後は短い間隔に戻す
+                    if state in POLL_STOP_STATES:
+                        if span is not None:
+                            span.set_attribute("ui.poll_count", polls)
+                        logging.info(f"Task {task_id} Final Result Received: State={state} ({polls} polls)")
+                        await update_callback({"event_type": "final_result", **task.model_dump(mode='json')})
+                        return
+                    if time.monotonic() >= deadline:
+                        logging.error(f"Task {task_id} did not finish within {POLL_TIMEOUT}s")
+                        await update_callback({"event_type": "error", "message": f"Task did not finish within {POLL_TIMEOUT}s (last state: {state})"})
+                        return
+                    await asyncio.sleep(interval)
+                    interval = min(interval * POLL_BACKOFF_FACTOR, POLL_MAX_INTERVAL)
+                    polls += 1
+                    # 履歴は不要なので historyLength=0 で応答を小さくする
+                    response = await client.get_task(a2a_types.TaskQueryParams(id=task_id, historyLength=0))
+    except httpx.RequestError as e:
+        if isinstance(e, httpx.ConnectError) and not submitted:
+            raise
+        logging.error(f"HTTP request error while polling task {task_id}: {e}")
+        await update_callback({"event_type": "error", "message": f"HTTP request error: {e}"})
+    except Exception as e:
+        logging.error(f"An unexpected error occurred while polling task {task_id}: {e}")
+        await update_callback({"event_type": "error", "message": f"An unexpected error occurred: {e}"})
+
+
 # --- ヘルパー関数 ---
 def create_text_part(content: str) -> Dict[str, Any]:
     """TextPartの辞書表現を作成する"""
@@ -230,9 +368,55 @@ def create_text_part(content: str) -> Dict[str, Any]:
          # ダミー辞書も 'text' フィールドを使うように修正 (一貫性のため)
          return {"type": "text", "text": content}
 
-# def create_file_part(content: bytes, mime_type: str, filename: Optional[str] = None) -> Dict[str, Any]:
-#     """FilePartを作成する (Step 6)"""
-#     import base64
-#     encoded_content = base64.b64encode(content).decode('utf-8')
-#     # return FilePart(content=encoded_content, mime_type=mime_type, filename=filename).model_dump(mode='json') # google_a2aインポート成功時
-#     return {"type": "file", "content": encoded_content, "mime_type": mime_type, "filename": filename}
\ No newline at end of file
+def _encode_base64_chunked(fileobj: BinaryIO) -> str:
+    """ファイルを BASE64_ENCODE_CHUNK バイトずつ読み、チャンク単位で base64 エンコードする"""
+    encoded_chunks: List[str] = []
+    while True:
+        data = fileobj.read(BASE64_ENCODE_CHUNK)
+        if not data:
+            break
+        encoded_chunks.append(base64.b64encode(data).decode("ascii"))
+    return "".join(encoded_chunks)
+
+async def _iter_file_chunks(fileobj: BinaryIO) -> AsyncIterator[bytes]:
+    """アップロード用にファイルを UPLOAD_CHUNK_SIZE ずつ読み出す"""
+    while True:
+        chunk = fileobj.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+async def upload_file(agent_url: str, fileobj: BinaryIO, filename: Optional[str], mime_type: Optional[str]) -> str:
+    """
+    エージェントの /files エンドポイントへファイルをチャンク転送でアップロードし、FilePart 用の URI を返す。
+
+    ファイル全体をメモリに読み込まず、UPLOAD_CHUNK_SIZE ずつ送信する。
+    """
+    upload_url = agent_url.rstrip("/") + "/files"
+    headers = {
+        "Content-Type": mime_type or "application/octet-stream",
+        "X-File-Name": quote(filename or ""), # 日本語ファイル名のため URL エンコード
+    }
+    if FILE_UPLOAD_TOKEN:
+        headers["Authorization"] = f"Bearer {FILE_UPLOAD_TOKEN}"
+    async with http_session() as client:
+        response = await client.post(upload_url, content=_iter_file_chunks(fileobj), headers=headers)
+        response.raise_for_status()
+        uri = response.json()["uri"]
+    logging.info(f"Uploaded file {filename} to {uri}")
+    return uri
+
+async def create_file_part(agent_url: str, fileobj: BinaryIO, size: int, mime_type: Optional[str], filename: Optional[str] = None) -> Dict[str, Any]:
+    """
+    FilePartの辞書表現を作成する。
+
+    INLINE_FILE_LIMIT 以下のファイルは base64 でインライン化し、
+    それより大きいファイルはエージェントへアップロードして URI で参照する
+    (base64 によるサイズ増加と、JSON ボディ全体をメモリに載せることを避けるため)。
+    """
+    if size <= INLINE_FILE_LIMIT:
+        file_content = a2a_types.FileContent(name=filename, mimeType=mime_type, bytes=_encode_base64_chunked(fileobj))
+    else:
+        uri = await upload_file(agent_url, fileobj, filename, mime_type)
+        file_content = a2a_types.FileContent(name=filename, mimeType=mime_type, uri=uri)
+    return a2a_types.FilePart(file=file_content).model_dump(mode='json', exclude_none=True)
@@ -0,0 +1,130 @@
+import json
+import streamlit as st
+from typing import Dict, Any, List, Tuple
+from state_manager import HISTORY_PAGE_SIZE, chat_history_length, get_chat_messages, get_artifact_content, get_artifact_text
+
+# --- 描画パラメータ ---
+LIVE_MESSAGE_COUNT = 6 # チャットバブルとして個別に描画する直近メッセージ数
+STATUS_LOG_TAIL = 10 # 折りたたみログに表示するステータス更新の最大件数
+
+
+def _message_line(message: Dict[str, Any]) -> str:
+    """1メッセージを簡易トランスクリプトの1行 (Markdown) に変換する"""
+    role = "🧑 **User**" if message.get("role") == "user" else "🤖 **Assistant**"
+    return f"{role}: {message.get('content', '')}"
+
+
+def _get_transcript(start: int, end: int) -> str:
+    """
+    履歴の [start, end) 区間を1つのMarkdown文字列にまとめる。
+
+    チャット履歴は追記のみで過去のメッセージは変更されないため、
+    区間ごとの結果をセッション状態にキャッシュし、再実行のたびに組み立て直さない
+    (ディスクへ退避済みの区間もキャッシュが有効な間は読み直さない)。
+    """
+    cache: Dict[Tuple[int, int], str] = st.session_state.setdefault("transcript_cache", {})
+    key = (start, end)
+    if key not in cache:
+        cache.clear() # 区間が変わったら古いキャッシュは不要
+        cache[key] = "\n\n".join(_message_line(m) for m in get_chat_messages(start, end))
+    return cache[key]
+
+
+def _load_more_history():
+    """表示ウィンドウを1ページ分広げる"""
+    st.session_state.history_window += HISTORY_PAGE_SIZE
+
+
+@st.fragment
+def render_chat_history():
+    """
+    チャット履歴をウィンドウ表示する。
+
+    直近 LIVE_MESSAGE_COUNT 件のみをチャットバブルとして描画し、それより前の
+    ウィンドウ内メッセージはキャッシュ済みのトランスクリプト1要素にまとめる。
+    「さらに読み込む」はフラグメント内だけを再実行するため、ページ全体は再描画されない。
+    """
+    total = chat_history_length()
+    window = st.session_state.history_window
+    start = max(0, total - window)
+    live_start = max(start, total - LIVE_MESSAGE_COUNT)
+
+    if start > 0:
+        # on_click はフラグメント再実行の前に呼ばれるため、押下直後の描画に反映される
+        st.button(f"Load older messages ({start} more)", key="load_more_history", on_click=_load_more_history)
+
+    if live_start > start:
+        with st.expander(f"Earlier messages ({live_start - start})", expanded=False):
+            st.markdown(_get_transcript(start, live_start))
+
+    for message in get_chat_messages(live_start, total):
+        with st.chat_message(message["role"]):
+            st.markdown(message["content"])
+            # TODO: アーティファクト表示 (Step 4, 6)
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def _format_json_content(content: str) -> Any:
+    """JSON文字列のパース結果をキャッシュする (同じアーティファクトを毎回パースしない)"""
+    return json.loads(content)
+
+
+def render_status_updates(status_updates: List[Dict[str, Any]], spilled_count: int = 0):
+    """ステータス更新は最新の1件のみ表示し、それ以前は件数を絞って折りたたむ"""
+    if not status_updates:
+        st.caption("No status updates yet.")
+        return
+
+    def _line(update: Dict[str, Any]) -> str:
+        ts = update.get('timestamp', '') # ISO 8601形式など
+        state = update.get('state', 'UNKNOWN')
+        msg = update.get('status_message', '')
+        return f"{ts} - **{state}**: {msg}"
+
+    st.caption(_line(status_updates[-1]))
+    older = status_updates[:-1]
+    if older:
+        with st.expander(f"Earlier status updates ({spilled_count + len(older)})", expanded=False):
+            hidden = spilled_count + len(older) - STATUS_LOG_TAIL
+            if hidden > 0:
+                st.caption(f"... {hidden} older updates omitted")
+            st.caption("  \n".join(_line(u) for u in older[-STATUS_LOG_TAIL:]))
+
+
+def render_artifacts(artifacts: Dict[int, Dict[str, Any]], spilled_count: int = 0):
+    """アーティファクト一覧を表示する"""
+    if not artifacts:
+        st.caption("No artifacts received yet.")
+        return
+
+    if spilled_count:
+        st.caption(f"... {spilled_count} older artifacts moved to disk")
+
+    for i, artifact in artifacts.items():
+        artifact_id = artifact.get('artifact_id', 'N/A')
+        artifact_type = artifact.get('type', 'unknown')
+        st.caption(f"ID: {artifact_id} (Type: {artifact_type})" + ("" if artifact.get('complete') else " - receiving..."))
+        if artifact_type == 'text' and not artifact.get('complete'):
+            st.text(get_artifact_text(artifact))
+            continue
+        if artifact.get('content_ref'):
+            # ディスクへ退避済みの大きな本体は、明示的に要求されたときだけ読み込む
+            if not st.checkbox(f"Load content ({artifact.get('content_size', 0) // 1024} KiB)", key=f"load_artifact_{i}_{artifact['content_ref']}"):
+                continue
+        # コンテンツタイプに応じて表示を変える
+        content = get_artifact_content(artifact)
+        mime_type = artifact.get('mime_type')
+        if artifact_type == 'text':
+            st.text(content)
+        elif artifact_type == 'file' and mime_type and mime_type.startswith('image/'):
+             # TODO: Base64デコードして画像表示 (Step 6)
+             st.caption(f"[Image file: {artifact.get('filename', artifact_id)} - content omitted]")
+        elif artifact_type == 'file':
+             # TODO: Base64デコードしてダウンロードリンク (Step 6)
+             st.caption(f"[File: {artifact.get('filename', artifact_id)} - content omitted]")
+        else:
+            # JSONなどで表示試行
+            try:
+                st.json(content if isinstance(content, (dict, list)) else _format_json_content(content))
+            except Exception:
+                st.text(str(content)) # そのまま表示
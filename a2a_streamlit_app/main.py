@@ -5,13 +5,15 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 import streamlit as st
-from state_manager import initialize_session_state
+from state_manager import initialize_session_state, append_chat_message, append_status_update, apply_artifact_update, get_artifact_text, reset_task_progress, get_session_memory_usage
 import uuid
 import asyncio
+import time
 import nest_asyncio # Streamlit環境でasyncio.runを使うために必要
-from a2a_client_utils import get_agent_card, send_a2a_task, stream_a2a_task, create_text_part # Agent Card取得, タスク送信/ストリーミング関数
+from a2a_client_utils import get_agent_card, get_replica_pool, create_text_part, create_file_part # Agent Card取得, レプリカプール, メッセージパート作成
+from transport import run_a2a_task, resolve_agent_url, select_transport # エージェントごとに SSE / ポーリングを選んでタスクを送信
+from chat_view import render_chat_history, render_status_updates, render_artifacts # チャット履歴・進捗の描画
 from typing import Dict, Any, Optional, List
-import json # アーティファクト表示用
 
 # nest_asyncioを適用
 nest_asyncio.apply()
@@ -33,7 +35,8 @@ def fetch_agent_card_sync(url: str) -> Optional[Dict[str, Any]]:
 st.sidebar.title("A2A Server Management")
 
 # サーバーURL入力
-new_server_url = st.sidebar.text_input("Enter A2A Server URL:", key="new_server_url_input")
+# 同じエージェントのレプリカはカンマ区切りで1つのエージェントとして登録できる (クライアント側で負荷分散)
+new_server_url = st.sidebar.text_input("Enter A2A Server URL (comma-separated for replicas):", key="new_server_url_input")
 
 # サーバー追加ボタン
 if st.sidebar.button("Add Server"):
@@ -92,6 +95,14 @@ if st.session_state.server_urls:
         progress_bar.progress((i + 1) / len(st.session_state.server_urls))
     st.sidebar.success("Agent Card fetching complete.")
 
+# --- セッションのメモリ使用量 ---
+with st.sidebar.expander("Session Memory", expanded=False):
+    memory_usage = get_session_memory_usage()
+    st.caption(f"In memory: {memory_usage['total_in_memory'] / 1024:.1f} KiB")
+    st.caption(f"Spilled to disk: {memory_usage['spilled_on_disk'] / 1024:.1f} KiB")
+    for key in ("chat_history", "task_status_updates", "task_artifacts", "agent_cards"):
+        st.caption(f"  - {key}: {memory_usage[key] / 1024:.1f} KiB")
+
 
 # --- メインエリア ---
 st.title("A2A Chat Application")
@@ -145,6 +156,12 @@ if st.session_state.selected_agent_url and st.session_state.selected_agent_url i
             st.markdown(f"  - Streaming: {'✅' if caps.get('streaming') else '❌'}")
             st.markdown(f"  - Push Notifications: {'✅' if caps.get('pushNotifications') else '❌'}")
             st.markdown(f"  - State History: {'✅' if caps.get('stateTransitionHistory') else '❌'}")
+            st.markdown(f"**Transport:** {select_transport(selected_card)}")
+            replica_pool = get_replica_pool(st.session_state.selected_agent_url)
+            if replica_pool is not None:
+                st.markdown(f"**Replicas:**")
+                for replica in replica_pool.stats():
+                    st.markdown(f"  - {replica['url']}: {replica['outstanding']} in flight, {replica['requests']} sent{' (ejected)' if replica['ejected'] else ''}")
             skills = selected_card.get('skills', [])
             if skills:
                 st.markdown(f"**Skills:**")
@@ -160,128 +177,101 @@ if st.session_state.selected_agent_url and st.session_state.selected_agent_url i
 st.subheader("Chat History")
 chat_container = st.container(height=400) # 高さを固定してスクロール可能に
 with chat_container:
-    for message in st.session_state.chat_history:
-        with st.chat_message(message["role"]):
-            st.markdown(message["content"])
-            # TODO: アーティファクト表示 (Step 4, 6)
+    render_chat_history() # 直近のウィンドウのみ描画 (chat_view.py)
 
 # 中間レスポンス表示エリア (Expander)
 st.subheader("Task Progress")
 progress_expander = st.expander("Show intermediate responses", expanded=False)
 with progress_expander:
     st.write("**Status Updates:**")
-    if st.session_state.task_status_updates:
-        for update in st.session_state.task_status_updates:
-             ts = update.get('timestamp', '') # ISO 8601形式など
-             state = update.get('state', 'UNKNOWN')
-             msg = update.get('status_message', '')
-             st.caption(f"{ts} - **{state}**: {msg}")
-    else:
-        st.caption("No status updates yet.")
+    render_status_updates(st.session_state.task_status_updates, st.session_state.spill_store.count("task_status_updates"))
 
     st.write("**Artifacts:**")
-    if st.session_state.task_artifacts:
-        for artifact in st.session_state.task_artifacts:
-            artifact_id = artifact.get('artifact_id', 'N/A')
-            artifact_type = artifact.get('type', 'unknown')
-            st.caption(f"ID: {artifact_id} (Type: {artifact_type})")
-            # コンテンツタイプに応じて表示を変える
-            content = artifact.get('content')
-            mime_type = artifact.get('mime_type')
-            if artifact_type == 'text':
-                st.text(content)
-            elif artifact_type == 'file' and mime_type and mime_type.startswith('image/'):
-                 # TODO: Base64デコードして画像表示 (Step 6)
-                 st.caption(f"[Image file: {artifact.get('filename', artifact_id)} - content omitted]")
-            elif artifact_type == 'file':
-                 # TODO: Base64デコードしてダウンロードリンク (Step 6)
-                 st.caption(f"[File: {artifact.get('filename', artifact_id)} - content omitted]")
-            else:
-                # JSONなどで表示試行
-                try:
-                    st.json(content if isinstance(content, (dict, list)) else json.loads(content))
-                except:
-                    st.text(str(content)) # そのまま表示
-    else:
-        st.caption("No artifacts received yet.")
+    render_artifacts(st.session_state.task_artifacts, st.session_state.spill_store.count("task_artifacts"))
 
 
 # --- UI更新コールバック ---
-# stream_a2a_task からのイベントを受け取り、セッション状態を更新する
-# Streamlitの制約上、コールバック内で直接UI要素を更新するのは難しいため、
-# st.session_state を更新し、st.rerun() で再描画をトリガーする方式をとる
-def update_ui_callback(event_data: Dict[str, Any]):
+# run_a2a_task (SSE / ポーリング) からのイベントを受け取り、セッション状態を更新する
+# イベントごとに st.rerun() するとストリームが中断され、受信済みの内容も毎回全て再描画されるため、
+# コールバックではセッション状態の更新と途中経過のプレースホルダー更新のみ行い、タスク終了後に1度だけ再描画する
+LIVE_RENDER_INTERVAL = 0.1 # 途中経過の再描画の最短間隔 (秒)。トークン単位のイベントごとには描画しない
+live_placeholder = None # 実行中タスクの途中経過を表示する st.empty() (送信時に作成)
+_last_live_render = 0.0
+
+def _render_live_progress(state: Optional[str] = None):
+    """受信中の応答テキスト (なければ現在の状態) をプレースホルダーに描画する (LIVE_RENDER_INTERVAL ごとに間引く)"""
+    global _last_live_render
+    now = time.monotonic()
+    if live_placeholder is None or now - _last_live_render < LIVE_RENDER_INTERVAL:
+        return
+    _last_live_render = now
+    text = "".join(get_artifact_text(artifact) for artifact in st.session_state.task_artifacts.values() if artifact.get("type") == "text")
+    live_placeholder.markdown(text or f"_{state or 'working'}..._")
+
+def _parts_text(parts: Optional[List[Dict[str, Any]]]) -> str:
+    """メッセージパートのリストからテキストを連結する"""
+    return "\n".join(part.get("text", "") for part in parts or [] if part.get("type") == "text")
+
+async def update_ui_callback(event_data: Dict[str, Any]):
     """ストリーミングイベントを受け取り、セッション状態を更新するコールバック"""
     event_type = event_data.get("event_type")
-    task_id = event_data.get("task_id")
+    task_id = event_data.get("id") # TaskStatusUpdateEvent / TaskArtifactUpdateEvent の id はタスクID
 
-    # 現在のタスクIDと一致するか確認 (古いタスクのイベントを無視)
-    if task_id != st.session_state.current_task_id:
+    # 現在のタスクIDと一致するか確認 (古いタスクのイベントを無視、エラーイベントはIDを持たない)
+    if event_type != "error" and task_id != st.session_state.current_task_id:
         print(f"Ignoring event for old task {task_id} (current: {st.session_state.current_task_id})")
         return
 
     if event_type == "status_update":
-        st.session_state.task_status_updates.append(event_data)
+        status = event_data.get("status") or {}
+        state = status.get("state")
+        status_message = _parts_text((status.get("message") or {}).get("parts"))
+        append_status_update({"timestamp": status.get("timestamp", ""), "state": state, "status_message": status_message})
         # HIL状態の更新
-        if event_data.get("state") == "INPUT_REQUIRED":
+        if state == "input-required":
             st.session_state.input_required = True
-            st.session_state.input_prompt = event_data.get("status_message", "Agent requires input.") # status_messageをプロンプトとして使う
+            st.session_state.input_prompt = status_message or "Agent requires input." # status_messageをプロンプトとして使う
         else:
             # INPUT_REQUIREDでなくなった場合はフラグをリセット
-             if st.session_state.input_required and event_data.get("state") != "INPUT_REQUIRED":
+             if st.session_state.input_required:
                  st.session_state.input_required = False
                  st.session_state.input_prompt = None
+        _render_live_progress(state)
+        if event_data.get("final"):
+            # 最終ステータス: 応答本文はアーティファクトとして受信済みなので、それを履歴に追加する
+            assistant_response = status_message or "\n".join(
+                get_artifact_text(artifact) for artifact in st.session_state.task_artifacts.values() if artifact.get("type") == "text")
+            if not assistant_response:
+                assistant_response = f"Agent finished task {task_id} with state: {state}"
+            append_chat_message("assistant", assistant_response.strip())
 
     elif event_type == "artifact_update":
-        # 同じIDのアーティファクトがあれば更新、なければ追加
-        artifact_id = event_data.get("artifact_id")
-        found = False
-        for i, existing_artifact in enumerate(st.session_state.task_artifacts):
-            if existing_artifact.get("artifact_id") == artifact_id:
-                st.session_state.task_artifacts[i] = event_data
-                found = True
-                break
-        if not found:
-            st.session_state.task_artifacts.append(event_data)
+        # Artifact index をキーにしたインデックスへ反映 (append チャンクは O(1) で追加)
+        apply_artifact_update(event_data.get("artifact") or {})
+        _render_live_progress()
 
     elif event_type == "final_result":
         # 最終結果をチャット履歴に追加
-        assistant_response = ""
-        if event_data.get("output"):
-            for part in event_data["output"]:
-                if part.get("type") == "text":
-                    assistant_response += part.get("content", "") + "\n"
+        assistant_response = _parts_text((event_data.get("status", {}).get("message") or {}).get("parts"))
+        for artifact in event_data.get("artifacts") or []:
+            apply_artifact_update(artifact)
         if not assistant_response:
-             assistant_response = f"Agent finished task {event_data.get('task_id')} with state: {event_data.get('state', 'Unknown')}"
-        st.session_state.chat_history.append({"role": "assistant", "content": assistant_response.strip()})
-        # HIL状態の最終確認
-        if event_data.get("state") == "INPUT_REQUIRED":
-             st.session_state.input_required = True
-             st.session_state.input_prompt = assistant_response.strip() # outputをプロンプトとして使う
-        else:
-             st.session_state.input_required = False
-             st.session_state.input_prompt = None
+             assistant_response = f"Agent finished task {task_id} with state: {event_data.get('status', {}).get('state', 'Unknown')}"
+        append_chat_message("assistant", assistant_response.strip())
+        # ポーリング・ブロッキング送信でも入力待ちで止まったタスクは HIL 入力を表示する (応答は同じタスクIDで再開される)
+        st.session_state.input_required = event_data.get("status", {}).get("state") == "input-required"
+        st.session_state.input_prompt = assistant_response.strip() if st.session_state.input_required else None
 
     elif event_type == "error":
         st.error(f"Streaming Error: {event_data.get('message', 'Unknown error')}")
         # エラーメッセージをチャット履歴にも追加する？
-        # st.session_state.chat_history.append({"role": "assistant", "content": f"Error: {event_data.get('message')}"})
-
-    # UIを再描画して変更を反映させる
-    # コールバックは別スレッドで実行される可能性があるため、st.rerun()が安全か要検討
-    # 代わりに、メインスレッドで定期的にチェックするか、st.experimental_rerun() を使う？
-    # ここではシンプルに st.rerun() を試す
-    try:
-        st.rerun()
-    except Exception as e:
-        # st.rerun() が別スレッドから呼ばれるとエラーになることがある
-        print(f"Error calling st.rerun from callback: {e}")
-        # 代替策としてフラグを立ててメインループで再実行させるなどが必要かも
-        pass
+        # append_chat_message("assistant", f"Error: {event_data.get('message')}")
 
 
 # チャット入力エリア
 st.subheader("Send Message")
+# 添付ファイル (次のメッセージと一緒に送信。大きいファイルはエージェントへアップロードしてURI参照)
+uploaded_file = st.file_uploader("Attach File (Optional)", key=f"file_uploader_{st.session_state.file_uploader_key}")
 user_input = st.chat_input("Enter your message...", key="chat_input", disabled=st.session_state.input_required) # HIL中は無効化
 
 # 送信ボタン (chat_inputを使う場合は不要だが、HILのために別途配置する可能性も考慮)
@@ -293,10 +283,11 @@ if user_input and st.session_state.selected_agent_url:
     print(f"DEBUG: Sending message. user_input='{user_input}', selected_agent_url='{st.session_state.selected_agent_url}'")
 
     # ユーザーメッセージを履歴に追加
-    st.session_state.chat_history.append({"role": "user", "content": user_input})
+    user_content = user_input + (f"\n\n📎 {uploaded_file.name}" if uploaded_file else "")
+    append_chat_message("user", user_content)
     with chat_container:
          with st.chat_message("user"):
-            st.markdown(user_input)
+            st.markdown(user_content)
 
     # セッションIDがなければ生成
     if not st.session_state.current_session_id:
@@ -308,8 +299,7 @@ if user_input and st.session_state.selected_agent_url:
     st.info(f"Sending task (ID: {st.session_state.current_task_id}) to {st.session_state.selected_agent_url}...")
 
     # 中間レスポンス表示エリアをクリア
-    st.session_state.task_status_updates = []
-    st.session_state.task_artifacts = []
+    reset_task_progress()
     # HIL状態もリセット
     st.session_state.input_required = False
     st.session_state.input_prompt = None
@@ -335,101 +325,40 @@ if user_input and st.session_state.selected_agent_url:
 
                 # メッセージパートを作成
                 message_parts = [create_text_part(user_input)]
-
-                # ストリーミングをサポートしているか確認
-                supports_streaming = agent_card_dict.get('supports_streaming', False)
-
-                if supports_streaming:
-                    print(f"DEBUG: Calling stream_a2a_task with URL: {selected_url}") # デバッグログ
-                    try:
-                        # ストリーミング実行 (Pass the correct URL explicitly)
-                        # Note: stream_a2a_task might need adjustment to accept url directly
-                        # For now, assume it uses agent_card_dict['url'], let's ensure it's correct
-                        if "localhost" in agent_card_dict.get("url", ""):
-                             logger.warning(f"Agent card URL contains localhost: {agent_card_dict.get('url')}. Using selected URL: {selected_url}")
-                             # We should ideally modify stream_a2a_task to accept url or use the client correctly
-                             # Temporary fix: update the dict (might not be ideal)
-                             # agent_card_dict['url'] = selected_url # This might break caching if dict is modified
-
-                        # Let's modify a2a_client_utils.py instead to prioritize selected_url if provided
-                        # For now, proceed assuming the client init inside uses the correct URL from agent_card
-
-                        asyncio.run(
-                            stream_a2a_task(
-                                agent_card_dict=agent_card_dict, # Pass the potentially corrected card
-                                message_parts_dicts=message_parts,
-                                task_id=st.session_state.current_task_id,
-                                session_id=st.session_state.current_session_id,
-                                update_callback=update_ui_callback
-                            )
-                        )
-                    except Exception as e_stream:
-                         print(f"ERROR in asyncio.run(stream_a2a_task): {e_stream}") # エラーログ
-                         st.error(f"Error during streaming: {e_stream}")
-
-                else:
-                    print(f"DEBUG: Calling send_a2a_task with URL: {selected_url}") # デバッグログ
-                    try:
-                        # 非ストリーミング実行 (Ensure correct URL is used)
-                        if "localhost" in agent_card_dict.get("url", ""):
-                             logger.warning(f"Agent card URL contains localhost: {agent_card_dict.get('url')}. Using selected URL: {selected_url}")
-                             # Ideally modify send_a2a_task or ensure client uses correct URL
-                             # agent_card_dict['url'] = selected_url # Temp fix
-
-                        task_result_dict: Optional[Dict[str, Any]] = asyncio.run(
-                            send_a2a_task(
-                                agent_card_dict=agent_card_dict, # Pass potentially corrected card
-                                message_parts_dicts=message_parts,
-                                task_id=st.session_state.current_task_id,
-                                session_id=st.session_state.current_session_id
-                            )
+                if uploaded_file:
+                    uploaded_file.seek(0)
+                    message_parts.append(asyncio.run(create_file_part(
+                        # レプリカプールの場合はタスクと同じレプリカへアップロードする
+                        agent_url=resolve_agent_url(selected_url, agent_card_dict, st.session_state.current_task_id, st.session_state.current_session_id),
+                        fileobj=uploaded_file,
+                        size=uploaded_file.size,
+                        mime_type=uploaded_file.type,
+                        filename=uploaded_file.name,
+                    )))
+                    # 送信後は添付をクリア (キーを変えて新しいウィジェットにする)
+                    st.session_state.file_uploader_key += 1
+
+                # エージェントの capabilities に応じて SSE またはポーリングで送信し、途中経過を表示する
+                transport = select_transport(agent_card_dict)
+                logger.debug(f"Running task via {transport} with URL: {selected_url}")
+                try:
+                    with chat_container:
+                        live_placeholder = st.chat_message("assistant").empty()
+                    asyncio.run(
+                        run_a2a_task(
+                            agent_card_dict=agent_card_dict,
+                            message_parts_dicts=message_parts,
+                            task_id=st.session_state.current_task_id,
+                            session_id=st.session_state.current_session_id,
+                            update_callback=update_ui_callback,
+                            server_url=selected_url
                         )
-                        if task_result_dict:
-                            assistant_response = ""
-                            # output フィールドからテキスト応答を抽出
-                            if task_result_dict.get("output"):
-                                for part in task_result_dict["output"]:
-                                    if part.get("type") == "text":
-                                        # TextPart のフィールド名は 'text'
-                                        assistant_response += part.get("text", "") + "\n"
-                            # output がない場合、status.message から応答を抽出
-                            if not assistant_response:
-                                status = task_result_dict.get("status")
-                                if status and status.get("message") and status["message"].get("parts"):
-                                    for part in status["message"]["parts"]:
-                                        if part.get("type") == "text":
-                                            assistant_response += part.get("text", "") + "\n"
-
-                            # それでも応答がない場合、ステータスを表示
-                            if not assistant_response:
-                                state = task_result_dict.get("status", {}).get("state", "Unknown")
-                                assistant_response = f"Agent finished task {task_result_dict.get('task_id')} with state: {state}"
-
-                            st.session_state.chat_history.append({"role": "assistant", "content": assistant_response.strip()})
-
-                            # HIL状態の確認 (status.state を参照)
-                            if task_result_dict.get("status", {}).get("state") == "INPUT_REQUIRED":
-                                st.session_state.input_required = True
-                                # プロンプトは status.message から取るのが適切かもしれない
-                                prompt_from_status = ""
-                                status = task_result_dict.get("status")
-                                if status and status.get("message") and status["message"].get("parts"):
-                                    for part in status["message"]["parts"]:
-                                        if part.get("type") == "text":
-                                            prompt_from_status += part.get("text", "") + "\n"
-                                st.session_state.input_prompt = prompt_from_status.strip() or assistant_response.strip() # status.message があれば優先
-                                st.warning("Agent requires further input.")
-                            else:
-                                st.session_state.input_required = False
-                                st.session_state.input_prompt = None
-
-                            # 非ストリーミング完了後、UIを再描画
-                            st.rerun()
-                        else:
-                            st.error("Failed to get response from the agent.")
-                    except Exception as e_send:
-                        print(f"ERROR in asyncio.run(send_a2a_task): {e_send}") # エラーログ
-                        st.error(f"Error sending task: {e_send}")
+                    )
+                    # タスク終了後に1度だけ再描画 (イベントごとには再描画しない)
+                    st.rerun()
+                except Exception as e_run:
+                    logger.exception(f"Error while running task {st.session_state.current_task_id}: {e_run}")
+                    st.error(f"Error while running the task: {e_run}")
 
 
         except Exception as e_outer:
@@ -440,8 +369,7 @@ if user_input and st.session_state.selected_agent_url:
             st.rerun()
 
     # chat_input は自動でクリアされる
-    # ストリーミングの場合、st.rerun() はコールバックに任せる
-    # 非ストリーミングの場合は上で st.rerun() 済み
+    # SSE・ポーリングともに、完了後に上で st.rerun() 済み
 
 elif user_input and not st.session_state.selected_agent_url:
     st.warning("Please select an agent first.")
@@ -457,11 +385,10 @@ if st.session_state.input_required:
             st.info(f"Sending HIL response for task {st.session_state.current_task_id}...")
 
             # HIL応答をユーザーメッセージとして履歴に追加
-            st.session_state.chat_history.append({"role": "user", "content": f"(Response) {hil_input}"})
+            append_chat_message("user", f"(Response) {hil_input}")
 
             # 中間レスポンス表示エリアをクリア (前回のタスクのものを消す)
-            st.session_state.task_status_updates = []
-            st.session_state.task_artifacts = []
+            reset_task_progress()
             # Expanderを開く
             progress_expander.expanded = True
 
@@ -475,57 +402,21 @@ if st.session_state.input_required:
                     else:
                         # HIL応答を含むメッセージパートを作成
                         message_parts = [create_text_part(hil_input)]
-                        supports_streaming = agent_card_dict.get('supports_streaming', False)
-
-                        # HIL応答を同じタスクIDで再送信 (Ensure correct URL)
-                        if "localhost" in agent_card_dict.get("url", ""):
-                             logger.warning(f"HIL: Agent card URL contains localhost: {agent_card_dict.get('url')}. Using selected URL: {selected_url}")
-                             # agent_card_dict['url'] = selected_url # Temp fix
-
-                        if supports_streaming:
-                            asyncio.run(
-                                stream_a2a_task(
-                                    agent_card_dict=agent_card_dict,
-                                    message_parts_dicts=message_parts,
-                                    task_id=st.session_state.current_task_id,
-                                    session_id=st.session_state.current_session_id,
-                                    update_callback=update_ui_callback
-                                )
-                            )
-                        else:
-                            task_result_dict: Optional[Dict[str, Any]] = asyncio.run(
-                                send_a2a_task(
-                                    agent_card_dict=agent_card_dict,
-                                    message_parts_dicts=message_parts,
-                                    task_id=st.session_state.current_task_id,
-                                    session_id=st.session_state.current_session_id
-                                )
+
+                        # HIL応答を同じタスクIDで再送信 (方式はエージェントごとに選択済みのものを使う)
+                        with chat_container:
+                            live_placeholder = st.chat_message("assistant").empty()
+                        asyncio.run(
+                            run_a2a_task(
+                                agent_card_dict=agent_card_dict,
+                                message_parts_dicts=message_parts,
+                                task_id=st.session_state.current_task_id,
+                                session_id=st.session_state.current_session_id,
+                                update_callback=update_ui_callback,
+                                server_url=st.session_state.selected_agent_url
                             )
-                            if task_result_dict:
-                                assistant_response = ""
-                                if task_result_dict.get("output"):
-                                    for part in task_result_dict["output"]:
-                                        if part.get("type") == "text":
-                                            assistant_response += part.get("content", "") + "\n"
-                                if not assistant_response:
-                                     assistant_response = f"Agent finished task {task_result_dict.get('task_id')} with state: {task_result_dict.get('state', 'Unknown')}"
-
-                                st.session_state.chat_history.append({"role": "assistant", "content": assistant_response.strip()})
-
-                                # HIL状態の再確認
-                                if task_result_dict.get("state") == "INPUT_REQUIRED":
-                                    st.session_state.input_required = True
-                                    st.session_state.input_prompt = assistant_response.strip()
-                                    st.warning("Agent requires further input.")
-                                else: # タスク完了 or 別の状態になった
-                                    st.session_state.input_required = False
-                                    st.session_state.input_prompt = None
-                                # UI更新
-                                st.rerun()
-                            else:
-                                st.error("Failed to get response from the agent after HIL.")
-                                # HIL状態は維持して再試行可能にする
-                                st.rerun()
+                        )
+                        st.rerun()
 
                 except Exception as e:
                     st.error(f"An error occurred while sending the HIL response: {e}")
@@ -539,6 +430,3 @@ if st.session_state.input_required:
             st.warning("Please enter your response.")
         else:
              st.error("Cannot send response: Missing Task ID, Agent URL, or Session ID.")
-
-# (オプション) ファイルアップロード (Step 6)
-# uploaded_file = st.file_uploader("Upload File (Optional)", key="file_uploader")
@@ -0,0 +1,146 @@
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 退避先のルートディレクトリ (環境変数で上書き可能)
+DEFAULT_SPILL_DIR = os.environ.get("A2A_SPILL_DIR", os.path.join(tempfile.gettempdir(), "a2a_streamlit_spill"))
+SPILL_TTL_SECONDS = 24 * 60 * 60 # この時間更新のないセッションの退避データは削除対象
+
+
+class SpillStore:
+    """
+    1ブラウザセッション分の退避ストア。
+
+    リスト状の履歴 (チャット履歴など) はストリーム名ごとのJSONLファイルに追記し、
+    各行の開始オフセットだけをメモリに持つ。読み出し時は必要な区間だけを seek して読む。
+    大きなアーティファクト本体は個別のblobファイルとして保存する。
+    """
+
+    def __init__(self, base_dir: str = DEFAULT_SPILL_DIR, session_key: Optional[str] = None):
+        self.session_key = session_key or uuid.uuid4().hex
+        self.dir = Path(base_dir) / self.session_key
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._offsets: Dict[str, List[int]] = {} # ストリーム名 -> 各行の開始オフセット
+
+    def _stream_path(self, stream: str) -> Path:
+        return self.dir / f"{stream}.jsonl"
+
+    def _touch(self):
+        """ディレクトリの更新時刻を進める (既存ファイルへの追記ではディレクトリの mtime は変わらないため)"""
+        try:
+            os.utime(self.dir)
+        except OSError:
+            pass
+
+    def append(self, stream: str, items: List[Dict[str, Any]]):
+        """items をストリーム末尾に追記する"""
+        if not items:
+            return
+        path = self._stream_path(stream)
+        if not path.exists():
+            # 掃除などで消えていた場合は空のストリームから書き直す (古いオフセットは無効)
+            self.dir.mkdir(parents=True, exist_ok=True)
+            self._offsets.pop(stream, None)
+        offsets = self._offsets.setdefault(stream, [])
+        with open(path, "ab") as f:
+            for item in items:
+                offsets.append(f.tell())
+                f.write(json.dumps(item, ensure_ascii=False).encode("utf-8") + b"\n")
+        self._touch()
+
+    def count(self, stream: str) -> int:
+        """ストリームに退避済みの件数"""
+        return len(self._offsets.get(stream, []))
+
+    def load(self, stream: str, start: int, end: int) -> List[Dict[str, Any]]:
+        """ストリームの [start, end) 区間を読み出す"""
+        offsets = self._offsets.get(stream, [])
+        start, end = max(0, start), min(end, len(offsets))
+        if start >= end:
+            return []
+        try:
+            with open(self._stream_path(stream), "rb") as f:
+                f.seek(offsets[start])
+                return [json.loads(f.readline()) for _ in range(end - start)]
+        except FileNotFoundError:
+            # 退避ファイルが失われた場合は空のストリームとして扱う (描画を止めない)
+            logger.warning(f"Spilled stream not found: {stream}")
+            self._offsets.pop(stream, None)
+            return []
+
+    def clear(self, stream: str):
+        """ストリームを空にする"""
+        self._offsets.pop(stream, None)
+        self._stream_path(stream).unlink(missing_ok=True)
+
+    def put_blob(self, content: str) -> str:
+        """大きなコンテンツをblobとして保存し、参照名を返す"""
+        ref = uuid.uuid4().hex
+        self.dir.mkdir(parents=True, exist_ok=True)
+        (self.dir / f"{ref}.blob").write_text(content, encoding="utf-8")
+        self._touch()
+        return ref
+
+    def get_blob(self, ref: str) -> Optional[str]:
+        """blobを読み出す (見つからない場合はNone)"""
+        try:
+            return (self.dir / f"{ref}.blob").read_text(encoding="utf-8")
+        except FileNotFoundError:
+            logger.warning(f"Spilled blob not found: {ref}")
+            return None
+
+    def delete_blob(self, ref: str):
+        (self.dir / f"{ref}.blob").unlink(missing_ok=True)
+
+    def disk_usage(self) -> int:
+        """退避データのディスク使用量 (バイト)"""
+        if not self.dir.is_dir():
+            return 0
+        return sum(p.stat().st_size for p in self.dir.iterdir() if p.is_file())
+
+
+def _last_modified(session_dir: Path) -> float:
+    """ディレクトリとその中のファイルのうち最も新しい更新時刻"""
+    return max([session_dir.stat().st_mtime] + [p.stat().st_mtime for p in session_dir.iterdir() if p.is_file()])
+
+
+def cleanup_stale_spill_dirs(base_dir: str = DEFAULT_SPILL_DIR, ttl_seconds: int = SPILL_TTL_SECONDS):
+    """一定時間更新のないセッションの退避ディレクトリを削除する (ベストエフォート)"""
+    root = Path(base_dir)
+    if not root.is_dir():
+        return
+    now = time.time()
+    for session_dir in root.iterdir():
+        try:
+            if session_dir.is_dir() and now - _last_modified(session_dir) > ttl_seconds:
+                shutil.rmtree(session_dir, ignore_errors=True)
+        except OSError as e:
+            logger.warning(f"Failed to clean up spill directory {session_dir}: {e}")
+
+
+def deep_sizeof(obj: Any) -> int:
+    """コンテナを再帰的にたどったおおよそのメモリ使用量 (バイト)"""
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        o = stack.pop()
+        if id(o) in seen:
+            continue
+        seen.add(id(o))
+        total += sys.getsizeof(o)
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            stack.extend(o)
+    return total
@@ -1,5 +1,13 @@
 import streamlit as st
 from typing import List, Dict, Any, Optional
+from session_store import SpillStore, cleanup_stale_spill_dirs, deep_sizeof
+
+# --- セッション状態の上限 ---
+HISTORY_PAGE_SIZE = 20 # チャット履歴の初期表示件数 / 「さらに読み込む」1回あたりの件数
+MAX_CHAT_HISTORY_IN_MEMORY = 200 # メモリに保持するチャット履歴の最大件数 (超過分はディスクへ退避)
+MAX_STATUS_UPDATES_IN_MEMORY = 100 # メモリに保持するステータス更新の最大件数
+MAX_ARTIFACTS_IN_MEMORY = 50 # メモリに保持するアーティファクトの最大件数
+ARTIFACT_INLINE_LIMIT = 64 * 1024 # これより大きいアーティファクト本体はblobとしてディスクへ退避 (文字数)
 
 def initialize_session_state():
     """Streamlitのセッション状態を初期化する"""
@@ -18,8 +26,156 @@ def initialize_session_state():
     if "task_status_updates" not in st.session_state:
         st.session_state.task_status_updates: List[Dict[str, Any]] = [] # タスクステータス更新履歴
     if "task_artifacts" not in st.session_state:
-        st.session_state.task_artifacts: List[Dict[str, Any]] = [] # タスクアーティファクト更新履歴
+        st.session_state.task_artifacts: Dict[int, Dict[str, Any]] = {} # タスクアーティファクト (Artifact index -> 組み立て中/完了したアーティファクト)
     if "input_required" not in st.session_state:
         st.session_state.input_required: bool = False # HIL入力が必要か
     if "input_prompt" not in st.session_state:
-        st.session_state.input_prompt: Optional[str] = None # HIL入力プロンプト
\ No newline at end of file
+        st.session_state.input_prompt: Optional[str] = None # HIL入力プロンプト
+    if "history_window" not in st.session_state:
+        st.session_state.history_window: int = HISTORY_PAGE_SIZE # チャット履歴の表示件数 (「さらに読み込む」で増加)
+    if "file_uploader_key" not in st.session_state:
+        st.session_state.file_uploader_key: int = 0 # 送信後に添付ファイル欄をクリアするためのキー
+    if "spill_store" not in st.session_state:
+        cleanup_stale_spill_dirs() # 新しいセッションの開始時に古い退避データを掃除
+        st.session_state.spill_store: SpillStore = SpillStore() # 上限を超えた履歴・大きなアーティファクトの退避先
+
+
+# --- 上限付きの追加・参照ヘルパー ---
+def _spill_overflow(key: str, stream: str, limit: int):
+    """st.session_state[key] が limit を超えたら、古い要素から半分をディスクへ退避する"""
+    items: List[Dict[str, Any]] = st.session_state[key]
+    if len(items) <= limit:
+        return
+    # 毎回1件ずつではなくまとめて退避し、追記・リスト詰め直しの回数を減らす
+    n_spill = len(items) - limit // 2
+    st.session_state.spill_store.append(stream, items[:n_spill])
+    del items[:n_spill]
+
+def append_chat_message(role: str, content: str):
+    """チャット履歴にメッセージを追加する (上限超過分はディスクへ退避)"""
+    st.session_state.chat_history.append({"role": role, "content": content})
+    _spill_overflow("chat_history", "chat_history", MAX_CHAT_HISTORY_IN_MEMORY)
+
+def chat_history_length() -> int:
+    """退避済みを含むチャット履歴の総件数"""
+    return st.session_state.spill_store.count("chat_history") + len(st.session_state.chat_history)
+
+def get_chat_messages(start: int, end: int) -> List[Dict[str, Any]]:
+    """チャット履歴の [start, end) 区間を返す (退避済みの部分はディスクから遅延読み込み)"""
+    spilled = st.session_state.spill_store.count("chat_history")
+    messages: List[Dict[str, Any]] = []
+    if start < spilled:
+        messages.extend(st.session_state.spill_store.load("chat_history", start, min(end, spilled)))
+    messages.extend(st.session_state.chat_history[max(0, start - spilled):max(0, end - spilled)])
+    return messages
+
+def append_status_update(update: Dict[str, Any]):
+    """ステータス更新を追加する (上限超過分はディスクへ退避)"""
+    st.session_state.task_status_updates.append(update)
+    _spill_overflow("task_status_updates", "task_status_updates", MAX_STATUS_UPDATES_IN_MEMORY)
+
+def spill_artifact_content(artifact: Dict[str, Any]) -> Dict[str, Any]:
+    """本体が大きいアーティファクトはblobとして退避し、参照だけを持つ辞書を返す"""
+    content = artifact.get("content")
+    if isinstance(content, str) and len(content) > ARTIFACT_INLINE_LIMIT:
+        artifact = {**artifact, "content": None, "content_ref": st.session_state.spill_store.put_blob(content), "content_size": len(content)}
+    return artifact
+
+def _new_artifact_entry(artifact: Dict[str, Any]) -> Dict[str, Any]:
+    """A2A Artifact の最初のチャンクから表示用エントリを作成する"""
+    parts = artifact.get("parts") or []
+    first_part = parts[0] if parts else {}
+    entry = {
+        "artifact_id": artifact.get("name") or str(artifact.get("index", 0)),
+        "index": artifact.get("index", 0),
+        "description": artifact.get("description"),
+        "type": first_part.get("type", "text"),
+        "content": None,
+        "chunks": [], # 受信中のテキストチャンク (lastChunk 受信時に結合)
+        "complete": False,
+    }
+    if entry["type"] == "file":
+        file_content = first_part.get("file") or {}
+        entry["filename"] = file_content.get("name")
+        entry["mime_type"] = file_content.get("mimeType")
+        entry["uri"] = file_content.get("uri")
+    return entry
+
+def _release_artifact(entry: Dict[str, Any]):
+    """退避済みblobを削除する"""
+    if entry.get("content_ref"):
+        st.session_state.spill_store.delete_blob(entry["content_ref"])
+
+def _spill_artifact_overflow():
+    """アーティファクト数が上限を超えたら、完了済みの古いものからディスクへ退避する"""
+    artifacts: Dict[int, Dict[str, Any]] = st.session_state.task_artifacts
+    if len(artifacts) <= MAX_ARTIFACTS_IN_MEMORY:
+        return
+    n_spill = len(artifacts) - MAX_ARTIFACTS_IN_MEMORY // 2
+    to_spill = [index for index, entry in artifacts.items() if entry["complete"]][:n_spill]
+    st.session_state.spill_store.append("task_artifacts", [artifacts[index] for index in to_spill])
+    for index in to_spill:
+        del artifacts[index]
+
+def apply_artifact_update(artifact: Dict[str, Any]):
+    """
+    A2A Artifact (append / lastChunk) をインデックスに反映する。
+
+    append=True のチャンクは既存エントリのチャンクリストに追加するだけ (O(1)) で、
+    本体の結合は lastChunk 受信時に1度だけ行う。append でないものは同じ index を置き換える。
+    """
+    artifacts: Dict[int, Dict[str, Any]] = st.session_state.task_artifacts
+    index = artifact.get("index", 0)
+    entry = artifacts.get(index)
+    if entry is None or not artifact.get("append"):
+        if entry is not None:
+            _release_artifact(entry)
+        entry = _new_artifact_entry(artifact)
+        artifacts[index] = entry
+
+    for part in artifact.get("parts") or []:
+        if part.get("type") == "text":
+            entry["chunks"].append(part.get("text", ""))
+        elif part.get("type") == "data":
+            entry["content"] = part.get("data")
+
+    # lastChunk が省略された非 append のアーティファクトは1回で完結しているとみなす
+    if artifact.get("lastChunk") or (artifact.get("lastChunk") is None and not artifact.get("append")):
+        if entry["type"] == "text":
+            entry["content"] = "".join(entry["chunks"])
+        entry["chunks"] = []
+        entry["complete"] = True
+        artifacts[index] = spill_artifact_content(entry)
+        _spill_artifact_overflow()
+
+def get_artifact_text(entry: Dict[str, Any]) -> str:
+    """受信中のものも含め、アーティファクトの現在のテキストを返す"""
+    if not entry.get("complete"):
+        return "".join(entry.get("chunks", []))
+    content = get_artifact_content(entry)
+    return content if isinstance(content, str) else ""
+
+def get_artifact_content(artifact: Dict[str, Any]) -> Any:
+    """アーティファクト本体を返す (退避済みならディスクから読み込む)"""
+    if artifact.get("content_ref"):
+        return st.session_state.spill_store.get_blob(artifact["content_ref"])
+    return artifact.get("content")
+
+def reset_task_progress():
+    """中間レスポンス (ステータス更新・アーティファクト) を退避分も含めてクリアする"""
+    store: SpillStore = st.session_state.spill_store
+    for artifact in st.session_state.task_artifacts.values():
+        _release_artifact(artifact)
+    for artifact in store.load("task_artifacts", 0, store.count("task_artifacts")):
+        _release_artifact(artifact)
+    store.clear("task_status_updates")
+    store.clear("task_artifacts")
+    st.session_state.task_status_updates = []
+    st.session_state.task_artifacts = {}
+
+def get_session_memory_usage() -> Dict[str, int]:
+    """このセッションのおおよそのメモリ使用量と退避データ量 (バイト)"""
+    usage = {key: deep_sizeof(st.session_state[key]) for key in ("chat_history", "task_status_updates", "task_artifacts", "agent_cards")}
+    usage["total_in_memory"] = sum(usage.values())
+    usage["spilled_on_disk"] = st.session_state.spill_store.disk_usage()
+    return usage
@@ -0,0 +1,107 @@
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from a2a_client_utils import StreamingUnavailableError, get_replica_pool, http_session, poll_a2a_task, stream_a2a_task
+
+# --- エージェントごとの送信方式 (トランスポート) の選択 ---
+# AgentCard の capabilities を見て、ストリーミング対応なら SSE、そうでなければ tasks/get のポーリングを使う。
+# プッシュ通知は受信用の HTTP エンドポイントが必要だが、Streamlit のプロセスにはそれがないため選択肢にしない
+# (pushNotifications のみ対応のエージェントもポーリングで進捗を受け取る)。
+TRANSPORT_SSE = "sse"
+TRANSPORT_POLLING = "polling"
+
+STREAMING_RETRY_AFTER = 600 # SSE が使えずポーリングに切り替えたエージェントで、SSE を再び試すまでの秒数
+
+# エージェントURL -> (判定に使った capabilities, 選択した方式, SSE を再び試せる時刻 (切り替えていなければ None))
+_transport_cache: Dict[str, Tuple[Dict[str, Any], str, Optional[float]]] = {}
+
+def select_transport(agent_card_dict: Dict[str, Any]) -> str:
+    """
+    エージェントに使う送信方式を返す。
+
+    判定結果はエージェントURLごとにキャッシュし、カードを再取得して capabilities が変わったときだけ判定し直す。
+    SSE が実際には使えなかったエージェント (mark_streaming_unavailable) は STREAMING_RETRY_AFTER 秒間ポーリングにする。
+    """
+    url = agent_card_dict.get("url")
+    capabilities = agent_card_dict.get("capabilities") or {}
+    cached = _transport_cache.get(url)
+    if cached is not None and cached[0] == capabilities:
+        _, transport, retry_at = cached
+        if retry_at is None or time.monotonic() < retry_at:
+            return transport
+    transport = TRANSPORT_SSE if capabilities.get("streaming") else TRANSPORT_POLLING
+    _transport_cache[url] = (dict(capabilities), transport, None)
+    logging.info(f"Selected transport '{transport}' for agent {url}")
+    return transport
+
+def mark_streaming_unavailable(agent_card_dict: Dict[str, Any], reason: str):
+    """カード上はストリーミング対応でも SSE が使えなかったエージェントを、しばらくポーリングに切り替える"""
+    url = agent_card_dict.get("url")
+    logging.warning(f"Streaming is unavailable for agent {url} ({reason}); using polling for {STREAMING_RETRY_AFTER}s")
+    _transport_cache[url] = (dict(agent_card_dict.get("capabilities") or {}), TRANSPORT_POLLING, time.monotonic() + STREAMING_RETRY_AFTER)
+
+def _affinity_keys(task_id: str, session_id: str) -> List[str]:
+    # エージェント側の PooledA2AClient と同じキー (会話の状態はセッション、tasks/get はタスクのレプリカにある)
+    return [f"session:{session_id}", f"task:{task_id}"]
+
+def resolve_agent_url(server_url: str, agent_card_dict: Dict[str, Any], task_id: str, session_id: str) -> str:
+    """
+    タスクの送信先URLを返す (ファイルのアップロード先をタスクと同じレプリカにするため)。
+
+    レプリカプールならセッションに割り当てたレプリカ (未割り当てなら選んで割り当てる)、そうでなければカードのURL。
+    """
+    pool = get_replica_pool(server_url) if server_url else None
+    if pool is None:
+        return agent_card_dict.get("url", server_url)
+    return pool.pick(_affinity_keys(task_id, session_id)).url
+
+async def _run_on_agent(agent_card_dict: Dict[str, Any], message_parts_dicts: List[Dict[str, Any]], task_id: str, session_id: str, update_callback: callable) -> str:
+    """選択した方式で1つのエージェント (レプリカ) にタスクを送信する。SSE が使えなければポーリングで送り直す"""
+    transport = select_transport(agent_card_dict)
+    if transport == TRANSPORT_SSE:
+        try:
+            await stream_a2a_task(agent_card_dict, message_parts_dicts, task_id, session_id, update_callback)
+            return transport
+        except StreamingUnavailableError as e:
+            mark_streaming_unavailable(agent_card_dict, str(e))
+            transport = TRANSPORT_POLLING
+    await poll_a2a_task(agent_card_dict, message_parts_dicts, task_id, session_id, update_callback)
+    return transport
+
+async def run_a2a_task(agent_card_dict: Dict[str, Any], message_parts_dicts: List[Dict[str, Any]], task_id: str, session_id: str, update_callback: callable,
+                       server_url: Optional[str] = None) -> str:
+    """
+    エージェントに合った方式でタスクを送信し、進捗イベントを update_callback に渡す。使った方式を返す。
+
+    どちらの方式でもイベント形式は同じ (status_update / artifact_update / final_result / error)。
+    SSE が最初のイベントより前に失敗した場合は、同じタスクをポーリングで送り直す。
+    server_url がレプリカプールなら、セッションに割り当てたレプリカ (なければ処理中のリクエストが少ないもの) へ送り、
+    接続できなければ (何も送信していないので) 別のレプリカへ送り直す。
+    送り直しやポーリングへの切り替えも含め、1回の呼び出しの中では HTTP クライアントを共有する。
+    """
+    async with http_session():
+        return await _run_with_retries(agent_card_dict, message_parts_dicts, task_id, session_id, update_callback, server_url)
+
+async def _run_with_retries(agent_card_dict: Dict[str, Any], message_parts_dicts: List[Dict[str, Any]], task_id: str, session_id: str, update_callback: callable,
+                            server_url: Optional[str]) -> str:
+    pool = get_replica_pool(server_url) if server_url else None
+    failed = [] # 接続できなかったレプリカ (送り直しでは選ばない)
+    while True:
+        replica = None
+        try:
+            if pool is None:
+                return await _run_on_agent(agent_card_dict, message_parts_dicts, task_id, session_id, update_callback)
+            async with pool.acquire(_affinity_keys(task_id, session_id), exclude=failed) as replica:
+                replica_card = {**agent_card_dict, "url": replica.url}
+                return await _run_on_agent(replica_card, message_parts_dicts, task_id, session_id, update_callback)
+        except httpx.ConnectError as e:
+            logging.warning(f"Could not connect to the agent for task {task_id}: {e}")
+            last_error = e
+            failed.append(replica)
+            if pool is None or len(failed) >= len(pool.replicas):
+                break
+    await update_callback({"event_type": "error", "message": f"HTTP request error: {last_error}"})
+    return select_transport(agent_card_dict)
@@ -0,0 +1,155 @@
+# ADK Runner, session service and model backends used by the ADK agent
+import asyncio
+import inspect
+import logging
+import os
+from collections import OrderedDict
+from typing import Any, AsyncGenerator, Dict, Optional, Set, Tuple
+
+from google.adk.agents import LlmAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from a2a_shared.checkpoints import CLARIFY_INSTRUCTION
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_APP_NAME = "a2a-adk-agent"
+DEFAULT_MAX_SESSIONS = 1000
+
+
+async def _maybe_await(value: Any) -> Any:
+    """Session service methods are sync in early ADK releases and coroutines in later ones."""
+    if inspect.isawaitable(value):
+        return await value
+    return value
+
+
+class StubLlm(BaseLlm):
+    """Local model backend: answers after latency_ms with a reply derived from the last user message.
+
+    No network or credentials are needed, so the full Runner / session / event path can be
+    exercised (and load-tested) offline.
+    """
+
+    latency_ms: float = 100
+    reply_format: str = "ADK received: '{text:.30}...'"
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        text = ""
+        for content in reversed(llm_request.contents or []):
+            if content.role == "user" and content.parts:
+                text = "".join(part.text or "" for part in content.parts)
+                break
+        await asyncio.sleep(self.latency_ms / 1000)
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=self.reply_format.format(text=text))]))
+
+
+def build_model(model_config: Optional[Dict[str, Any]], vertex_ai_config: Optional[Dict[str, Any]]) -> Any:
+    """Returns the LlmAgent model for the `adk.model` section: a StubLlm, or a Gemini model name on Vertex AI."""
+    model_config = model_config or {}
+    backend = model_config.get("backend", "stub")
+    if backend == "stub":
+        return StubLlm(model="stub", **(model_config.get("stub") or {}))
+    if backend == "vertex_ai":
+        vertex_ai_config = vertex_ai_config or {}
+        # google-genai picks the Vertex AI backend and project from the environment
+        os.environ.setdefault("GOOGLE_GENAI_USE_VERTEXAI", "TRUE")
+        os.environ.setdefault("GOOGLE_CLOUD_PROJECT", vertex_ai_config.get("project_id", ""))
+        os.environ.setdefault("GOOGLE_CLOUD_LOCATION", vertex_ai_config.get("location", "us-central1"))
+        return vertex_ai_config["model_name"]
+    raise ValueError(f"Unknown ADK model backend: {backend}")
+
+
+class AdkRuntime:
+    """One ADK Runner and in-memory session service shared by all requests.
+
+    A Runner keeps no per-call state (each run_async builds its own invocation context), so a
+    single instance serves concurrent requests; only turns within the same session are
+    serialized, since they append to the same event history. A2A sessionIds map 1:1 to ADK
+    session ids; the least recently used sessions are deleted beyond max_sessions.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, vertex_ai_config: Optional[Dict[str, Any]] = None):
+        config = config or {}
+        self.app_name = config.get("app_name", DEFAULT_APP_NAME)
+        self.max_sessions = config.get("max_sessions", DEFAULT_MAX_SESSIONS)
+        self.agent = LlmAgent(
+            name=config.get("agent_name", "a2a_adk_agent"),
+            model=build_model(config.get("model"), vertex_ai_config),
+            # Answers starting with QUESTION: put the A2A task into input-required
+            instruction=config.get("instruction", "You are a helpful assistant. Answer the user's message concisely.") + "\n" + CLARIFY_INSTRUCTION,
+        )
+        self.session_service = InMemorySessionService()
+        self.runner = Runner(app_name=self.app_name, agent=self.agent, session_service=self.session_service)
+        self._sessions: "OrderedDict[Tuple[str, str], asyncio.Lock]" = OrderedDict() # Turn locks, least recently used first
+        self._created: Set[Tuple[str, str]] = set() # Sessions that exist in the session service
+
+    def _session_lock(self, user_id: str, session_id: str) -> asyncio.Lock:
+        """Returns the turn lock of the session, registered before anything awaits so concurrent first turns share it."""
+        key = (user_id, session_id)
+        lock = self._sessions.get(key)
+        if lock is None:
+            lock = self._sessions[key] = asyncio.Lock()
+        self._sessions.move_to_end(key)
+        return lock
+
+    async def _ensure_session(self, user_id: str, session_id: str, lock: asyncio.Lock):
+        """Creates the ADK session on its first turn; call with the session's turn lock held."""
+        key = (user_id, session_id)
+        if key in self._created:
+            return
+        self._sessions.setdefault(key, lock) # Re-registers a session evicted while this turn waited for its lock
+        session = await _maybe_await(self.session_service.get_session(app_name=self.app_name, user_id=user_id, session_id=session_id))
+        if session is None:
+            try:
+                await _maybe_await(self.session_service.create_session(app_name=self.app_name, user_id=user_id, session_id=session_id))
+            except Exception:
+                # Newer ADK releases raise on a duplicate id; the session exists, which is all this needs
+                if await _maybe_await(self.session_service.get_session(app_name=self.app_name, user_id=user_id, session_id=session_id)) is None:
+                    raise
+        self._created.add(key)
+        await self._evict()
+
+    async def _evict(self):
+        while len(self._sessions) > self.max_sessions:
+            (user_id, session_id), lock = next(iter(self._sessions.items()))
+            if lock.locked():
+                break # The oldest session is mid-turn; try again on the next new session
+            del self._sessions[(user_id, session_id)]
+            if (user_id, session_id) in self._created:
+                self._created.discard((user_id, session_id))
+                await _maybe_await(self.session_service.delete_session(app_name=self.app_name, user_id=user_id, session_id=session_id))
+
+    def has_session(self, user_id: str, session_id: str) -> bool:
+        """Whether the session is still held (the least recently used ones are evicted beyond max_sessions)."""
+        return (user_id, session_id) in self._created
+
+    async def run(self, user_id: str, session_id: str, text: str) -> str:
+        """Runs one turn of the agent in the session and returns the final response text."""
+        message = types.Content(role="user", parts=[types.Part(text=text)])
+        response_text = ""
+        lock = self._session_lock(user_id, session_id)
+        async with lock:
+            await self._ensure_session(user_id, session_id, lock)
+            async for event in self.runner.run_async(user_id=user_id, session_id=session_id, new_message=message):
+                if event.is_final_response() and event.content and event.content.parts:
+                    response_text = "".join(part.text or "" for part in event.content.parts)
+        return response_text
+
+    async def warm_up(self):
+        """Runs one turn through a throwaway Runner backed by a zero-latency StubLlm.
+
+        Pays ADK's lazy initialization (flows, event handling, session bookkeeping) without
+        calling the configured model or touching the shared session service.
+        """
+        agent = LlmAgent(name=self.agent.name, model=StubLlm(model="stub", latency_ms=0), instruction=self.agent.instruction)
+        runner = Runner(app_name=self.app_name, agent=agent, session_service=InMemorySessionService())
+        session = await _maybe_await(runner.session_service.create_session(app_name=self.app_name, user_id="warm-up"))
+        message = types.Content(role="user", parts=[types.Part(text="warm-up")])
+        async for _ in runner.run_async(user_id="warm-up", session_id=session.id, new_message=message):
+            pass
@@ -1,16 +1,11 @@
 import yaml
 import logging
 import uvicorn
-import asyncio # Import asyncio for async operations
-import uuid # Import uuid for generating task IDs
-from common.server.server import A2AServer
-from common.server.task_manager import TaskManager
-import yaml
-import logging
-import uvicorn
 import asyncio
 import os # Import os to read environment variables
+import time
 import uuid # Import uuid for generating task IDs
+from typing import Any, AsyncIterable, Dict, List, Optional
 from common.server.server import A2AServer
 from common.server.task_manager import TaskManager
 from common.types import (
@@ -18,38 +13,159 @@ from common.types import (
     GetTaskRequest, SendTaskRequest, CancelTaskRequest,
     SetTaskPushNotificationRequest, GetTaskPushNotificationRequest,
     TaskResubscriptionRequest, SendTaskStreamingRequest, JSONRPCResponse,
-    Message, TextPart,
-    Task, TaskStatus, TaskState # Import Task related types
+    SendTaskStreamingResponse, TaskStatusUpdateEvent, TaskArtifactUpdateEvent,
+    Message, TextPart, Artifact,
+    Task, TaskStatus, TaskState, TaskSendParams, # Import Task related types
+    TaskNotFoundError, TaskNotCancelableError
 )
-from common.client.client import A2AClient # Import the A2A client
+from a2a_shared.admission import AdmissionController, QueueFullError, ServerBusyError
+from a2a_shared.artifacts import iter_artifact_chunks
+from a2a_shared.checkpoints import CheckpointStore, InputRequired, ParkedTask, parse_question
+from a2a_shared.compression import add_compression
+from a2a_shared.deadline import Deadline, DeadlineExceeded, DeadlineExceededError, deadline_scope, run_within
+from a2a_shared.files import FileSpool, extract_message_input
+from a2a_shared.health import HealthChecks
+from a2a_shared.limits import RequestLimits, add_request_limits
+from a2a_shared.profiling import ProfilingEndpoints
+from a2a_shared.client import PooledA2AClient
+from a2a_shared.pool import ReplicaPool
+from a2a_shared.recording import add_recording
+from a2a_shared.reload import ConfigReloader, reloadable
+from a2a_shared.server import FastA2AServer
+from a2a_shared.task_store import TaskAlreadyRunningError, TaskStore, is_blocking
+from a2a_shared.tracing import configure_tracing, start_span
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Dummy Task Manager for initial setup
+def _log_request(kind: str, request) -> None:
+    """Logs the task id at INFO; the full payload is only serialized when DEBUG is enabled."""
+    logger.info(f"Received {kind} request for task {request.params.id}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"{kind} payload: {request.model_dump_json(exclude_none=True)}")
+
+DEFAULT_MAX_SESSIONS = 1000 # adk_runtime.DEFAULT_MAX_SESSIONS (importing adk_runtime loads google.adk)
+
+def _session_cap(adk_config: Optional[Dict[str, Any]]) -> int:
+    """The ADK session cap of an adk section; raises ValueError when it is not a positive integer."""
+    max_sessions = int((adk_config or {}).get("max_sessions", DEFAULT_MAX_SESSIONS))
+    if max_sessions < 1:
+        raise ValueError("adk.max_sessions must be at least 1")
+    return max_sessions
+
+def _transcript(messages: List[Message]) -> str:
+    """The text of an A2A exchange as one prompt ("user: ...", "agent: ..." lines)."""
+    return "\n".join(f"{message.role}: " + "".join(part.text for part in message.parts if isinstance(part, TextPart)) for message in messages)
+
+# Task Manager that runs each task as a turn of an ADK agent
 class AdkTaskManager(TaskManager):
-    async def on_get_task(self, request: GetTaskRequest) -> JSONRPCResponse:
-        logger.info(f"Received GetTask request: {request.model_dump_json()}")
-        # Dummy response for now
-        return JSONRPCResponse(id=request.id, result={"status": "Task not found"})
+    def __init__(self, file_spool: FileSpool, admission: AdmissionController, task_store: TaskStore, parked_tasks: CheckpointStore,
+                 adk_config: Optional[Dict[str, Any]] = None, vertex_ai_config: Optional[Dict[str, Any]] = None):
+        self.file_spool = file_spool # Receives FileParts (uploads, inline base64, URIs)
+        self.admission = admission # Rate limits and fair scheduling of task execution
+        self.task_store = task_store # Tasks for tasks/get, tasks/cancel and tasks/resubscribe (incl. non-blocking sends)
+        self.parked_tasks = parked_tasks # Tasks waiting in input-required
+        self.adk_config = adk_config or {} # adk section of the config: Runner, sessions and model backend
+        self.vertex_ai_config = vertex_ai_config
+        # google.adk takes seconds to import, so the runtime is built on first use (or by the startup warm-up)
+        self._runtime = None
+        self._runtime_lock = asyncio.Lock()
+
+    def reconfigure_sessions(self, max_sessions: int):
+        """Changes the ADK session cap; a lower cap evicts on the next session created."""
+        self.adk_config = {**self.adk_config, "max_sessions": max_sessions}
+        if self._runtime is not None:
+            self._runtime.max_sessions = max_sessions
 
-    # Remove __init__ and client as reply sending is removed
+    async def on_get_task(self, request: GetTaskRequest) -> JSONRPCResponse:
+        _log_request("GetTask", request)
+        task = self.task_store.get(request.params.id, request.params.historyLength)
+        if task is None:
+            return JSONRPCResponse(id=request.id, error=TaskNotFoundError())
+        return JSONRPCResponse(id=request.id, result=task)
+
+    def _build_runtime(self):
+        start = time.perf_counter()
+        from adk_runtime import AdkRuntime # imports google.adk
+        runtime = AdkRuntime(self.adk_config, self.vertex_ai_config)
+        logger.info(f"ADK runtime ready in {time.perf_counter() - start:.2f}s")
+        return runtime
+
+    async def _get_runtime(self):
+        """Returns the shared AdkRuntime, building it on a worker thread so the import never blocks the event loop."""
+        if self._runtime is None:
+            async with self._runtime_lock:
+                if self._runtime is None:
+                    self._runtime = await asyncio.get_running_loop().run_in_executor(None, self._build_runtime)
+        return self._runtime
+
+    async def warm_up(self, config: Optional[Dict[str, Any]] = None):
+        """Builds the ADK runtime and, with dry_run, runs one turn against a local stub model."""
+        config = config or {}
+        start = time.perf_counter()
+        runtime = await self._get_runtime()
+        if config.get("dry_run", True):
+            await asyncio.wait_for(runtime.warm_up(), timeout=config.get("timeout_seconds", 120))
+        logger.info(f"ADK warm-up finished in {time.perf_counter() - start:.2f}s")
+
+    async def _extract_input(self, message: Message):
+        """Extracts the input text from the message parts; FileParts are spooled to disk."""
+        return await extract_message_input(message, self.file_spool)
+
+    async def _process(self, params: TaskSendParams, input_text: str, parked: Optional[ParkedTask] = None) -> str:
+        """Runs the input as one turn of the ADK agent and returns the response text.
+
+        The A2A sessionId is the ADK session id (the task id when the client sends none), scoped
+        to metadata.client_id as the ADK user. A response asking the user a question raises
+        InputRequired. The ADK session holds the conversation, so it is the checkpoint of a parked
+        task: the reply runs as the next turn. Only if the session was evicted while the task
+        waited is the exchange so far replayed into a new one.
+        """
+        runtime = await self._get_runtime()
+        user_id = (params.metadata or {}).get("client_id") or "a2a-client"
+        session_id = params.sessionId or params.id
+        if parked is not None and not runtime.has_session(user_id, session_id):
+            logger.info(f"ADK session {session_id} of parked task {params.id} was evicted; replaying its history")
+            input_text = _transcript(parked.history + [params.message])
+        logger.info(f"Running ADK agent for task {params.id} (session {session_id})")
+        with start_span("adk.run", {"a2a.task_id": params.id, "adk.session_id": session_id}):
+            response_text = await runtime.run(user_id, session_id, input_text)
+        logger.info(f"ADK agent finished task {params.id}")
+        question = parse_question(response_text)
+        if question is not None:
+            raise InputRequired(question)
+        return response_text
+
+    def _park(self, params: TaskSendParams, error: InputRequired, prior_history: List[Message]) -> TaskStatus:
+        """Parks the task and returns the input-required status carrying the question."""
+        question_message = Message(role="agent", parts=[TextPart(text=error.question)])
+        self.parked_tasks.park(params.id, params.sessionId, error.checkpoint, prior_history + [params.message, question_message])
+        logger.info(f"Task {params.id} is waiting for input: {error.question}")
+        return TaskStatus(state=TaskState.INPUT_REQUIRED, message=question_message)
 
     async def on_send_task(self, request: SendTaskRequest) -> JSONRPCResponse:
         """Handles incoming tasks/send requests and returns the result synchronously."""
-        logger.info(f"Received SendTask request: {request.model_dump_json(exclude_none=True)}")
+        _log_request("SendTask", request)
+        rate_limit_error = self.admission.check(request.params)
+        if rate_limit_error:
+            return JSONRPCResponse(id=request.id, error=rate_limit_error)
+        deadline = Deadline.from_metadata(request.params.metadata)
+        if deadline is not None and deadline.expired():
+            return JSONRPCResponse(id=request.id, error=DeadlineExceededError())
+        if not is_blocking(request.params):
+            return self._submit_background(request)
         task_id = request.params.id
         session_id = request.params.sessionId
         received_message = request.params.message
 
-        # Extract text from the message parts
-        input_text = ""
-        if received_message and received_message.parts:
-            for part in received_message.parts:
-                if isinstance(part, TextPart):
-                    input_text += part.text + "\n"
-        input_text = input_text.strip()
+        try:
+            input_text, files = await self._extract_input(received_message)
+        except Exception as e:
+            logger.warning(f"Failed to read the message parts for task {task_id}: {e}")
+            error_message = Message(role="agent", parts=[TextPart(text=f"Error reading message parts: {e}")])
+            task_result = Task(id=task_id, sessionId=session_id, status=TaskStatus(state=TaskState.FAILED, message=error_message))
+            return JSONRPCResponse(id=request.id, result=task_result)
 
         if not input_text:
             logger.warning("No text found in the received message.")
@@ -57,54 +173,212 @@ class AdkTaskManager(TaskManager):
             task_result = Task(id=task_id, sessionId=session_id, status=task_status)
             return JSONRPCResponse(id=request.id, result=task_result)
 
+        artifacts = None
+        prior_history: List[Message] = []
         try:
-            # --- Simulate ADK processing (Mock) ---
-            logger.info(f"Simulating ADK processing for task {task_id}")
-            await asyncio.sleep(0.1) # Simulate work
-            response_text = f"ADK received: '{input_text[:30]}...'"
+            with deadline_scope(deadline): # Peer calls made while processing forward the remaining budget
+                async with self.admission.slot(request.params, deadline):
+                    with self.parked_tasks.resuming(task_id, session_id) as parked: # A reply to the task's question resumes it (kept if the run fails)
+                        prior_history = parked.history if parked else []
+                        response_text = await run_within(deadline, self._process(request.params, input_text, parked))
             response_message = Message(role="agent", parts=[TextPart(text=response_text)])
-            logger.info(f"ADK processing simulation finished for task {task_id}")
-            # --- End Mock ADK processing ---
+            artifacts = [Artifact(name="response", parts=[TextPart(text=response_text)], index=0, lastChunk=True)]
 
             # Create TaskStatus including the agent's response message
             task_status = TaskStatus(state=TaskState.COMPLETED, message=response_message) # Set state to COMPLETED
 
             # Create the history including received message and response
-            history = [received_message, response_message]
-
+            history = prior_history + [received_message, response_message]
+
+        except InputRequired as e:
+            task_status = self._park(request.params, e, prior_history)
+            history = prior_history + [received_message, task_status.message]
+        except QueueFullError:
+            logger.warning(f"Rejected task {task_id}: too many queued tasks for its client")
+            return JSONRPCResponse(id=request.id, error=ServerBusyError())
+        except DeadlineExceeded:
+            logger.warning(f"Abandoned task {task_id}: its deadline passed")
+            return JSONRPCResponse(id=request.id, error=DeadlineExceededError())
         except Exception as e:
-            logger.error(f"Error during ADK simulation for task {task_id}: {e}", exc_info=True)
-            history = [received_message] if received_message else []
+            logger.error(f"Error during ADK processing for task {task_id}: {e}", exc_info=True)
+            history = prior_history + ([received_message] if received_message else [])
             error_message = Message(role="agent", parts=[TextPart(text=f"Error processing task: {e}")])
             task_status = TaskStatus(state=TaskState.FAILED, message=error_message)
             if 'error_message' in locals():
                  history.append(error_message)
 
+        finally:
+            self.file_spool.release(files)
+
         # Create the final Task object including the history
-        task_result = Task(id=task_id, sessionId=session_id, status=task_status, history=history)
+        task_result = Task(id=task_id, sessionId=session_id, status=task_status, history=history, artifacts=artifacts)
+        self.task_store.put(task_result)
         return JSONRPCResponse(id=request.id, result=task_result)
 
-    async def on_send_task_subscribe(self, request: SendTaskStreamingRequest):
-        logger.info(f"Received SendTaskStreaming request: {request.model_dump_json()}")
-        # Dummy response for now
-        yield JSONRPCResponse(id=request.id, result={"task_id": "dummy-task-id", "status": "Task received, streaming not implemented"})
+    def _submit_background(self, request: SendTaskRequest) -> JSONRPCResponse:
+        """Non-blocking tasks/send: records the task as SUBMITTED, runs it in the background and returns at once."""
+        params = request.params
+        parked = self.parked_tasks.get(params.id) # A reply keeps the history of the exchange so far
+        task = Task(id=params.id, sessionId=params.sessionId, status=TaskStatus(state=TaskState.SUBMITTED), history=(parked.history if parked else []) + [params.message])
+        if not self.task_store.start(task, self._run_background(params)):
+            return JSONRPCResponse(id=request.id, error=TaskAlreadyRunningError())
+        logger.info(f"Task {params.id} submitted for background execution")
+        return JSONRPCResponse(id=request.id, result=task)
+
+    async def _run_background(self, params):
+        """Executes a non-blocking task, recording its progress in the task store."""
+        task_id = params.id
+        deadline = Deadline.from_metadata(params.metadata)
+        files = []
+        prior_history: List[Message] = []
+        try:
+            input_text, files = await self._extract_input(params.message)
+            if not input_text:
+                logger.warning("No text found in the received message.")
+                self.task_store.update_status(task_id, TaskStatus(state=TaskState.FAILED, message=Message(role="agent", parts=[TextPart(text="No text found in the message.")])))
+                return
+            with deadline_scope(deadline):
+                async with self.admission.slot(params, deadline):
+                    self.task_store.update_status(task_id, TaskStatus(state=TaskState.WORKING))
+                    with self.parked_tasks.resuming(task_id, params.sessionId) as parked:
+                        prior_history = parked.history if parked else []
+                        response_text = await run_within(deadline, self._process(params, input_text, parked))
+            self.task_store.add_artifact(task_id, Artifact(name="response", parts=[TextPart(text=response_text)], index=0, lastChunk=True))
+            self.task_store.update_status(task_id, TaskStatus(state=TaskState.COMPLETED, message=Message(role="agent", parts=[TextPart(text=response_text)])))
+        except InputRequired as e:
+            self.task_store.update_status(task_id, self._park(params, e, prior_history))
+        except QueueFullError:
+            logger.warning(f"Rejected task {task_id}: too many queued tasks for its client")
+            self.task_store.update_status(task_id, TaskStatus(state=TaskState.FAILED, message=Message(role="agent", parts=[TextPart(text=ServerBusyError().message)])))
+        except DeadlineExceeded:
+            logger.warning(f"Abandoned task {task_id}: its deadline passed")
+            self.task_store.update_status(task_id, TaskStatus(state=TaskState.FAILED, message=Message(role="agent", parts=[TextPart(text=DeadlineExceededError().message)])))
+        except asyncio.CancelledError:
+            logger.info(f"Background task {task_id} canceled")
+            self.parked_tasks.discard(task_id) # A canceled reply does not leave the task resumable
+            self.task_store.update_status(task_id, TaskStatus(state=TaskState.CANCELED))
+            raise
+        except Exception as e:
+            logger.error(f"Error during ADK processing for task {task_id}: {e}", exc_info=True)
+            self.task_store.update_status(task_id, TaskStatus(state=TaskState.FAILED, message=Message(role="agent", parts=[TextPart(text=f"Error processing task: {e}")])))
+        finally:
+            self.file_spool.release(files)
+
+    async def on_send_task_subscribe(self, request: SendTaskStreamingRequest) -> AsyncIterable[SendTaskStreamingResponse]:
+        """Handles tasks/sendSubscribe by streaming status updates and the response as artifact chunks."""
+        _log_request("SendTaskStreaming", request)
+        rate_limit_error = self.admission.check(request.params)
+        if rate_limit_error:
+            return JSONRPCResponse(id=request.id, error=rate_limit_error)
+        deadline = Deadline.from_metadata(request.params.metadata)
+        if deadline is not None and deadline.expired():
+            return JSONRPCResponse(id=request.id, error=DeadlineExceededError())
+        # A2AServer awaits this method and iterates the result, so hand back the generator
+        return self._stream_task(request, deadline)
+
+    async def _stream_task(self, request: SendTaskStreamingRequest, deadline: Optional[Deadline] = None) -> AsyncIterable[SendTaskStreamingResponse]:
+        """Streams the task, recording it in the task store for tasks/get, tasks/cancel and tasks/resubscribe."""
+        params = request.params
+        parked = self.parked_tasks.get(params.id) # A reply keeps the history of the exchange so far
+        self.task_store.put(Task(id=params.id, sessionId=params.sessionId, status=TaskStatus(state=TaskState.SUBMITTED),
+                                 history=(parked.history if parked else []) + [params.message]))
+        try:
+            async for response in self._run_stream(request, deadline):
+                yield response
+        finally:
+            self.task_store.cancel_unfinished(params.id, "The stream was closed before the task finished.")
+
+    async def _run_stream(self, request: SendTaskStreamingRequest, deadline: Optional[Deadline] = None) -> AsyncIterable[SendTaskStreamingResponse]:
+        task_id = request.params.id
+        record = self.task_store.record
+        yield SendTaskStreamingResponse(id=request.id, result=record(TaskStatusUpdateEvent(id=task_id, status=TaskStatus(state=TaskState.WORKING))))
+
+        try:
+            input_text, files = await self._extract_input(request.params.message)
+        except Exception as e:
+            logger.warning(f"Failed to read the message parts for task {task_id}: {e}")
+            error_message = Message(role="agent", parts=[TextPart(text=f"Error reading message parts: {e}")])
+            yield SendTaskStreamingResponse(id=request.id, result=record(TaskStatusUpdateEvent(
+                id=task_id, status=TaskStatus(state=TaskState.FAILED, message=error_message), final=True)))
+            return
+
+        if not input_text:
+            logger.warning("No text found in the received message.")
+            yield SendTaskStreamingResponse(id=request.id, result=record(TaskStatusUpdateEvent(
+                id=task_id, status=TaskStatus(state=TaskState.FAILED, message=request.params.message), final=True), message_to_history=False))
+            return
+
+        prior_history: List[Message] = []
+        try:
+            with deadline_scope(deadline):
+                async with self.admission.slot(request.params, deadline):
+                    with self.parked_tasks.resuming(task_id, request.params.sessionId) as parked:
+                        prior_history = parked.history if parked else []
+                        response_text = await run_within(deadline, self._process(request.params, input_text, parked))
+        except InputRequired as e:
+            # The stream ends here; the client replies with a new tasks/sendSubscribe for the same task
+            yield SendTaskStreamingResponse(id=request.id, result=record(TaskStatusUpdateEvent(
+                id=task_id, status=self._park(request.params, e, prior_history), final=True)))
+            return
+        except QueueFullError:
+            logger.warning(f"Rejected task {task_id}: too many queued tasks for its client")
+            self.task_store.update_status(task_id, TaskStatus(state=TaskState.FAILED, message=Message(role="agent", parts=[TextPart(text=ServerBusyError().message)])))
+            yield SendTaskStreamingResponse(id=request.id, error=ServerBusyError())
+            return
+        except DeadlineExceeded:
+            logger.warning(f"Abandoned task {task_id}: its deadline passed")
+            error_message = Message(role="agent", parts=[TextPart(text=DeadlineExceededError().message)])
+            yield SendTaskStreamingResponse(id=request.id, result=record(TaskStatusUpdateEvent(
+                id=task_id, status=TaskStatus(state=TaskState.FAILED, message=error_message), final=True)))
+            return
+        except Exception as e:
+            logger.error(f"Error during ADK processing for task {task_id}: {e}", exc_info=True)
+            error_message = Message(role="agent", parts=[TextPart(text=f"Error processing task: {e}")])
+            yield SendTaskStreamingResponse(id=request.id, result=record(TaskStatusUpdateEvent(
+                id=task_id, status=TaskStatus(state=TaskState.FAILED, message=error_message), final=True)))
+            return
+        finally:
+            self.file_spool.release(files)
+
+        for artifact in iter_artifact_chunks(response_text, name="response"):
+            yield SendTaskStreamingResponse(id=request.id, result=record(TaskArtifactUpdateEvent(id=task_id, artifact=artifact)))
+
+        # The response text was already delivered as artifact chunks, so the final status carries no message
+        # (the stored task gets it, as for tasks/send)
+        self.task_store.update_status(task_id, TaskStatus(state=TaskState.COMPLETED, message=Message(role="agent", parts=[TextPart(text=response_text)])))
+        yield SendTaskStreamingResponse(id=request.id, result=TaskStatusUpdateEvent(
+            id=task_id, status=TaskStatus(state=TaskState.COMPLETED), final=True))
 
     async def on_cancel_task(self, request: CancelTaskRequest) -> JSONRPCResponse:
-        logger.info(f"Received CancelTask request: {request.model_dump_json()}")
-        return JSONRPCResponse(id=request.id, result={"status": "Cancel request received"})
+        _log_request("CancelTask", request)
+        if self.parked_tasks.discard(request.params.id): # Waiting for input: nothing runs, so dropping it cancels it
+            self.task_store.update_status(request.params.id, TaskStatus(state=TaskState.CANCELED))
+            task = self.task_store.get(request.params.id) or Task(id=request.params.id, status=TaskStatus(state=TaskState.CANCELED))
+            return JSONRPCResponse(id=request.id, result=task)
+        if self.task_store.get(request.params.id) is None:
+            return JSONRPCResponse(id=request.id, error=TaskNotFoundError())
+        if not await self.task_store.cancel(request.params.id):
+            return JSONRPCResponse(id=request.id, error=TaskNotCancelableError())
+        return JSONRPCResponse(id=request.id, result=self.task_store.get(request.params.id))
 
     async def on_set_task_push_notification(self, request: SetTaskPushNotificationRequest) -> JSONRPCResponse:
-        logger.info(f"Received SetTaskPushNotification request: {request.model_dump_json()}")
+        _log_request("SetTaskPushNotification", request)
         return JSONRPCResponse(id=request.id, result={"status": "Push notification setting received"})
 
     async def on_get_task_push_notification(self, request: GetTaskPushNotificationRequest) -> JSONRPCResponse:
-        logger.info(f"Received GetTaskPushNotification request: {request.model_dump_json()}")
+        _log_request("GetTaskPushNotification", request)
         return JSONRPCResponse(id=request.id, result={"push_notification_endpoint": None})
 
     async def on_resubscribe_to_task(self, request: TaskResubscriptionRequest):
-         logger.info(f"Received TaskResubscription request: {request.model_dump_json()}")
-         # Dummy response for now
-         yield JSONRPCResponse(id=request.id, result={"status": "Resubscription not implemented"})
+        _log_request("TaskResubscription", request)
+        if self.task_store.get(request.params.id) is None:
+            return JSONRPCResponse(id=request.id, error=TaskNotFoundError())
+        return self._resubscribe_stream(request)
+
+    async def _resubscribe_stream(self, request: TaskResubscriptionRequest) -> AsyncIterable[SendTaskStreamingResponse]:
+        """Streams the task's current state and then its updates until it finishes."""
+        async for event in self.task_store.subscribe(request.params.id):
+            yield SendTaskStreamingResponse(id=request.id, result=event)
 
 
 def load_config(config_path="adk_config.yaml"):
@@ -119,14 +393,13 @@ def load_config(config_path="adk_config.yaml"):
         logger.error(f"Error parsing configuration file: {e}", exc_info=True)
         return None
 
-async def send_initial_message(target_config):
+async def send_initial_message(target_pool: Optional[ReplicaPool]):
     """Sends an initial test message to the target agent."""
-    if not target_config:
+    if target_pool is None:
         logger.warning("Target agent configuration not found. Skipping initial message.")
         return
 
-    target_url = f"http://{target_config.get('address', 'localhost')}:{target_config.get('port', 8002)}/"
-    client = A2AClient(url=target_url)
+    client = PooledA2AClient(target_pool) # Balances over the target's replicas (a single URL without `replicas`)
 
     message_payload = Message(
         role="user", # From the perspective of the receiving agent
@@ -140,17 +413,32 @@ async def send_initial_message(target_config):
     }
 
     try:
-        logger.info(f"Sending test message to {target_url}...")
+        logger.info(f"Sending test message to {', '.join(target_pool.urls)}...")
         response = await client.send_task(task_params)
-        logger.info(f"Received response from target agent: {response.model_dump_json()}")
+        logger.info(f"Received response from target agent for task {task_id}: {response.result.status.state if response.result else response.error}")
     except Exception as e:
         logger.error(f"Error sending initial message: {e}", exc_info=True)
 
 
+async def _warm_up(task_manager: AdkTaskManager, health: HealthChecks, config: Optional[Dict[str, Any]]):
+    """Runs the configured warm-up, then marks the agent ready. A failed warm-up is logged, not fatal:
+    requests still work, they just pay the initialization cost themselves."""
+    config = config or {}
+    if not config.get("enabled", True):
+        health.mark_ready("warm-up disabled")
+        return
+    try:
+        await task_manager.warm_up(config)
+        health.mark_ready()
+    except Exception as e:
+        logger.warning(f"ADK warm-up failed, serving without it: {e!r}", exc_info=True)
+        health.mark_ready("warm-up failed")
+
 async def main():
     """Main async function to start the server and send initial message."""
     logger.info("ADK Agent starting...")
-    config = load_config()
+    config_path = "adk_config.yaml"
+    config = load_config(config_path)
 
     if not config:
         logger.error("Failed to load configuration. Agent cannot start.")
@@ -159,8 +447,10 @@ async def main():
     agent_id = config.get("agent_id", "default-adk-agent")
     listen_port = config.get("listen_port", 8001)
     target_config = config.get("target_agent")
+    target_pool = ReplicaPool.from_config(target_config, default_port=8002) if target_config else None
     # Read public URL from environment variable, fallback to config/default
     agent_public_url = os.environ.get("AGENT_PUBLIC_URL", f"http://localhost:{listen_port}/")
+    configure_tracing(agent_id, config.get("tracing")) # Spans for server dispatch, queue wait, ADK runs and peer calls
     logger.info(f"Using public URL: {agent_public_url}")
 
     # Define the Agent Card
@@ -169,18 +459,61 @@ async def main():
         description="A sample agent built with Google ADK speaking A2A.",
         url=agent_public_url, # Use the public URL from env var
         version="0.1.0",
-        capabilities=AgentCapabilities(streaming=False, pushNotifications=False, stateTransitionHistory=False),
+        capabilities=AgentCapabilities(streaming=True, pushNotifications=False, stateTransitionHistory=False),
+        defaultInputModes=["text", "file"],
         skills=[AgentSkill(id="basic-chat", name="Basic Chat", description="Handles basic chat interactions.")]
     )
 
-    task_manager = AdkTaskManager() # Config no longer needed for TaskManager
+    file_spool = FileSpool.from_config(config.get("files"), public_url=agent_public_url) # Spools FileParts and uploads to local disk
+    admission = AdmissionController(config.get("admission")) # Rate limits + weighted fair queue (see the admission section of the config)
+    task_store = TaskStore.from_config(config.get("task_store")) # Bounded in-memory store for tasks/get (non-blocking sends)
 
-    server = A2AServer(
+    def cancel_parked(task_id: str, reason: str): # A parked task that is dropped can no longer resume
+        task_store.update_status(task_id, TaskStatus(state=TaskState.CANCELED, message=Message(role="agent", parts=[TextPart(text=reason)])))
+
+    parked_tasks = CheckpointStore.from_config(config.get("parked_tasks"), on_expire=cancel_parked) # Tasks waiting for input
+    task_manager = AdkTaskManager(file_spool=file_spool, admission=admission, task_store=task_store, parked_tasks=parked_tasks,
+                                  adk_config=config.get("adk"), vertex_ai_config=config.get("vertex_ai"))
+    health = HealthChecks(ready=False) # /readyz turns ready once the warm-up below has finished
+
+    limits = RequestLimits.from_config(config.get("limits")) # Body size, parts per message and part size of JSON-RPC requests
+
+    # fast_json: validate requests from raw bytes and serialize responses with model_dump_json
+    server_class = FastA2AServer if config.get("fast_json", True) else A2AServer
+    server = server_class(
         host="0.0.0.0",
         port=listen_port,
         agent_card=agent_card,
-        task_manager=task_manager
+        task_manager=task_manager,
+        **({"limits": limits} if server_class is FastA2AServer else {}) # The stock server only gets the body limit
     )
+    file_spool.add_routes(server.app) # POST /files (streaming upload), GET /files/{file_id}
+    admission.add_routes(server.app) # GET /metrics
+    health.add_routes(server.app) # GET /healthz, GET /readyz
+    profiling = ProfilingEndpoints(config.get("profiling"))
+    profiling.resources.add_gauge("task_store_tasks", lambda: len(task_store)) # Bounded stores that would show a leak first
+    profiling.resources.add_gauge("spooled_files", lambda: len(file_spool))
+    profiling.resources.add_gauge("parked_tasks", lambda: len(parked_tasks))
+    profiling.resources.add_gauge("parked_task_bytes", lambda: parked_tasks.size_bytes)
+    profiling.add_routes(server.app) # GET /admin/profile, GET /admin/loop, GET /admin/resources
+
+    # Hot reload of the tunables below on a change of the config file or POST /admin/reload; running work is kept
+    reloader = ConfigReloader(config_path, config, config.get("reload"), admin_token=profiling.admin_token)
+    reloader.register("admission", reloadable(AdmissionController, admission.reconfigure))
+    reloader.register("task_store", reloadable(TaskStore.from_config, task_store.reconfigure))
+    reloader.register("parked_tasks", reloadable(CheckpointStore.from_config, parked_tasks.reconfigure))
+    # Only the session cap of the adk section; the agent and model are built once
+    reloader.register("adk", reloadable(_session_cap, task_manager.reconfigure_sessions),
+                      static_keys=("app_name", "agent_name", "instruction", "model"))
+    if limits is not None:
+        reloader.register("limits", reloadable(RequestLimits.from_config, limits.reconfigure), static_keys=("enabled",))
+    if target_pool is not None:
+        reloader.register("target_agent", reloadable(lambda section: ReplicaPool.from_config(section, default_port=8002), target_pool.reconfigure))
+    reloader.add_routes(server.app) # GET/POST /admin/reload
+
+    add_recording(server.app, config.get("recording"), path=server.endpoint) # Traffic log for tools/replay.py (innermost: sees accepted requests)
+    add_compression(server.app, config.get("compression")) # gzip/zstd for large responses and SSE streams
+    add_request_limits(server.app, limits, path=server.endpoint) # 413 for oversized bodies, checked while they are received
 
     # Configure the Uvicorn server
     uvicorn_config = uvicorn.Config(server.app, host="0.0.0.0", port=listen_port, log_level="info") # Renamed config variable
@@ -188,16 +521,31 @@ async def main():
 
     # Start the server in the background using serve()
     server_task = asyncio.create_task(uvicorn_server.serve())
+    profiling.start() # Event-loop lag monitor
+    background_tasks = [
+        file_spool.start(), # Sweeps expired uploads
+        reloader.start(), # Config file watch (None when the reloader is off)
+        # Warm up while the server is already answering health checks; the first task awaits the same runtime
+        asyncio.create_task(_warm_up(task_manager, health, config.get("warmup"))),
+    ]
+    if target_pool is not None:
+        background_tasks.append(asyncio.create_task(target_pool.run_health_checks())) # Ejects target replicas that stop answering /readyz (once there are several)
 
     logger.info(f"A2A server for agent '{agent_id}' starting on port {listen_port}...")
     # Wait briefly to ensure server starts before sending message
 
-    # Wait a moment for the server to start, then send the initial message
-    await asyncio.sleep(2)
-    await send_initial_message(target_config)
-
-    # Keep the main task running (or handle server shutdown gracefully)
-    await server_task
+    try:
+        # Wait a moment for the server to start, then send the initial message
+        await asyncio.sleep(2)
+        await send_initial_message(target_pool)
+
+        # Keep the main task running (or handle server shutdown gracefully)
+        await server_task
+    finally:
+        # Stop the background loops along with the server
+        for task in background_tasks:
+            if task is not None:
+                task.cancel()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,135 @@
+# Local stand-in LLM for CrewAI (no network, no API key)
+import math
+import random
+import time
+import uuid
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from crewai import BaseLLM
+from pydantic import PrivateAttr
+
+from a2a_shared.checkpoints import QUESTION_PREFIX
+
+# LLM token events live in crewai.events on newer releases and crewai.utilities.events on older ones
+try:
+    from crewai.events import crewai_event_bus, LLMStreamChunkEvent
+except ImportError:
+    try:
+        from crewai.utilities.events import crewai_event_bus, LLMStreamChunkEvent
+    except ImportError:
+        crewai_event_bus = LLMStreamChunkEvent = None
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal")
+
+_WORDS = (
+    "agent task message artifact stream token session crew result status request response "
+    "process input output context model latency queue worker event update final answer"
+).split()
+
+
+@dataclass
+class FakeLLMProfile:
+    """Timing and size of FakeLLM responses (the `llm.fake` section of crewai_config.yaml).
+
+    latency_ms is the delay before the first token, drawn from `distribution`:
+    fixed (mean), uniform (min..max), normal (mean, stddev) or lognormal (mean, stddev of the
+    resulting delay). Tokens then follow at tokens_per_second (0 = all at once).
+    question_rate is the fraction of answers that are a clarifying question instead, which puts
+    the A2A task into input-required.
+    """
+    latency_ms: Dict[str, Any] = field(default_factory=lambda: {"distribution": "fixed", "mean": 0})
+    tokens_per_second: float = 0
+    output_tokens: int = 16
+    stream: bool = True
+    seed: int = 0
+    question_rate: float = 0
+
+    def __post_init__(self):
+        distribution = self.latency_ms.get("distribution", "fixed")
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {distribution}")
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> "FakeLLMProfile":
+        config = config or {}
+        return cls(**{name: config[name] for name in cls.__dataclass_fields__ if name in config})
+
+    def sample_latency(self, rng: random.Random) -> float:
+        """Returns the time to first token in seconds."""
+        spec = self.latency_ms
+        distribution = spec.get("distribution", "fixed")
+        mean = float(spec.get("mean", 0))
+        if distribution == "fixed":
+            ms = mean
+        elif distribution == "uniform":
+            ms = rng.uniform(float(spec.get("min", 0)), float(spec.get("max", mean)))
+        elif distribution == "normal":
+            ms = rng.gauss(mean, float(spec.get("stddev", 0)))
+        elif distribution == "lognormal":
+            stddev = float(spec.get("stddev", 0))
+            if mean <= 0:
+                ms = 0
+            else:
+                sigma2 = math.log(1 + (stddev / mean) ** 2)
+                ms = rng.lognormvariate(math.log(mean) - sigma2 / 2, math.sqrt(sigma2))
+        else:
+            raise ValueError(f"Unknown latency distribution: {distribution}")
+        return max(ms, 0) / 1000
+
+
+class FakeLLM(BaseLLM):
+    """Deterministic local LLM for offline load tests and the startup warm-up.
+
+    Each call sleeps for a sampled time to first token, then produces output_tokens words at
+    tokens_per_second, emitting them as LLMStreamChunkEvents when stream is on (so sendSubscribe
+    streams exactly like with a real provider). The answer and the latency sample depend only on
+    the seed and the prompt, so repeated runs produce the same outputs and timings.
+    The sleeps block the calling kickoff thread, as a synchronous provider call does.
+    """
+
+    _profile: FakeLLMProfile = PrivateAttr(default_factory=FakeLLMProfile)
+
+    def __init__(self, model: str = "fake-llm", profile: Optional[FakeLLMProfile] = None, **kwargs: Any):
+        super().__init__(model=model, **kwargs)
+        self._profile = profile or FakeLLMProfile()
+
+    def call(self, messages: Any, tools: Any = None, callbacks: Any = None, available_functions: Any = None, **kwargs: Any) -> str:
+        profile = self._profile
+        prompt = messages if isinstance(messages, str) else "\n".join(str(m.get("content", "")) for m in messages)
+        rng = random.Random(zlib.crc32(prompt.encode()) ^ profile.seed)
+        time.sleep(profile.sample_latency(rng))
+
+        words = [rng.choice(_WORDS) for _ in range(max(profile.output_tokens, 1))]
+        if profile.question_rate > 0 and rng.random() < profile.question_rate:
+            words = [QUESTION_PREFIX, "which"] + words[:8] + ["do", "you", "mean?"]
+        tokens = ["Thought: I now know the final answer\nFinal Answer:"] + [" " + word for word in words]
+        interval = 1 / profile.tokens_per_second if profile.tokens_per_second > 0 else 0
+        call_id = str(uuid.uuid4())
+        for token in tokens:
+            if interval:
+                time.sleep(interval)
+            if profile.stream and crewai_event_bus is not None:
+                crewai_event_bus.emit(self, LLMStreamChunkEvent(chunk=token, call_id=call_id))
+        return "".join(tokens)
+
+    def supports_function_calling(self) -> bool:
+        return False
+
+    def supports_stop_words(self) -> bool:
+        return False
+
+    def get_context_window_size(self) -> int:
+        return 8192
+
+
+def build_llm(config: Optional[Dict[str, Any]]) -> Optional[BaseLLM]:
+    """Returns the LLM selected by the `llm` section of crewai_config.yaml, or None for `backend: none`."""
+    config = config or {}
+    backend = config.get("backend", "none")
+    if backend == "none":
+        return None
+    if backend == "fake":
+        return FakeLLM(profile=FakeLLMProfile.from_config(config.get("fake")))
+    raise ValueError(f"Unknown llm backend: {backend}")
@@ -4,7 +4,15 @@ import logging
 import uvicorn
 import asyncio
 import uuid
+import functools
 import os # Import os to read environment variables
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, AsyncIterable, AsyncIterator, Callable, Dict, List, Optional, Tuple
 # Assuming we can reuse the common server components
 from common.server.server import A2AServer
 from common.server.task_manager import TaskManager
@@ -13,40 +21,419 @@ from common.types import (
     GetTaskRequest, SendTaskRequest, CancelTaskRequest,
     SetTaskPushNotificationRequest, GetTaskPushNotificationRequest,
     TaskResubscriptionRequest, SendTaskStreamingRequest, JSONRPCResponse,
-    Task, TaskStatus, TaskState,
-    Message, TextPart
+    SendTaskStreamingResponse, TaskStatusUpdateEvent, TaskArtifactUpdateEvent,
+    Task, TaskSendParams, TaskStatus, TaskState,
+    Message, TextPart, Artifact,
+    TaskNotFoundError, TaskNotCancelableError
 )
-from common.client.client import A2AClient # Import the client
-
-# Import CrewAI components (used conceptually in mock)
-from crewai import Agent, Task as CrewTask, Crew, Process
+from a2a_shared.admission import AdmissionController, QueueFullError, ServerBusyError, keep_slot_until
+from a2a_shared.artifacts import ArtifactChunker, iter_artifact_chunks
+from a2a_shared.checkpoints import CLARIFY_INSTRUCTION, CheckpointStore, InputRequired, parse_question
+from a2a_shared.compression import add_compression
+from a2a_shared.deadline import Deadline, DeadlineExceeded, DeadlineExceededError, deadline_guard, deadline_scope, run_within
+from a2a_shared.files import FileSpool, extract_message_input
+from a2a_shared.health import HealthChecks
+from a2a_shared.limits import RequestLimits, add_request_limits
+from a2a_shared.profiling import ProfilingEndpoints
+from a2a_shared.client import PooledA2AClient
+from a2a_shared.pool import ReplicaPool
+from a2a_shared.recording import add_recording
+from a2a_shared.reload import ConfigReloader, reloadable
+from a2a_shared.server import FastA2AServer
+from a2a_shared.task_store import TaskAlreadyRunningError, TaskStore, is_blocking
+from a2a_shared.streaming import ThreadEventBridge
+from a2a_shared.tracing import configure_tracing, start_span
+
+if TYPE_CHECKING:
+    from crewai import Crew # Annotations only; crewai itself is imported lazily by _crewai()
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _log_request(kind: str, request) -> None:
+    """Logs the task id at INFO; the full payload is only serialized when DEBUG is enabled."""
+    logger.info(f"Received {kind} request for task {request.params.id}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"{kind} payload: {request.model_dump_json(exclude_none=True)}")
+
+# crewai pulls in a large dependency tree (several seconds of imports), so it is loaded on first use
+# instead of at module import: the server binds and answers agent-card/health requests right away
+# while main() warms the import up in the background.
+@functools.lru_cache(maxsize=None)
+def _crewai():
+    """Imports and returns the crewai module."""
+    start = time.perf_counter()
+    import crewai
+    logger.info(f"crewai imported in {time.perf_counter() - start:.2f}s")
+    return crewai
+
+@functools.lru_cache(maxsize=None)
+def _crewai_events() -> Tuple[Any, Any]:
+    """Returns (crewai_event_bus, LLMStreamChunkEvent), or (None, None) if this crewai has no token events."""
+    _crewai()
+    # LLM token events live in crewai.events on newer releases and crewai.utilities.events on older ones
+    try:
+        from crewai.events import crewai_event_bus, LLMStreamChunkEvent
+    except ImportError:
+        try:
+            from crewai.utilities.events import crewai_event_bus, LLMStreamChunkEvent
+        except ImportError:
+            return None, None
+    return crewai_event_bus, LLMStreamChunkEvent
+
+async def _load_crewai():
+    """Imports crewai on a worker thread so a cold import never blocks the event loop."""
+    if _crewai_events.cache_info().currsize:
+        return
+    await asyncio.get_running_loop().run_in_executor(None, _crewai_events)
+
+class _StreamChunkRouter:
+    """Routes LLM stream-chunk events from CrewAI's global event bus to the kickoff that made the LLM call.
+
+    route() binds the kickoff's bridge in a ContextVar. CrewAI dispatches stream-chunk handlers
+    synchronously inside the LLM call, whose context is inherited from the kickoff even where newer
+    releases run the agent on a helper thread, so the context identifies which A2A task a token
+    belongs to. Tokens emitted outside a routed kickoff (e.g. during the warm-up) are dropped.
+    """
+
+    def __init__(self):
+        self._bridge: ContextVar[Optional[ThreadEventBridge]] = ContextVar("crew_stream_bridge", default=None)
+        self._lock = threading.Lock()
+        self._registered = False
+
+    def _on_chunk(self, source, event):
+        bridge = self._bridge.get()
+        if bridge is not None:
+            bridge.put(("token", event.chunk))
+
+    def register(self):
+        """Subscribes to CrewAI's event bus (once); imports crewai if needed."""
+        with self._lock:
+            if not self._registered:
+                event_bus, chunk_event = _crewai_events()
+                if event_bus is not None:
+                    event_bus.on(chunk_event)(self._on_chunk)
+                self._registered = True
+
+    @contextmanager
+    def route(self, bridge: ThreadEventBridge):
+        """Sends token events emitted by LLM calls made in this block to bridge."""
+        self.register()
+        token = self._bridge.set(bridge)
+        try:
+            yield
+        finally:
+            self._bridge.reset(token)
+
+_stream_chunk_router = _StreamChunkRouter()
+
+def _describe_step(step: Any) -> str:
+    """Short progress text for a CrewAI step callback payload (AgentAction, AgentFinish, ToolResult)."""
+    tool = getattr(step, "tool", None)
+    if tool:
+        return f"Using tool: {tool}"
+    thought = getattr(step, "thought", None)
+    if thought:
+        return f"Thought: {thought[:200]}"
+    return "Agent step completed"
+
+def _describe_task_output(output: Any) -> str:
+    """Short progress text for a CrewAI task callback payload (TaskOutput)."""
+    name = getattr(output, "name", None) or (getattr(output, "description", "") or "")[:60]
+    return f"Crew task finished: {name}" if name else "Crew task finished"
+
+_LLM_UNSET = object()
+
+# Sequential steps of the crew ({input} = the message text); the `crew.steps` config section overrides them
+DEFAULT_CREW_STEPS = [{"description": "Process the following text (mock):\n\n{input}", "expected_output": "A confirmation message indicating processing."}]
+
+@dataclass
+class _CrewCheckpoint:
+    """Where a crew run stopped to ask the user a question."""
+    input_text: str # The task's original input
+    completed: List[str] # Outputs of the steps that had finished
+    clarifications: List[Tuple[str, str]] # Earlier (question, answer) pairs of this task
+    question: str
+
+class _CrewProgress:
+    """Collects the outputs of the steps a kickoff finishes (task callback, on the kickoff thread).
+
+    A step answering with a question raises InputRequired with the checkpoint, which ends the kickoff:
+    the steps after it would only work from a guess.
+    """
+
+    def __init__(self, input_text: str, completed: List[str], clarifications: List[Tuple[str, str]]):
+        self.input_text = input_text
+        self.completed = list(completed)
+        self.clarifications = list(clarifications)
+
+    def on_task(self, output: Any):
+        text = str(getattr(output, "raw", None) or output)
+        question = parse_question(text)
+        if question is not None:
+            raise InputRequired(question, _CrewCheckpoint(self.input_text, list(self.completed), self.clarifications, question))
+        self.completed.append(text)
+
 # Task Manager that uses CrewAI structure (mock execution)
 class CrewAiTaskManager(TaskManager):
-    # No __init__ needed as config is not used for client here
+    def __init__(self, file_spool: FileSpool, admission: AdmissionController, task_store: TaskStore, parked_tasks: CheckpointStore,
+                 llm_config: Optional[Dict[str, Any]] = None, crew_config: Optional[Dict[str, Any]] = None):
+        self.file_spool = file_spool # Receives FileParts (uploads, inline base64, URIs)
+        self.admission = admission # Rate limits and fair scheduling of task execution
+        self.task_store = task_store # Tasks for tasks/get, tasks/cancel and tasks/resubscribe (incl. non-blocking sends)
+        self.parked_tasks = parked_tasks # Checkpoints of tasks waiting in input-required
+        self.crew_steps: List[Dict[str, str]] = (crew_config or {}).get("steps") or DEFAULT_CREW_STEPS
+        # Kickoffs get their own threads, sized to the scheduler, so queueing (and lane priority) happens
+        # in the admission scheduler rather than in the FIFO of a shared executor. A kickoff keeps its
+        # slot until its thread is free (_submit_kickoff), so abandoned kickoffs cannot fill the executor.
+        self._crew_executor = ThreadPoolExecutor(max_workers=admission.scheduler.max_concurrency, thread_name_prefix="crew-kickoff")
+        self._crew_workers = admission.scheduler.max_concurrency
+        self.llm_config = llm_config or {} # llm section of the config: which LLM the crew agents use
+        self._llm: Any = _LLM_UNSET
+
+    def resize_executor(self, max_workers: int):
+        """Moves new kickoffs to an executor with max_workers threads; kickoffs already running finish on the old one."""
+        if max_workers == self._crew_workers:
+            return
+        old_executor = self._crew_executor
+        self._crew_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="crew-kickoff")
+        self._crew_workers = max_workers
+        old_executor.shutdown(wait=False) # Its threads exit once their kickoffs are done
+        logger.info(f"Crew kickoff executor resized to {max_workers} threads")
+
+    def _submit_kickoff(self, kickoff: Callable[[], Any]) -> "asyncio.Future":
+        """Runs kickoff on the kickoff executor and returns a future for the loop to await.
+
+        The thread cannot be stopped from the loop, so a run abandoned at its deadline or by a client
+        disconnect leaves the kickoff running; the run's admission slot stays taken until the thread
+        is done, and new kickoffs wait in the fair scheduler instead of behind it in the executor.
+        """
+        future = self._crew_executor.submit(kickoff)
+        keep_slot_until(future)
+        return asyncio.wrap_future(future)
+
+    @staticmethod
+    def build_llm(llm_config: Optional[Dict[str, Any]]) -> Any:
+        """Builds the LLM of an llm section (None: no LLM); raises ValueError for invalid settings. Imports crewai."""
+        from fake_llm import build_llm
+        return build_llm(llm_config)
+
+    def reconfigure_llm(self, llm_config: Optional[Dict[str, Any]], llm: Any = _LLM_UNSET):
+        """Switches new kickoffs to llm (built from llm_config when not given); running kickoffs keep the one they started with."""
+        self.llm_config = llm_config or {}
+        self._llm = llm
 
     async def on_get_task(self, request: GetTaskRequest) -> JSONRPCResponse:
-        logger.info(f"Received GetTask request: {request.model_dump_json(exclude_none=True)}")
-        return JSONRPCResponse(id=request.id, result={"status": "Task not found"}) # Keep as dummy
+        _log_request("GetTask", request)
+        task = self.task_store.get(request.params.id, request.params.historyLength)
+        if task is None:
+            return JSONRPCResponse(id=request.id, error=TaskNotFoundError())
+        return JSONRPCResponse(id=request.id, result=task)
+
+    async def _extract_input(self, message: Message):
+        """Extracts the input text from the message parts; FileParts are spooled to disk."""
+        return await extract_message_input(message, self.file_spool)
+
+    def _build_crew(self, input_text: str, step_callback: Optional[Callable] = None, task_callback: Optional[Callable] = None, llm: Any = None,
+                    completed: List[str] = (), clarifications: List[Tuple[str, str]] = ()) -> "Crew":
+        """Defines the CrewAI Agent, Tasks (one per crew step) and Crew (without LLM unless one is given) for one input.
+
+        When resuming from a checkpoint, only the steps after the completed ones are built; the first
+        of them gets the earlier outputs, and every step the user's clarifications. Call after _load_crewai().
+        """
+        crewai = _crewai()
+        mock_agent = crewai.Agent(
+            role='Mock Processor',
+            goal='Process input text without LLM.',
+            backstory='I am a mock agent using CrewAI structure.',
+            verbose=True,
+            allow_delegation=False,
+            **({"llm": llm} if llm is not None else {})
+        )
+        if clarifications:
+            input_text += "\n\nClarifications from the user:\n" + "\n".join(f"Q: {question}\nA: {answer}" for question, answer in clarifications)
+        crew_tasks = []
+        for index, step in enumerate(self.crew_steps[len(completed):]):
+            description = step["description"].replace("{input}", input_text)
+            if index == 0 and completed:
+                description += "\n\nResults of the earlier steps:\n" + "\n\n".join(completed)
+            crew_tasks.append(crewai.Task(
+                description=f"{description}\n\n{CLARIFY_INSTRUCTION}",
+                expected_output=step.get("expected_output", "The result of this step."),
+                agent=mock_agent
+            ))
+        return crewai.Crew(
+            agents=[mock_agent],
+            tasks=crew_tasks,
+            process=crewai.Process.sequential,
+            verbose=True,
+            step_callback=step_callback,
+            task_callback=task_callback
+        )
+
+    def _get_llm(self) -> Any:
+        """The LLM selected by llm_config (None: no LLM, kickoff falls back to the mock text). Call after _load_crewai()."""
+        if self._llm is _LLM_UNSET:
+            self._llm = self.build_llm(self.llm_config)
+        return self._llm
+
+    def _format_result(self, crew_result: Any) -> str:
+        if self._get_llm() is not None:
+            return f"CrewAI processed: {crew_result}"
+        return f"CrewAI processed (mock structure, no LLM): {crew_result if crew_result else 'No specific output from kickoff'}"
+
+    @staticmethod
+    def _fallback_result(input_text: str) -> str:
+        return f"Mock processing complete for input: '{input_text[:30]}...'. (Kickoff failed/skipped)"
+
+    async def warm_up(self, config: Optional[Dict[str, Any]] = None):
+        """Pays CrewAI's one-time initialization before the first request arrives.
+
+        Imports crewai, builds a crew as requests do and, with dry_run, kicks off a crew backed by
+        FakeLLM on the kickoff executor (agent executor, prompt templates, event bus, telemetry setup).
+        """
+        config = config or {}
+        start = time.perf_counter()
+        await _load_crewai()
+        _stream_chunk_router.register()
+
+        def dry_run():
+            self._build_crew("warm-up", llm=self._get_llm())
+            if config.get("dry_run", True):
+                from fake_llm import FakeLLM # imports crewai, so only after _load_crewai()
+                self._build_crew("warm-up", llm=FakeLLM(model="fake-llm")).kickoff()
+
+        loop = asyncio.get_running_loop()
+        await asyncio.wait_for(loop.run_in_executor(self._crew_executor, dry_run), timeout=config.get("timeout_seconds", 120))
+        logger.info(f"CrewAI warm-up finished in {time.perf_counter() - start:.2f}s")
+
+    @staticmethod
+    def _progress(input_text: str, checkpoint: Optional[_CrewCheckpoint]) -> _CrewProgress:
+        """Progress of a new run for input_text, or of a run resuming from checkpoint with input_text answering its question."""
+        if checkpoint is None:
+            return _CrewProgress(input_text, [], [])
+        return _CrewProgress(checkpoint.input_text, checkpoint.completed, checkpoint.clarifications + [(checkpoint.question, input_text)])
+
+    async def _process(self, task_id: str, input_text: str, deadline: Optional[Deadline] = None, checkpoint: Optional[_CrewCheckpoint] = None) -> str:
+        """Runs the crew for the input text (or resumes it from checkpoint) and returns the result text.
+
+        The kickoff thread cannot be cancelled from the loop, so with a deadline the crew's step and
+        task callbacks raise DeadlineExceeded on that thread once it has passed, ending the kickoff.
+        A step that asks the user a question ends the kickoff the same way with InputRequired.
+        """
+        await _load_crewai()
+        progress = self._progress(input_text, checkpoint)
+        crew = self._build_crew(progress.input_text, step_callback=deadline_guard(deadline), task_callback=deadline_guard(deadline, progress.on_task),
+                                llm=self._get_llm(), completed=progress.completed, clarifications=progress.clarifications)
+
+        logger.info(f"Starting mock CrewAI task structure for A2A task ID: {task_id}" + (f" (resuming after {len(progress.completed)} steps)" if checkpoint else ""))
+        with start_span("crew.kickoff", {"a2a.task_id": task_id}) as span:
+            try:
+                crew_result = await self._submit_kickoff(crew.kickoff)
+                logger.info(f"Mock CrewAI task finished for A2A task ID: {task_id}. Result: {crew_result}")
+                return self._format_result(crew_result)
+            except (DeadlineExceeded, InputRequired):
+                raise
+            except Exception as kickoff_error:
+                if span is not None:
+                    span.record_error(kickoff_error)
+                logger.warning(f"CrewAI kickoff failed (possibly requires LLM?): {kickoff_error}", exc_info=True)
+                return self._fallback_result(input_text)
+
+    async def _run_crew_streaming(self, task_id: str, input_text: str, deadline: Optional[Deadline] = None,
+                                  checkpoint: Optional[_CrewCheckpoint] = None) -> AsyncIterator[Tuple[str, Any]]:
+        """Runs the crew (or resumes it from checkpoint) on an executor thread and yields its events as they happen.
+
+        Yields ("step", AgentAction/AgentFinish), ("task", TaskOutput) and ("token", str) tuples,
+        then a final ("result", str). Callbacks fire on the kickoff thread and are bridged to
+        this loop through a ThreadEventBridge. A deadline or a question ends the kickoff as in _process.
+        """
+        await _load_crewai()
+        loop = asyncio.get_running_loop()
+        bridge = ThreadEventBridge(loop)
+        progress = self._progress(input_text, checkpoint)
+
+        def on_task(output):
+            progress.on_task(output) # Raises InputRequired when the step asked a question
+            bridge.put(("task", output))
+
+        crew = self._build_crew(
+            progress.input_text,
+            step_callback=deadline_guard(deadline, lambda step: bridge.put(("step", step))),
+            task_callback=deadline_guard(deadline, on_task),
+            llm=self._get_llm(),
+            completed=progress.completed,
+            clarifications=progress.clarifications,
+        )
+
+        def kickoff():
+            try:
+                with _stream_chunk_router.route(bridge):
+                    return crew.kickoff()
+            finally:
+                bridge.close()
+
+        logger.info(f"Starting streaming CrewAI kickoff for A2A task ID: {task_id}")
+        with start_span("crew.kickoff", {"a2a.task_id": task_id, "crew.streaming": True}) as span:
+            kickoff_future = self._submit_kickoff(kickoff)
+            # The consumer may stop iterating (e.g. deadline passed) before the future is awaited below
+            kickoff_future.add_done_callback(lambda future: future.cancelled() or future.exception())
+            async for batch in bridge.batches():
+                # Tokens arrive in bursts; consecutive tokens of one batch are merged into a single event
+                tokens = []
+                for kind, payload in batch:
+                    if kind == "token":
+                        tokens.append(payload)
+                        continue
+                    if tokens:
+                        yield ("token", "".join(tokens))
+                        tokens = []
+                    yield (kind, payload)
+                if tokens:
+                    yield ("token", "".join(tokens))
+            try:
+                crew_result = await kickoff_future
+                logger.info(f"Streaming CrewAI kickoff finished for A2A task ID: {task_id}")
+                result_text = self._format_result(crew_result)
+            except (DeadlineExceeded, InputRequired):
+                raise
+            except Exception as kickoff_error:
+                if span is not None:
+                    span.record_error(kickoff_error)
+                logger.warning(f"CrewAI kickoff failed (possibly requires LLM?): {kickoff_error}", exc_info=True)
+                result_text = self._fallback_result(input_text)
+        yield ("result", result_text)
+
+    def _park(self, params: TaskSendParams, error: InputRequired, prior_history: List[Message]) -> TaskStatus:
+        """Parks the task with the checkpoint of its run and returns the input-required status carrying the question."""
+        question_message = Message(role="agent", parts=[TextPart(text=error.question)])
+        self.parked_tasks.park(params.id, params.sessionId, error.checkpoint, prior_history + [params.message, question_message])
+        logger.info(f"Task {params.id} is waiting for input: {error.question}")
+        return TaskStatus(state=TaskState.INPUT_REQUIRED, message=question_message)
 
     async def on_send_task(self, request: SendTaskRequest) -> JSONRPCResponse:
         """Handles incoming tasks/send requests and returns the result synchronously."""
-        logger.info(f"Received SendTask request: {request.model_dump_json(exclude_none=True)}")
+        _log_request("SendTask", request)
+        rate_limit_error = self.admission.check(request.params)
+        if rate_limit_error:
+            return JSONRPCResponse(id=request.id, error=rate_limit_error)
+        deadline = Deadline.from_metadata(request.params.metadata)
+        if deadline is not None and deadline.expired():
+            return JSONRPCResponse(id=request.id, error=DeadlineExceededError())
+        if not is_blocking(request.params):
+            return self._submit_background(request)
         task_id = request.params.id
         session_id = request.params.sessionId
         received_message = request.params.message
 
-        # Extract text from the message parts
-        input_text = ""
-        if received_message and received_message.parts:
-            for part in received_message.parts:
-                if isinstance(part, TextPart):
-                    input_text += part.text + "\n"
-        input_text = input_text.strip()
+        try:
+            input_text, files = await self._extract_input(received_message)
+        except Exception as e:
+            logger.warning(f"Failed to read the message parts for task {task_id}: {e}")
+            error_message = Message(role="agent", parts=[TextPart(text=f"Error reading message parts: {e}")])
+            task_result = Task(id=task_id, sessionId=session_id, status=TaskStatus(state=TaskState.FAILED, message=error_message))
+            return JSONRPCResponse(id=request.id, result=task_result)
 
         if not input_text:
             logger.warning("No text found in the received message.")
@@ -54,74 +441,221 @@ class CrewAiTaskManager(TaskManager):
             task_result = Task(id=task_id, sessionId=session_id, status=task_status)
             return JSONRPCResponse(id=request.id, result=task_result)
 
+        artifacts = None
+        prior_history: List[Message] = []
         try:
-            # Define CrewAI Agent and Task without LLM
-            mock_agent = Agent(
-                role='Mock Processor',
-                goal='Process input text without LLM.',
-                backstory='I am a mock agent using CrewAI structure.',
-                verbose=True,
-                allow_delegation=False
-            )
-            process_task = CrewTask(
-                description=f'Process the following text (mock):\n\n{input_text}',
-                expected_output='A confirmation message indicating processing.',
-                agent=mock_agent
-            )
-            crew = Crew(
-                agents=[mock_agent],
-                tasks=[process_task],
-                process=Process.sequential,
-                verbose=True
-            )
-
-            logger.info(f"Starting mock CrewAI task structure for A2A task ID: {task_id}")
-            loop = asyncio.get_running_loop()
-            kickoff_func = crew.kickoff
-            try:
-                crew_result = await loop.run_in_executor(None, kickoff_func)
-                logger.info(f"Mock CrewAI task finished for A2A task ID: {task_id}. Result: {crew_result}")
-                result_text = f"CrewAI processed (mock structure, no LLM): {crew_result if crew_result else 'No specific output from kickoff'}"
-                task_state = TaskState.COMPLETED
-            except Exception as kickoff_error:
-                logger.warning(f"CrewAI kickoff failed (possibly requires LLM?): {kickoff_error}", exc_info=True)
-                result_text = f"Mock processing complete for input: '{input_text[:30]}...'. (Kickoff failed/skipped)"
-                task_state = TaskState.COMPLETED
-
+            with deadline_scope(deadline): # Peer calls made while processing forward the remaining budget
+                async with self.admission.slot(request.params, deadline):
+                    with self.parked_tasks.resuming(task_id, session_id) as parked: # A reply to the task's question resumes its run (kept if the run fails)
+                        prior_history = parked.history if parked else []
+                        result_text = await run_within(deadline, self._process(task_id, input_text, deadline, parked.checkpoint if parked else None))
             response_message = Message(role="agent", parts=[TextPart(text=result_text)])
-            task_status = TaskStatus(state=task_state, message=response_message)
-            history = [received_message, response_message]
-
+            artifacts = [Artifact(name="crew_result", parts=[TextPart(text=result_text)], index=0, lastChunk=True)]
+            task_status = TaskStatus(state=TaskState.COMPLETED, message=response_message)
+            history = prior_history + [received_message, response_message]
+
+        except InputRequired as e:
+            task_status = self._park(request.params, e, prior_history)
+            history = prior_history + [received_message, task_status.message]
+        except QueueFullError:
+            logger.warning(f"Rejected task {task_id}: too many queued tasks for its client")
+            return JSONRPCResponse(id=request.id, error=ServerBusyError())
+        except DeadlineExceeded:
+            logger.warning(f"Abandoned task {task_id}: its deadline passed")
+            return JSONRPCResponse(id=request.id, error=DeadlineExceededError())
         except Exception as e:
             logger.error(f"Error during CrewAI structure simulation for task {task_id}: {e}", exc_info=True)
-            history = [received_message] if received_message else []
+            history = prior_history + ([received_message] if received_message else [])
             error_message = Message(role="agent", parts=[TextPart(text=f"Error processing task: {e}")])
             task_status = TaskStatus(state=TaskState.FAILED, message=error_message)
             if 'error_message' in locals():
                  history.append(error_message)
 
-        task_result = Task(id=task_id, sessionId=session_id, status=task_status, history=history)
+        finally:
+            self.file_spool.release(files)
+
+        task_result = Task(id=task_id, sessionId=session_id, status=task_status, history=history, artifacts=artifacts)
+        self.task_store.put(task_result)
         return JSONRPCResponse(id=request.id, result=task_result)
 
-    async def on_send_task_subscribe(self, request: SendTaskStreamingRequest):
-        logger.info(f"Received SendTaskStreaming request: {request.model_dump_json(exclude_none=True)}")
-        yield JSONRPCResponse(id=request.id, result={"task_id": request.params.id, "status": "Task received, streaming mock not implemented"})
+    def _submit_background(self, request: SendTaskRequest) -> JSONRPCResponse:
+        """Non-blocking tasks/send: records the task as SUBMITTED, runs it in the background and returns at once."""
+        params = request.params
+        parked = self.parked_tasks.get(params.id) # A reply keeps the history of the exchange so far
+        task = Task(id=params.id, sessionId=params.sessionId, status=TaskStatus(state=TaskState.SUBMITTED), history=(parked.history if parked else []) + [params.message])
+        if not self.task_store.start(task, self._run_background(params)):
+            return JSONRPCResponse(id=request.id, error=TaskAlreadyRunningError())
+        logger.info(f"Task {params.id} submitted for background execution")
+        return JSONRPCResponse(id=request.id, result=task)
+
+    async def _run_background(self, params):
+        """Executes a non-blocking task, recording its progress in the task store."""
+        task_id = params.id
+        deadline = Deadline.from_metadata(params.metadata)
+        files = []
+        prior_history: List[Message] = []
+        try:
+            input_text, files = await self._extract_input(params.message)
+            if not input_text:
+                logger.warning("No text found in the received message.")
+                self.task_store.update_status(task_id, TaskStatus(state=TaskState.FAILED, message=Message(role="agent", parts=[TextPart(text="No text found in the message.")])))
+                return
+            with deadline_scope(deadline):
+                async with self.admission.slot(params, deadline):
+                    self.task_store.update_status(task_id, TaskStatus(state=TaskState.WORKING))
+                    with self.parked_tasks.resuming(task_id, params.sessionId) as parked:
+                        prior_history = parked.history if parked else []
+                        result_text = await run_within(deadline, self._process(task_id, input_text, deadline, parked.checkpoint if parked else None))
+            self.task_store.add_artifact(task_id, Artifact(name="crew_result", parts=[TextPart(text=result_text)], index=0, lastChunk=True))
+            self.task_store.update_status(task_id, TaskStatus(state=TaskState.COMPLETED, message=Message(role="agent", parts=[TextPart(text=result_text)])))
+        except InputRequired as e:
+            self.task_store.update_status(task_id, self._park(params, e, prior_history))
+        except QueueFullError:
+            logger.warning(f"Rejected task {task_id}: too many queued tasks for its client")
+            self.task_store.update_status(task_id, TaskStatus(state=TaskState.FAILED, message=Message(role="agent", parts=[TextPart(text=ServerBusyError().message)])))
+        except DeadlineExceeded:
+            logger.warning(f"Abandoned task {task_id}: its deadline passed")
+            self.task_store.update_status(task_id, TaskStatus(state=TaskState.FAILED, message=Message(role="agent", parts=[TextPart(text=DeadlineExceededError().message)])))
+        except asyncio.CancelledError:
+            logger.info(f"Background task {task_id} canceled")
+            self.parked_tasks.discard(task_id) # A canceled reply does not leave the task resumable
+            self.task_store.update_status(task_id, TaskStatus(state=TaskState.CANCELED))
+            raise
+        except Exception as e:
+            logger.error(f"Error during CrewAI structure simulation for task {task_id}: {e}", exc_info=True)
+            self.task_store.update_status(task_id, TaskStatus(state=TaskState.FAILED, message=Message(role="agent", parts=[TextPart(text=f"Error processing task: {e}")])))
+        finally:
+            self.file_spool.release(files)
+
+    async def on_send_task_subscribe(self, request: SendTaskStreamingRequest) -> AsyncIterable[SendTaskStreamingResponse]:
+        """Handles tasks/sendSubscribe by streaming status updates and the crew result as artifact chunks."""
+        _log_request("SendTaskStreaming", request)
+        rate_limit_error = self.admission.check(request.params)
+        if rate_limit_error:
+            return JSONRPCResponse(id=request.id, error=rate_limit_error)
+        deadline = Deadline.from_metadata(request.params.metadata)
+        if deadline is not None and deadline.expired():
+            return JSONRPCResponse(id=request.id, error=DeadlineExceededError())
+        # A2AServer awaits this method and iterates the result, so hand back the generator
+        return self._stream_task(request, deadline)
+
+    async def _stream_task(self, request: SendTaskStreamingRequest, deadline: Optional[Deadline] = None) -> AsyncIterable[SendTaskStreamingResponse]:
+        """Streams the task, recording it in the task store for tasks/get, tasks/cancel and tasks/resubscribe."""
+        params = request.params
+        parked = self.parked_tasks.get(params.id) # A reply keeps the history of the exchange so far
+        self.task_store.put(Task(id=params.id, sessionId=params.sessionId, status=TaskStatus(state=TaskState.SUBMITTED),
+                                 history=(parked.history if parked else []) + [params.message]))
+        try:
+            async for response in self._run_stream(request, deadline):
+                yield response
+        finally:
+            self.task_store.cancel_unfinished(params.id, "The stream was closed before the task finished.")
+
+    async def _run_stream(self, request: SendTaskStreamingRequest, deadline: Optional[Deadline] = None) -> AsyncIterable[SendTaskStreamingResponse]:
+        task_id = request.params.id
+        record = self.task_store.record
+        yield SendTaskStreamingResponse(id=request.id, result=record(TaskStatusUpdateEvent(id=task_id, status=TaskStatus(state=TaskState.WORKING))))
+
+        try:
+            input_text, files = await self._extract_input(request.params.message)
+        except Exception as e:
+            logger.warning(f"Failed to read the message parts for task {task_id}: {e}")
+            error_message = Message(role="agent", parts=[TextPart(text=f"Error reading message parts: {e}")])
+            yield SendTaskStreamingResponse(id=request.id, result=record(TaskStatusUpdateEvent(
+                id=task_id, status=TaskStatus(state=TaskState.FAILED, message=error_message), final=True)))
+            return
+
+        if not input_text:
+            logger.warning("No text found in the received message.")
+            yield SendTaskStreamingResponse(id=request.id, result=record(TaskStatusUpdateEvent(
+                id=task_id, status=TaskStatus(state=TaskState.FAILED, message=request.params.message), final=True), message_to_history=False))
+            return
+
+        # Partial LLM output is streamed as chunks of the crew_result artifact
+        partial = ArtifactChunker(name="crew_result")
+        result_text = ""
+        prior_history: List[Message] = []
+        try:
+            with deadline_scope(deadline):
+                async with self.admission.slot(request.params, deadline):
+                    with self.parked_tasks.resuming(task_id, request.params.sessionId) as parked:
+                        prior_history = parked.history if parked else []
+                        async for kind, payload in self._run_crew_streaming(task_id, input_text, deadline, parked.checkpoint if parked else None):
+                            if deadline is not None:
+                                deadline.check()
+                            if kind == "token":
+                                yield SendTaskStreamingResponse(id=request.id, result=record(TaskArtifactUpdateEvent(id=task_id, artifact=partial.chunk(payload))))
+                            elif kind == "result":
+                                result_text = payload
+                            else:
+                                progress = _describe_step(payload) if kind == "step" else _describe_task_output(payload)
+                                yield SendTaskStreamingResponse(id=request.id, result=record(TaskStatusUpdateEvent(id=task_id, status=TaskStatus(
+                                    state=TaskState.WORKING, message=Message(role="agent", parts=[TextPart(text=progress)]))), message_to_history=False))
+        except InputRequired as e:
+            # The stream ends here; the client replies with a new tasks/sendSubscribe for the same task
+            yield SendTaskStreamingResponse(id=request.id, result=record(TaskStatusUpdateEvent(
+                id=task_id, status=self._park(request.params, e, prior_history), final=True)))
+            return
+        except QueueFullError:
+            logger.warning(f"Rejected task {task_id}: too many queued tasks for its client")
+            self.task_store.update_status(task_id, TaskStatus(state=TaskState.FAILED, message=Message(role="agent", parts=[TextPart(text=ServerBusyError().message)])))
+            yield SendTaskStreamingResponse(id=request.id, error=ServerBusyError())
+            return
+        except DeadlineExceeded:
+            logger.warning(f"Abandoned task {task_id}: its deadline passed")
+            error_message = Message(role="agent", parts=[TextPart(text=DeadlineExceededError().message)])
+            yield SendTaskStreamingResponse(id=request.id, result=record(TaskStatusUpdateEvent(
+                id=task_id, status=TaskStatus(state=TaskState.FAILED, message=error_message), final=True)))
+            return
+        except Exception as e:
+            logger.error(f"Error during CrewAI structure simulation for task {task_id}: {e}", exc_info=True)
+            error_message = Message(role="agent", parts=[TextPart(text=f"Error processing task: {e}")])
+            yield SendTaskStreamingResponse(id=request.id, result=record(TaskStatusUpdateEvent(
+                id=task_id, status=TaskStatus(state=TaskState.FAILED, message=error_message), final=True)))
+            return
+        finally:
+            self.file_spool.release(files)
+
+        # The first chunk of the final result replaces any streamed partial output (append=False)
+        for artifact in iter_artifact_chunks(result_text, name="crew_result"):
+            yield SendTaskStreamingResponse(id=request.id, result=record(TaskArtifactUpdateEvent(id=task_id, artifact=artifact)))
+
+        # The result text was already delivered as artifact chunks, so the final status carries no message
+        # (the stored task gets it, as for tasks/send)
+        self.task_store.update_status(task_id, TaskStatus(state=TaskState.COMPLETED, message=Message(role="agent", parts=[TextPart(text=result_text)])))
+        yield SendTaskStreamingResponse(id=request.id, result=TaskStatusUpdateEvent(
+            id=task_id, status=TaskStatus(state=TaskState.COMPLETED), final=True))
 
     async def on_cancel_task(self, request: CancelTaskRequest) -> JSONRPCResponse:
-        logger.info(f"Received CancelTask request: {request.model_dump_json(exclude_none=True)}")
-        return JSONRPCResponse(id=request.id, result={"status": "Cancel request received (mock)"})
+        _log_request("CancelTask", request)
+        if self.parked_tasks.discard(request.params.id): # Waiting for input: nothing runs, dropping the checkpoint cancels it
+            self.task_store.update_status(request.params.id, TaskStatus(state=TaskState.CANCELED))
+            task = self.task_store.get(request.params.id) or Task(id=request.params.id, status=TaskStatus(state=TaskState.CANCELED))
+            return JSONRPCResponse(id=request.id, result=task)
+        if self.task_store.get(request.params.id) is None:
+            return JSONRPCResponse(id=request.id, error=TaskNotFoundError())
+        if not await self.task_store.cancel(request.params.id):
+            return JSONRPCResponse(id=request.id, error=TaskNotCancelableError())
+        return JSONRPCResponse(id=request.id, result=self.task_store.get(request.params.id))
 
     async def on_set_task_push_notification(self, request: SetTaskPushNotificationRequest) -> JSONRPCResponse:
-        logger.info(f"Received SetTaskPushNotification request: {request.model_dump_json(exclude_none=True)}")
+        _log_request("SetTaskPushNotification", request)
         return JSONRPCResponse(id=request.id, result={"status": "Push notification setting received (mock)"})
 
     async def on_get_task_push_notification(self, request: GetTaskPushNotificationRequest) -> JSONRPCResponse:
-        logger.info(f"Received GetTaskPushNotification request: {request.model_dump_json(exclude_none=True)}")
+        _log_request("GetTaskPushNotification", request)
         return JSONRPCResponse(id=request.id, result={"push_notification_endpoint": None}) # Keep as dummy
 
     async def on_resubscribe_to_task(self, request: TaskResubscriptionRequest):
-         logger.info(f"Received TaskResubscription request: {request.model_dump_json(exclude_none=True)}")
-         yield JSONRPCResponse(id=request.id, result={"status": "Resubscription mock not implemented"})
+        _log_request("TaskResubscription", request)
+        if self.task_store.get(request.params.id) is None:
+            return JSONRPCResponse(id=request.id, error=TaskNotFoundError())
+        return self._resubscribe_stream(request)
+
+    async def _resubscribe_stream(self, request: TaskResubscriptionRequest) -> AsyncIterable[SendTaskStreamingResponse]:
+        """Streams the task's current state and then its updates until it finishes."""
+        async for event in self.task_store.subscribe(request.params.id):
+            yield SendTaskStreamingResponse(id=request.id, result=event)
 
 
 def load_config(config_path="crewai_config.yaml"):
@@ -136,14 +670,13 @@ def load_config(config_path="crewai_config.yaml"):
         logger.error(f"Error parsing configuration file: {e}", exc_info=True)
         return None
 
-async def send_initial_message(target_config):
+async def send_initial_message(target_pool: Optional[ReplicaPool]):
     """Sends an initial test message to the target agent."""
-    if not target_config:
+    if target_pool is None:
         logger.warning("Target agent configuration not found. Skipping initial message.")
         return
 
-    target_url = f"http://{target_config.get('address', 'localhost')}:{target_config.get('port', 8001)}/" # Target ADK agent
-    client = A2AClient(url=target_url)
+    client = PooledA2AClient(target_pool) # Balances over the target's replicas (a single URL without `replicas`)
 
     message_payload = Message(
         role="user",
@@ -156,17 +689,32 @@ async def send_initial_message(target_config):
     }
 
     try:
-        logger.info(f"Sending test message to {target_url}...")
+        logger.info(f"Sending test message to {', '.join(target_pool.urls)}...")
         response = await client.send_task(task_params)
-        logger.info(f"Received response from target agent: {response.model_dump_json()}")
+        logger.info(f"Received response from target agent for task {task_id}: {response.result.status.state if response.result else response.error}")
     except Exception as e:
         logger.error(f"Error sending initial message: {e}", exc_info=True)
 
 
+async def _warm_up(task_manager: CrewAiTaskManager, health: HealthChecks, config: Optional[Dict[str, Any]]):
+    """Runs the configured warm-up, then marks the agent ready. A failed warm-up is logged, not fatal:
+    requests still work, they just pay the initialization cost themselves."""
+    config = config or {}
+    if not config.get("enabled", True):
+        health.mark_ready("warm-up disabled")
+        return
+    try:
+        await task_manager.warm_up(config)
+        health.mark_ready()
+    except Exception as e:
+        logger.warning(f"CrewAI warm-up failed, serving without it: {e!r}", exc_info=True)
+        health.mark_ready("warm-up failed")
+
 async def main():
     """Main async function to start the server and send initial message."""
     logger.info("CrewAI Agent starting...")
-    config = load_config()
+    config_path = "crewai_config.yaml"
+    config = load_config(config_path)
 
     if not config:
         logger.error("Failed to load configuration. Agent cannot start.")
@@ -175,8 +723,10 @@ async def main():
     agent_id = config.get("agent_id", "default-crewai-agent")
     listen_port = config.get("listen_port", 8002)
     target_config = config.get("target_agent")
+    target_pool = ReplicaPool.from_config(target_config, default_port=8001) if target_config else None
     # Read public URL from environment variable, fallback to config/default
     agent_public_url = os.environ.get("AGENT_PUBLIC_URL", f"http://localhost:{listen_port}/")
+    configure_tracing(agent_id, config.get("tracing")) # Spans for server dispatch, queue wait, kickoff and peer calls
     logger.info(f"Using public URL: {agent_public_url}")
 
     # Define the Agent Card
@@ -185,31 +735,93 @@ async def main():
         description="A sample agent built with CrewAI (mock execution) speaking A2A.", # Updated description
         url=agent_public_url, # Use the public URL from env var
         version="0.1.0",
-        capabilities=AgentCapabilities(streaming=False, pushNotifications=False, stateTransitionHistory=False),
+        capabilities=AgentCapabilities(streaming=True, pushNotifications=False, stateTransitionHistory=False),
+        defaultInputModes=["text", "file"],
         skills=[AgentSkill(id="basic-chat-mock", name="Basic Chat Mock", description="Handles basic chat interactions with mock processing.")] # Updated skill
     )
 
-    task_manager = CrewAiTaskManager() # Config no longer needed
+    file_spool = FileSpool.from_config(config.get("files"), public_url=agent_public_url) # Spools FileParts and uploads to local disk
+    admission = AdmissionController(config.get("admission")) # Rate limits + weighted fair queue (see the admission section of the config)
+    task_store = TaskStore.from_config(config.get("task_store")) # Bounded in-memory store for tasks/get (non-blocking sends)
+
+    def cancel_parked(task_id: str, reason: str): # A parked task whose checkpoint is dropped can no longer resume
+        task_store.update_status(task_id, TaskStatus(state=TaskState.CANCELED, message=Message(role="agent", parts=[TextPart(text=reason)])))
+
+    parked_tasks = CheckpointStore.from_config(config.get("parked_tasks"), on_expire=cancel_parked) # Checkpoints of tasks waiting for input
+    task_manager = CrewAiTaskManager(file_spool=file_spool, admission=admission, task_store=task_store, parked_tasks=parked_tasks,
+                                     llm_config=config.get("llm"), crew_config=config.get("crew"))
+    health = HealthChecks(ready=False) # /readyz turns ready once the warm-up below has finished
 
-    server = A2AServer(
+    limits = RequestLimits.from_config(config.get("limits")) # Body size, parts per message and part size of JSON-RPC requests
+
+    # fast_json: validate requests from raw bytes and serialize responses with model_dump_json
+    server_class = FastA2AServer if config.get("fast_json", True) else A2AServer
+    server = server_class(
         host="0.0.0.0",
         port=listen_port,
         agent_card=agent_card,
-        task_manager=task_manager
+        task_manager=task_manager,
+        **({"limits": limits} if server_class is FastA2AServer else {}) # The stock server only gets the body limit
     )
+    file_spool.add_routes(server.app) # POST /files (streaming upload), GET /files/{file_id}
+    admission.add_routes(server.app) # GET /metrics
+    health.add_routes(server.app) # GET /healthz, GET /readyz
+    profiling = ProfilingEndpoints(config.get("profiling"))
+    profiling.resources.add_gauge("task_store_tasks", lambda: len(task_store)) # Bounded stores that would show a leak first
+    profiling.resources.add_gauge("spooled_files", lambda: len(file_spool))
+    profiling.resources.add_gauge("parked_tasks", lambda: len(parked_tasks))
+    profiling.resources.add_gauge("parked_task_bytes", lambda: parked_tasks.size_bytes)
+    profiling.add_routes(server.app) # GET /admin/profile, GET /admin/loop, GET /admin/resources
+
+    # Hot reload of the tunables below on a change of the config file or POST /admin/reload; running work is kept
+    def apply_admission(new_admission: AdmissionController):
+        admission.reconfigure(new_admission)
+        task_manager.resize_executor(admission.scheduler.max_concurrency) # Kickoff threads follow the scheduler
+
+    reloader = ConfigReloader(config_path, config, config.get("reload"), admin_token=profiling.admin_token)
+    reloader.register("admission", reloadable(AdmissionController, apply_admission))
+    reloader.register("task_store", reloadable(TaskStore.from_config, task_store.reconfigure))
+    reloader.register("parked_tasks", reloadable(CheckpointStore.from_config, parked_tasks.reconfigure))
+    # The new LLM is built while preparing, so an invalid llm section rejects the reload (crewai is imported by then, see the warm-up)
+    reloader.register("llm", reloadable(lambda section: (section, CrewAiTaskManager.build_llm(section)),
+                                        lambda built: task_manager.reconfigure_llm(*built)))
+    if limits is not None:
+        reloader.register("limits", reloadable(RequestLimits.from_config, limits.reconfigure), static_keys=("enabled",))
+    if target_pool is not None:
+        reloader.register("target_agent", reloadable(lambda section: ReplicaPool.from_config(section, default_port=8001), target_pool.reconfigure))
+    reloader.add_routes(server.app) # GET/POST /admin/reload
+
+    add_recording(server.app, config.get("recording"), path=server.endpoint) # Traffic log for tools/replay.py (innermost: sees accepted requests)
+    add_compression(server.app, config.get("compression")) # gzip/zstd for large responses and SSE streams
+    add_request_limits(server.app, limits, path=server.endpoint) # 413 for oversized bodies, checked while they are received
 
     # Configure and start Uvicorn server
     uvicorn_config = uvicorn.Config(server.app, host="0.0.0.0", port=listen_port, log_level="info")
     uvicorn_server = uvicorn.Server(uvicorn_config)
     server_task = asyncio.create_task(uvicorn_server.serve())
+    profiling.start() # Event-loop lag monitor
+    background_tasks = [
+        file_spool.start(), # Sweeps expired uploads
+        reloader.start(), # Config file watch (None when the reloader is off)
+        # Warm up while the server is already answering health checks; the first task awaits the same import
+        asyncio.create_task(_warm_up(task_manager, health, config.get("warmup"))),
+    ]
+    if target_pool is not None:
+        background_tasks.append(asyncio.create_task(target_pool.run_health_checks())) # Ejects target replicas that stop answering /readyz (once there are several)
 
     logger.info(f"A2A server for agent '{agent_id}' starting on port {listen_port}...")
 
-    # Wait for server startup and send message
-    await asyncio.sleep(2)
-    await send_initial_message(target_config)
-
-    await server_task
+    try:
+        # Wait for server startup and send message
+        await asyncio.sleep(2)
+        await send_initial_message(target_pool)
+
+        await server_task
+    finally:
+        # Stop the background loops along with the server
+        for task in background_tasks:
+            if task is not None:
+                task.cancel()
 
 
 if __name__ == "__main__":
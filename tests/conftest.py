@@ -0,0 +1,9 @@
+# Makes a2a_shared and the A2A sample `common` package (git submodule) importable, as PYTHONPATH=/app does in compose.yaml
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+for path in (os.path.join(ROOT, "third_party", "google_a2a", "samples", "python"), ROOT):
+    if os.path.isdir(path) and path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,294 @@
+import asyncio
+import concurrent.futures
+import threading
+
+import pytest
+
+from a2a_shared.admission import FairScheduler, QueueFullError, RateLimiter, keep_slot_until
+from a2a_shared.deadline import Deadline, DeadlineExceeded
+
+
+def test_rate_limiter_spends_burst_then_refills():
+    limiter = RateLimiter(rate=2, burst=2)
+    assert limiter.acquire("a", now=0.0) == 0
+    assert limiter.acquire("a", now=0.0) == 0
+    assert limiter.acquire("a", now=0.0) == pytest.approx(0.5)
+    assert limiter.acquire("a", now=0.5) == 0 # One token refilled after 1/rate seconds
+    assert limiter.acquire("b", now=0.5) == 0 # Keys have separate buckets
+
+
+def test_rate_limiter_evicts_least_recently_used_keys():
+    limiter = RateLimiter(rate=1, burst=1, max_keys=2)
+    limiter.acquire("a", now=0.0)
+    limiter.acquire("b", now=0.0)
+    limiter.acquire("a", now=0.0)
+    limiter.acquire("c", now=0.0)
+    assert len(limiter) == 2
+    assert limiter.acquire("b", now=0.0) == 0 # b was evicted, so it starts from a full bucket again
+
+
+async def _run_in_order(scheduler: FairScheduler, tenants, lane=None):
+    """Queues one task per tenant behind a held slot and returns the order in which they got a slot."""
+    order = []
+    gate = asyncio.Event()
+
+    async def blocker():
+        async with scheduler.slot("blocker", lane):
+            await gate.wait()
+
+    async def task(tenant):
+        async with scheduler.slot(tenant, lane):
+            order.append(tenant)
+
+    holder = asyncio.create_task(blocker())
+    await asyncio.sleep(0)
+    tasks = [asyncio.create_task(task(tenant)) for tenant in tenants]
+    await asyncio.sleep(0)
+    gate.set()
+    await asyncio.gather(holder, *tasks)
+    return order
+
+
+def test_fair_scheduler_interleaves_tenants():
+    scheduler = FairScheduler(max_concurrency=1, max_queue_per_tenant=10)
+    order = asyncio.run(_run_in_order(scheduler, ["a", "a", "a", "b", "b", "b"]))
+    assert order == ["a", "b", "a", "b", "a", "b"] # a's burst does not hold b back
+
+
+def test_fair_scheduler_weights_shares():
+    scheduler = FairScheduler(max_concurrency=1, max_queue_per_tenant=10, weights={"a": 2})
+    order = asyncio.run(_run_in_order(scheduler, ["a"] * 4 + ["b"] * 2))
+    assert order[:3].count("a") == 2 and order[:3].count("b") == 1
+
+
+def test_fair_scheduler_caps_concurrency():
+    async def scenario():
+        scheduler = FairScheduler(max_concurrency=2, max_queue_per_tenant=10)
+        peak = 0
+
+        async def task(tenant):
+            nonlocal peak
+            async with scheduler.slot(tenant):
+                peak = max(peak, scheduler.running)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(task(f"t{i}") for i in range(6)))
+        return scheduler, peak
+
+    scheduler, peak = asyncio.run(scenario())
+    assert peak == 2
+    assert scheduler.running == 0 and scheduler.queued == 0
+
+
+def test_fair_scheduler_rejects_when_tenant_queue_is_full():
+    async def scenario():
+        scheduler = FairScheduler(max_concurrency=1, max_queue_per_tenant=1)
+        gate = asyncio.Event()
+
+        async def task():
+            async with scheduler.slot("a"):
+                await gate.wait()
+
+        running = asyncio.create_task(task())
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(task())
+        await asyncio.sleep(0)
+        with pytest.raises(QueueFullError):
+            async with scheduler.slot("a"):
+                pass
+        gate.set()
+        await asyncio.gather(running, queued)
+        return scheduler
+
+    scheduler = asyncio.run(scenario())
+    assert scheduler.rejected_total == 1
+    assert scheduler.running == 0 and scheduler.queued == 0
+
+
+def test_fair_scheduler_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        scheduler = FairScheduler(max_concurrency=1, max_queue_per_tenant=10)
+        gate = asyncio.Event()
+
+        async def task():
+            async with scheduler.slot("a"):
+                await gate.wait()
+
+        running = asyncio.create_task(task())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(task())
+        await asyncio.sleep(0)
+        assert scheduler.queued == 1
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert scheduler.queued == 0
+        gate.set()
+        await running
+        return scheduler
+
+    scheduler = asyncio.run(scenario())
+    assert scheduler.running == 0
+
+
+def test_fair_scheduler_drops_tasks_whose_deadline_passes_in_the_queue():
+    async def scenario():
+        scheduler = FairScheduler(max_concurrency=1, max_queue_per_tenant=10)
+        gate = asyncio.Event()
+
+        async def task():
+            async with scheduler.slot("a"):
+                await gate.wait()
+
+        running = asyncio.create_task(task())
+        await asyncio.sleep(0)
+        with pytest.raises(DeadlineExceeded):
+            async with scheduler.slot("b", deadline=Deadline.after(0.01)):
+                pass
+        gate.set()
+        await running
+        return scheduler
+
+    scheduler = asyncio.run(scenario())
+    assert scheduler.expired_total == 1
+    assert scheduler.running == 0 and scheduler.queued == 0
+
+
+def test_lanes_prefer_the_higher_priority_lane():
+    async def scenario():
+        scheduler = FairScheduler(max_concurrency=1, max_queue_per_tenant=10, lanes={"interactive": 1, "batch": 1})
+        order = []
+        gate = asyncio.Event()
+
+        async def blocker():
+            async with scheduler.slot("blocker", "batch"):
+                await gate.wait()
+
+        async def task(name, lane):
+            async with scheduler.slot(name, lane):
+                order.append(name)
+
+        holder = asyncio.create_task(blocker())
+        await asyncio.sleep(0)
+        tasks = [asyncio.create_task(task("batch-1", "batch")), asyncio.create_task(task("batch-2", "batch")),
+                 asyncio.create_task(task("interactive", "interactive"))]
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(holder, *tasks)
+        return order
+
+    assert asyncio.run(scenario())[0] == "interactive"
+
+
+def test_lane_cap_keeps_slots_for_interactive_work():
+    async def scenario():
+        scheduler = FairScheduler(max_concurrency=2, max_queue_per_tenant=10, lanes={"interactive": 2, "batch": 1})
+        gate = asyncio.Event()
+
+        async def task(tenant, lane):
+            async with scheduler.slot(tenant, lane):
+                await gate.wait()
+
+        batch = [asyncio.create_task(task(f"b{i}", "batch")) for i in range(3)]
+        await asyncio.sleep(0)
+        assert scheduler.lanes["batch"].running == 1 # The batch cap holds back the rest of the batch burst
+        interactive = asyncio.create_task(task("i", "interactive"))
+        await asyncio.sleep(0)
+        assert scheduler.lanes["interactive"].running == 1
+        gate.set()
+        await asyncio.gather(*batch, interactive)
+        return scheduler
+
+    scheduler = asyncio.run(scenario())
+    assert scheduler.lanes["batch"].started_total == 3
+    assert scheduler.running == 0
+
+
+def test_unknown_lane_falls_back_to_the_lowest_priority_lane():
+    async def scenario():
+        scheduler = FairScheduler(max_concurrency=1, max_queue_per_tenant=10, lanes={"interactive": 1, "batch": 1})
+        async with scheduler.slot("a", "no-such-lane"):
+            return scheduler.lanes["batch"].running
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_reconfigure_moves_queued_tasks_of_a_removed_lane():
+    async def scenario():
+        scheduler = FairScheduler(max_concurrency=1, max_queue_per_tenant=10, lanes={"interactive": 1, "batch": 1})
+        gate = asyncio.Event()
+        done = []
+
+        async def task(tenant, lane):
+            async with scheduler.slot(tenant, lane):
+                await gate.wait()
+                done.append(tenant)
+
+        running = asyncio.create_task(task("a", "interactive"))
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(task("b", "batch"))
+        await asyncio.sleep(0)
+        scheduler.reconfigure(FairScheduler(max_concurrency=2, max_queue_per_tenant=10, lanes={"interactive": 2}))
+        await asyncio.sleep(0)
+        assert scheduler.running == 2 # The raised cap started the moved task right away
+        gate.set()
+        await asyncio.gather(running, queued)
+        return scheduler, done
+
+    scheduler, done = asyncio.run(scenario())
+    assert list(scheduler.lanes) == ["interactive"]
+    assert sorted(done) == ["a", "b"]
+    assert scheduler.running == 0 and scheduler.lanes["interactive"].running == 0
+
+
+def test_slot_stays_taken_until_work_on_another_thread_finishes():
+    async def scenario():
+        scheduler = FairScheduler(max_concurrency=1, max_queue_per_tenant=10)
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        release_thread = threading.Event()
+        started = []
+
+        async def abandoned():
+            async with scheduler.slot("a"):
+                future = executor.submit(release_thread.wait)
+                keep_slot_until(future)
+                await asyncio.wrap_future(future)
+
+        async def next_task():
+            async with scheduler.slot("b"):
+                started.append("b")
+
+        run = asyncio.create_task(abandoned())
+        await asyncio.sleep(0.01)
+        run.cancel() # E.g. its deadline passed; the thread keeps running
+        await asyncio.gather(run, return_exceptions=True)
+        waiting = asyncio.create_task(next_task())
+        await asyncio.sleep(0.01)
+        assert not started and scheduler.running == 1 and scheduler.orphaned == 1
+        release_thread.set()
+        await asyncio.wait_for(waiting, 1)
+        executor.shutdown()
+        return scheduler, started
+
+    scheduler, started = asyncio.run(scenario())
+    assert started == ["b"]
+    assert scheduler.running == 0 and scheduler.orphaned == 0 and scheduler.orphaned_total == 1
+
+
+def test_finished_work_releases_the_slot_with_the_block():
+    async def scenario():
+        scheduler = FairScheduler(max_concurrency=1, max_queue_per_tenant=10)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            async with scheduler.slot("a"):
+                future = executor.submit(lambda: 42)
+                keep_slot_until(future)
+                assert await asyncio.wrap_future(future) == 42
+        return scheduler
+
+    scheduler = asyncio.run(scenario())
+    assert scheduler.running == 0 and scheduler.orphaned_total == 0
+
+
+def test_keep_slot_until_outside_a_slot_does_nothing():
+    future = concurrent.futures.Future()
+    keep_slot_until(future) # No slot is current: nothing to keep
+    future.set_result(None)
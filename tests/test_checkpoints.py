@@ -0,0 +1,125 @@
+import pytest
+
+from a2a_shared import checkpoints
+from a2a_shared.checkpoints import CheckpointStore, InputRequired, approximate_size, parse_question
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(checkpoints.time, "monotonic", clock)
+    return clock
+
+
+def _store(**kwargs):
+    expired = []
+    store = CheckpointStore(on_expire=lambda task_id, reason: expired.append(task_id), **kwargs)
+    return store, expired
+
+
+def test_parse_question():
+    assert parse_question("QUESTION: Which city?") == "Which city?"
+    assert parse_question("  QUESTION:  ") == "The agent needs more information."
+    assert parse_question("Paris.") is None
+    assert parse_question(None) is None
+
+
+def test_take_requires_the_same_session():
+    store, _ = _store()
+    store.park("t", "s1", {"step": 1}, [])
+    assert store.take("t", "s2") is None
+    assert store.take("t", "s1").checkpoint == {"step": 1}
+    assert store.take("t", "s1") is None
+    assert store.size_bytes == 0
+
+
+def test_parked_tasks_expire_after_ttl(clock):
+    store, expired = _store(ttl_seconds=60)
+    store.park("old", "s", "checkpoint", [])
+    clock.now += 30
+    store.park("new", "s", "checkpoint", [])
+    clock.now += 31
+    assert store.get("old") is None and store.get("new") is not None
+    assert expired == ["old"] and store.expired_total == 1
+
+
+def test_oldest_tasks_are_dropped_beyond_max_bytes():
+    size = approximate_size("x" * 100) + approximate_size([])
+    store, expired = _store(max_bytes=2 * size + 10)
+    store.park("a", "s", "x" * 100, [])
+    store.park("b", "s", "x" * 100, [])
+    store.park("c", "s", "x" * 100, [])
+    assert expired == ["a"]
+    assert len(store) == 2 and store.size_bytes == 2 * size
+
+
+def test_oldest_tasks_are_dropped_beyond_max_tasks():
+    store, expired = _store(max_tasks=1)
+    store.park("a", "s", "x", [])
+    assert store.park("b", "s", "x", [])
+    assert expired == ["a"]
+
+
+def test_a_checkpoint_larger_than_max_bytes_is_not_parked():
+    store, expired = _store(max_bytes=10)
+    assert not store.park("t", "s", "x" * 11, [])
+    assert len(store) == 0 and store.size_bytes == 0 and not expired
+
+
+def test_reconfigure_with_tighter_bounds_evicts():
+    store, expired = _store()
+    store.park("a", "s", "x", [])
+    store.park("b", "s", "x", [])
+    store.reconfigure(CheckpointStore(max_tasks=1))
+    assert expired == ["a"]
+
+
+def test_resuming_restores_the_task_when_the_run_fails(clock):
+    store, _ = _store(ttl_seconds=60)
+    store.park("t", "s", "checkpoint", [])
+    clock.now += 50
+    with pytest.raises(RuntimeError):
+        with store.resuming("t", "s") as parked:
+            assert parked is not None and len(store) == 0
+            raise RuntimeError("model unavailable")
+    clock.now += 50 # Past the original TTL: the restored task's TTL started over
+    restored = store.get("t")
+    assert restored is not None and restored.checkpoint == "checkpoint"
+    assert store.size_bytes == restored.size_bytes
+
+
+def test_resuming_keeps_the_task_out_after_success_or_a_new_question():
+    store, _ = _store()
+    store.park("t", "s", "checkpoint", [])
+    with store.resuming("t", "s") as parked:
+        assert parked.checkpoint == "checkpoint"
+    assert store.get("t") is None
+
+    store.park("t", "s", "checkpoint", [])
+    with pytest.raises(InputRequired):
+        with store.resuming("t", "s"):
+            raise InputRequired("Which one?") # The agent parks the task anew with its new checkpoint
+    assert store.get("t") is None
+
+
+def test_resuming_without_a_parked_task_yields_none():
+    store, _ = _store()
+    with pytest.raises(RuntimeError):
+        with store.resuming("t", "s") as parked:
+            assert parked is None
+            raise RuntimeError()
+    assert len(store) == 0
+
+
+def test_disabled_store_parks_nothing():
+    store, _ = _store(enabled=False)
+    assert not store.park("t", "s", "checkpoint", [])
+    assert store.take("t", "s") is None
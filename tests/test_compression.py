@@ -0,0 +1,110 @@
+import asyncio
+import zlib
+
+import pytest
+
+from a2a_shared.compression import CompressionMiddleware
+
+
+def _scope(accept_encoding: str = "gzip"):
+    return {"type": "http", "method": "POST", "path": "/", "headers": [(b"accept-encoding", accept_encoding.encode())]}
+
+
+def _run(app, scope):
+    """Runs the middleware around app and returns the messages it sends."""
+    sent = []
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(CompressionMiddleware(app, minimum_size=100)(scope, receive, send))
+    return sent
+
+
+def _response(content_type: bytes, *chunks: bytes):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", content_type)]})
+        for index, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": index < len(chunks) - 1})
+    return app
+
+
+def _headers(message):
+    return {k: v for k, v in message["headers"]}
+
+
+def test_sse_events_are_decodable_as_they_arrive():
+    events = [f'data: {{"jsonrpc": "2.0", "result": {{"id": "task", "n": {i}}}}}\n\n'.encode() for i in range(3)]
+    sent = _run(_response(b"text/event-stream", *events, b""), _scope())
+    assert _headers(sent[0])[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in _headers(sent[0])
+    decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for event, message in zip(events, sent[1:]):
+        # Each chunk is flushed, so it decodes to its event without waiting for the rest of the stream
+        assert decoder.decompress(message["body"]) == event
+        assert message["more_body"]
+    decoder.decompress(sent[-1]["body"])
+    assert decoder.eof and not sent[-1]["more_body"]
+
+
+def test_repeated_sse_envelopes_compress_well():
+    event = b'data: {"jsonrpc": "2.0", "id": "1", "result": {"id": "task-0001", "status": {"state": "working"}, "final": false}}\n\n'
+    sent = _run(_response(b"text/event-stream", *[event] * 20, b""), _scope())
+    later = [len(message["body"]) for message in sent[3:-1]]
+    assert max(later) < len(event) / 3 # Later events reuse the dictionary of earlier ones
+
+
+def test_small_complete_response_passes_through():
+    sent = _run(_response(b"application/json", b'{"ok": true}'), _scope())
+    assert b"content-encoding" not in _headers(sent[0])
+    assert sent[1]["body"] == b'{"ok": true}'
+
+
+def test_large_complete_response_is_compressed_with_length():
+    body = b'{"history": "' + b"x" * 1000 + b'"}'
+    sent = _run(_response(b"application/json", body), _scope())
+    headers = _headers(sent[0])
+    assert headers[b"content-encoding"] == b"gzip"
+    assert int(headers[b"content-length"]) == len(sent[1]["body"])
+    assert zlib.decompress(sent[1]["body"], 16 + zlib.MAX_WBITS) == body
+
+
+def test_client_without_accept_encoding_gets_plain_body():
+    body = b"x" * 1000
+    sent = _run(_response(b"application/json", body), _scope("identity"))
+    assert b"content-encoding" not in _headers(sent[0])
+    assert sent[1]["body"] == body
+
+
+def test_non_compressible_types_pass_through():
+    body = b"\x89PNG" + b"\x00" * 1000
+    sent = _run(_response(b"image/png", body), _scope())
+    assert b"content-encoding" not in _headers(sent[0])
+    assert sent[1]["body"] == body
+
+
+def test_sse_compression_can_be_turned_off():
+    event = b"data: " + b"x" * 200 + b"\n\n"
+    sent = []
+
+    async def scenario():
+        async def send(message):
+            sent.append(message)
+        await CompressionMiddleware(_response(b"text/event-stream", event, b""), sse=False)(_scope(), None, send)
+
+    asyncio.run(scenario())
+    assert b"content-encoding" not in _headers(sent[0])
+    assert sent[1]["body"] == event
+
+
+def test_zstd_sse_events_are_decodable_as_they_arrive():
+    zstandard = pytest.importorskip("zstandard")
+    events = [f"data: {{\"n\": {i}}}\n\n".encode() for i in range(3)]
+    sent = _run(_response(b"text/event-stream", *events, b""), _scope("gzip, zstd"))
+    assert _headers(sent[0])[b"content-encoding"] == b"zstd"
+    decoder = zstandard.ZstdDecompressor().decompressobj()
+    for event, message in zip(events, sent[1:]):
+        assert decoder.decompress(message["body"]) == event
@@ -0,0 +1,131 @@
+import asyncio
+import base64
+import os
+import time
+
+import pytest
+
+from common.types import FileContent, FilePart, Message, TextPart
+
+from a2a_shared.files import FileSpool, SpoolFullError, extract_message_input
+
+
+@pytest.fixture
+def spool(tmp_path) -> FileSpool:
+    return FileSpool(str(tmp_path), public_url="http://agent:8000/", max_bytes=10, max_total_bytes=15)
+
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode()
+
+
+def test_inline_base64_is_written_to_disk(spool):
+    spooled = asyncio.run(spool.save_base64(_b64(b"hello"), name="a.txt", mime_type="text/plain"))
+    assert spooled.path.read_bytes() == b"hello"
+    assert spooled.size == 5 and spool.total_bytes == 5
+    assert spooled.describe().endswith("\nhello")
+
+
+def test_inline_base64_over_max_bytes_is_rejected_unwritten(spool):
+    with pytest.raises(ValueError, match="maximum size"):
+        asyncio.run(spool.save_base64(_b64(b"x" * 11)))
+    assert spool.total_bytes == 0 and not list(spool.dir.iterdir())
+
+
+def test_inline_base64_beyond_the_spool_quota_is_rejected(spool):
+    asyncio.run(spool.save_base64(_b64(b"x" * 10)))
+    with pytest.raises(SpoolFullError):
+        asyncio.run(spool.save_base64(_b64(b"x" * 6)))
+    assert spool.total_bytes == 10 and len(spool) == 1
+
+
+@pytest.mark.parametrize("data", ["abc", "!!!!", "aGVsbG8=aGVs"])
+def test_invalid_base64_is_rejected_and_cleaned_up(spool, data):
+    with pytest.raises(ValueError, match="Invalid base64"):
+        asyncio.run(spool.save_base64(data))
+    assert spool.total_bytes == 0 and not list(spool.dir.iterdir())
+
+
+def test_stream_over_max_bytes_is_rejected(spool):
+    async def chunks():
+        yield b"x" * 6
+        yield b"x" * 6
+
+    with pytest.raises(ValueError, match="maximum size"):
+        asyncio.run(spool.save_stream(chunks()))
+    assert spool.total_bytes == 0 and not list(spool.dir.iterdir())
+
+
+@pytest.mark.parametrize("uri", ["http://169.254.169.254/latest/meta-data", "file:///etc/passwd", "http://agent:8000/files/unknown"])
+def test_foreign_and_unknown_uris_are_not_fetched(spool, uri):
+    with pytest.raises((PermissionError, ValueError, FileNotFoundError)):
+        asyncio.run(spool.fetch_uri(uri))
+
+
+def test_files_of_a_failed_message_are_released(spool):
+    message = Message(role="user", parts=[
+        TextPart(text="see attached"),
+        FilePart(file=FileContent(bytes=_b64(b"first"))),
+        FilePart(file=FileContent(bytes=_b64(b"x" * 11))),
+    ])
+    with pytest.raises(ValueError):
+        asyncio.run(extract_message_input(message, spool))
+    assert len(spool) == 0 and spool.total_bytes == 0
+
+
+def _age(spooled, seconds: float):
+    old = time.time() - seconds
+    os.utime(spooled.path, (old, old))
+
+
+def test_sweep_skips_files_held_by_a_running_task(spool):
+    async def scenario():
+        message = Message(role="user", parts=[FilePart(file=FileContent(bytes=_b64(b"data")))])
+        _, files = await extract_message_input(message, spool)
+        _age(files[0], 120)
+        spool.cleanup_expired(ttl_seconds=60)
+        assert files[0].path.exists() # Still in use
+        spool.release(files)
+        return files[0]
+
+    spooled = asyncio.run(scenario())
+    assert not spooled.path.exists() and len(spool) == 0
+
+
+def test_upload_ttl_counts_from_its_last_use(spool):
+    async def scenario():
+        async def chunks():
+            yield b"upload"
+
+        upload = await spool.save_stream(chunks())
+        upload.transient = False
+        _age(upload, 120)
+        message = Message(role="user", parts=[FilePart(file=FileContent(uri=spool.uri_for(upload.file_id)))])
+        _, files = await extract_message_input(message, spool)
+        spool.release(files)
+        spool.cleanup_expired(ttl_seconds=60)
+        return upload
+
+    upload = asyncio.run(scenario())
+    assert upload.path.exists() and spool.get(upload.file_id) is upload # Released, but taken just now
+    _age(upload, 120)
+    spool.cleanup_expired(ttl_seconds=60)
+    assert spool.get(upload.file_id) is None
+
+
+def test_a_file_used_by_two_tasks_stays_until_both_release_it(spool):
+    async def scenario():
+        async def chunks():
+            yield b"upload"
+
+        upload = await spool.save_stream(chunks())
+        message = Message(role="user", parts=[FilePart(file=FileContent(uri=spool.uri_for(upload.file_id)))])
+        _, first = await extract_message_input(message, spool)
+        _, second = await extract_message_input(message, spool)
+        spool.release(first)
+        assert spool.is_held(upload.file_id) and upload.path.exists()
+        spool.release(second)
+        return upload
+
+    upload = asyncio.run(scenario())
+    assert not spool.is_held(upload.file_id)
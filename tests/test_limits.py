@@ -0,0 +1,95 @@
+import asyncio
+import json
+
+from common.types import FileContent, FilePart, Message, TaskSendParams, TextPart
+
+from a2a_shared.limits import RequestLimits, RequestLimitsMiddleware
+
+
+def _params(*parts) -> TaskSendParams:
+    return TaskSendParams(id="t", message=Message(role="user", parts=list(parts)))
+
+
+def test_check_message_limits_parts_and_part_size():
+    limits = RequestLimits(max_parts=2, max_part_bytes=10)
+    assert limits.check_message(_params(TextPart(text="short"))) is None
+    error = limits.check_message(_params(*[TextPart(text="x")] * 3))
+    assert error.data == {"limit": "max_parts", "max": 2, "actual": 3}
+    error = limits.check_message(_params(TextPart(text="ok"), FilePart(file=FileContent(bytes="A" * 11))))
+    assert error.data["limit"] == "max_part_bytes" and error.data["part"] == 1
+    assert limits.check_message(_params(FilePart(file=FileContent(uri="http://example/big")))) is None # Not inline
+
+
+def test_from_config_can_disable_the_limits():
+    assert RequestLimits.from_config({"enabled": False}) is None
+    assert RequestLimits.from_config({"max_parts": 4}).max_parts == 4
+
+
+def _call(chunks, headers=(), limits=None, method="POST", path="/"):
+    """Runs the middleware with a body sent in chunks; returns (status, body seen by the app, messages received after the body)."""
+    received = []
+    sent = []
+    incoming = [{"type": "http.request", "body": chunk, "more_body": index < len(chunks) - 1} for index, chunk in enumerate(chunks)]
+    incoming.append({"type": "http.disconnect"})
+    pulled = 0
+
+    async def receive():
+        nonlocal pulled
+        pulled += 1
+        return incoming.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    async def app(scope, receive, send):
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        received.append(body)
+        received.append(await receive()) # The disconnect, passed through after the replayed body
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    scope = {"type": "http", "method": method, "path": path, "headers": list(headers)}
+    asyncio.run(RequestLimitsMiddleware(app, limits or RequestLimits(max_body_bytes=10), path="/")(scope, receive, send))
+    return sent[0]["status"], sent, received, pulled
+
+
+def test_body_within_the_limit_is_replayed_to_the_app():
+    status, _, received, _ = _call([b"12345", b"67890"])
+    assert status == 200
+    assert received == [b"1234567890", {"type": "http.disconnect"}]
+
+
+def test_declared_content_length_over_the_limit_is_rejected_unread():
+    status, sent, received, pulled = _call([b"x" * 20], headers=[(b"content-length", b"20")])
+    assert status == 413 and pulled == 0 and not received
+    assert json.loads(sent[1]["body"])["error"]["code"] == -32013
+
+
+def test_chunked_body_is_rejected_once_it_crosses_the_limit():
+    status, _, received, pulled = _call([b"123456", b"789012", b"never read"])
+    assert status == 413 and not received
+    assert pulled == 2
+
+
+def test_other_paths_and_methods_are_not_inspected():
+    assert _call([b"x" * 20], path="/files")[0] == 200
+    assert _call([b"x" * 20], method="PUT")[0] == 200
+
+
+def test_reconfigure_applies_to_the_next_request():
+    limits = RequestLimits(max_body_bytes=10)
+    limits.reconfigure(RequestLimits(max_body_bytes=100))
+    assert _call([b"x" * 20], limits=limits)[0] == 200
+
+
+def test_text_parts_are_measured_in_utf8_bytes():
+    limits = RequestLimits(max_part_bytes=10)
+    assert limits.check_message(_params(TextPart(text="あいう"))) is None # 9 bytes
+    error = limits.check_message(_params(TextPart(text="あいうえ"))) # 4 characters, 12 bytes
+    assert error.data == {"limit": "max_part_bytes", "max": 10, "actual": 12, "part": 0}
+    assert limits.check_message(_params(TextPart(text="ab"))) is None
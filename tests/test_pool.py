@@ -0,0 +1,114 @@
+import asyncio
+
+import httpx
+import pytest
+
+from a2a_shared.pool import ReplicaPool
+
+URLS = ["http://a/", "http://b/", "http://c/"]
+
+
+def test_affinity_key_sticks_to_its_replica():
+    pool = ReplicaPool(URLS)
+    first = pool.pick(["session-1"])
+    assert all(pool.pick(["session-1"]) is first for _ in range(20))
+
+
+def test_new_keys_go_to_the_least_loaded_replica():
+    pool = ReplicaPool(URLS, balancing="least_outstanding")
+    pool.replicas[0].outstanding = 2
+    pool.replicas[1].outstanding = 1
+    assert pool.pick(["new"]).url == "http://c/"
+
+
+def test_affinity_map_is_bounded():
+    pool = ReplicaPool(URLS, max_affinity=2)
+    for key in ("k1", "k2", "k3"):
+        pool.pick([key])
+    assert list(pool._affinity) == ["k2", "k3"]
+
+
+def test_consecutive_failures_eject_the_replica_and_move_its_keys():
+    pool = ReplicaPool(URLS, eject_after_failures=2)
+    replica = pool.pick(["session-1"])
+    pool.record_failure(replica)
+    assert pool.pick(["session-1"]) is replica # One failure is not enough
+    pool.record_failure(replica)
+    moved = pool.pick(["session-1"])
+    assert moved is not replica
+    assert pool.pick(["session-1"]) is moved
+    assert [stat["ejected"] for stat in pool.stats() if stat["url"] == replica.url] == [True]
+
+
+def test_success_resets_the_failure_count():
+    pool = ReplicaPool(URLS, eject_after_failures=2)
+    replica = pool.replicas[0]
+    pool.record_failure(replica)
+    pool.record_success(replica)
+    pool.record_failure(replica)
+    assert replica.failures == 1 and not pool.stats()[0]["ejected"]
+
+
+def test_all_replicas_ejected_still_serves():
+    pool = ReplicaPool(URLS, eject_after_failures=1)
+    for replica in pool.replicas:
+        pool.record_failure(replica)
+    assert pool.pick() in pool.replicas
+
+
+def test_exclude_skips_the_failed_replica():
+    pool = ReplicaPool(URLS)
+    first = pool.pick(["session-1"])
+    retry = pool.pick(["session-1"], exclude=[first])
+    assert retry is not first
+    assert pool.pick(["session-1"]) is retry # The key moved with the retry
+
+
+def test_acquire_counts_transport_errors_and_5xx_but_not_other_errors():
+    class ServerError(Exception):
+        status_code = 503
+
+    async def scenario():
+        pool = ReplicaPool(["http://a/"], eject_after_failures=10)
+        replica = pool.replicas[0]
+        for error in (httpx.ConnectError("down"), ServerError(), ValueError("bad request")):
+            with pytest.raises(type(error)):
+                async with pool.acquire() as acquired:
+                    assert acquired.outstanding == 1
+                    raise error
+        return replica
+
+    replica = asyncio.run(scenario())
+    assert replica.failures == 2
+    assert replica.outstanding == 0 and replica.requests == 3
+
+
+def test_health_check_ejects_unhealthy_replicas():
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200 if request.url.host == "a" else 503)
+
+    async def scenario():
+        pool = ReplicaPool(URLS)
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            await pool.check_health(client)
+        return pool
+
+    pool = asyncio.run(scenario())
+    assert [stat["ejected"] for stat in pool.stats()] == [False, True, True]
+    assert pool.pick(["session-1"]).url == "http://a/"
+
+
+def test_reconfigure_keeps_state_of_kept_replicas():
+    pool = ReplicaPool(URLS[:2], eject_after_failures=1)
+    kept = pool.pick(["on-kept"], exclude=[pool.replicas[1]])
+    pool.pick(["on-removed"], exclude=[kept])
+    pool.record_failure(kept)
+    pool.reconfigure(ReplicaPool([kept.url, "http://c/"]))
+    assert pool.urls == [kept.url, "http://c/"]
+    assert pool.replicas[0] is kept and kept.failures == 1
+    assert list(pool._affinity) == ["on-kept"] # Keys of the removed replica are rebound on their next request
+
+
+def test_rejects_an_empty_pool():
+    with pytest.raises(ValueError):
+        ReplicaPool([])
@@ -0,0 +1,153 @@
+import asyncio
+
+from common.types import Artifact, Task, TaskState, TaskStatus, TextPart
+
+from a2a_shared.task_store import TaskStore
+
+
+def _task(task_id: str, state: TaskState = TaskState.SUBMITTED) -> Task:
+    return Task(id=task_id, sessionId="s", status=TaskStatus(state=state))
+
+
+def test_evicts_oldest_finished_tasks_beyond_max_tasks():
+    store = TaskStore(max_tasks=2)
+    store.put(_task("running", TaskState.WORKING))
+    store.put(_task("old", TaskState.COMPLETED))
+    store.put(_task("new", TaskState.COMPLETED))
+    assert store.get("old") is None
+    assert store.get("running") is not None # In-flight tasks are never dropped
+    assert store.get("new") is not None
+
+
+def test_finishing_a_task_evicts_without_a_put():
+    store = TaskStore(max_tasks=1)
+    store.put(_task("a", TaskState.WORKING))
+    store.put(_task("b", TaskState.WORKING))
+    assert len(store) == 2 # In-flight tasks may exceed the bound
+    store.update_status("a", TaskStatus(state=TaskState.COMPLETED))
+    assert store.get("a") is None
+    assert store.get("b") is not None
+
+
+def test_evicts_finished_tasks_after_ttl():
+    store = TaskStore(ttl_seconds=0)
+    store.put(_task("done", TaskState.COMPLETED))
+    store.put(_task("running", TaskState.WORKING))
+    assert store.get("done") is None
+    assert store.get("running") is not None
+
+
+def test_append_artifacts_merge_into_one():
+    store = TaskStore()
+    store.put(_task("t", TaskState.WORKING))
+    store.add_artifact("t", Artifact(parts=[TextPart(text="a")], index=0))
+    store.add_artifact("t", Artifact(parts=[TextPart(text="b")], index=0, append=True, lastChunk=True))
+    (artifact,) = store.get("t").artifacts
+    assert [part.text for part in artifact.parts] == ["a", "b"]
+    assert artifact.lastChunk
+
+
+def test_subscriber_gets_updates_until_final():
+    async def scenario():
+        store = TaskStore()
+        store.put(_task("t", TaskState.WORKING))
+        events = []
+
+        async def consume():
+            async for event in store.subscribe("t"):
+                events.append(event)
+
+        consumer = asyncio.create_task(consume())
+        await asyncio.sleep(0)
+        store.add_artifact("t", Artifact(parts=[TextPart(text="result")], index=0))
+        store.update_status("t", TaskStatus(state=TaskState.COMPLETED))
+        await asyncio.wait_for(consumer, 1)
+        return store, events
+
+    store, events = asyncio.run(scenario())
+    assert [type(event).__name__ for event in events] == ["TaskStatusUpdateEvent", "TaskArtifactUpdateEvent", "TaskStatusUpdateEvent"]
+    assert events[-1].final
+    assert not store._subscribers
+
+
+def test_evicting_a_task_waiting_for_input_ends_its_subscriptions():
+    async def scenario():
+        store = TaskStore(max_tasks=1)
+        store.put(_task("t", TaskState.WORKING))
+
+        async def consume():
+            return [event async for event in store.subscribe("t")]
+
+        consumer = asyncio.create_task(consume())
+        await asyncio.sleep(0)
+        store.update_status("t", TaskStatus(state=TaskState.INPUT_REQUIRED))
+        first = await asyncio.wait_for(consumer, 1) # Input-required ends the stream like a final state
+        store.put(_task("other", TaskState.COMPLETED)) # Evicts t, the oldest task that is not running
+        return store, first
+
+    store, first = asyncio.run(scenario())
+    assert first[-1].final and first[-1].status.state == TaskState.INPUT_REQUIRED
+    assert store.get("t") is None
+    assert not store._subscribers
+
+
+def test_dropping_a_running_subscription_ends_it():
+    async def scenario():
+        store = TaskStore()
+        store.put(_task("t", TaskState.WORKING))
+
+        async def consume():
+            return [event async for event in store.subscribe("t")]
+
+        consumer = asyncio.create_task(consume())
+        await asyncio.sleep(0)
+        store._drop("t")
+        return await asyncio.wait_for(consumer, 1)
+
+    events = asyncio.run(scenario())
+    assert len(events) == 1 # The current status, then the subscription ended with the drop
+
+
+def test_start_rejects_a_duplicate_run():
+    async def scenario():
+        store = TaskStore()
+        gate = asyncio.Event()
+
+        async def run():
+            await gate.wait()
+
+        assert store.start(_task("t"), run())
+        duplicate = run()
+        assert not store.start(_task("t"), duplicate)
+        assert duplicate.cr_frame is None # Closed without running
+        assert store.is_running("t")
+        gate.set()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert not store.is_running("t")
+        assert store.start(_task("t"), run()) # The id can run again once the earlier run ended
+        gate.set()
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+
+
+def test_cancel_stops_a_background_run():
+    async def scenario():
+        store = TaskStore()
+
+        async def run():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                store.update_status("t", TaskStatus(state=TaskState.CANCELED))
+                raise
+
+        store.start(_task("t"), run())
+        await asyncio.sleep(0)
+        assert await store.cancel("t")
+        assert not await store.cancel("t") # No longer running
+        return store
+
+    store = asyncio.run(scenario())
+    assert store.get("t").status.state == TaskState.CANCELED
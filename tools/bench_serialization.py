@@ -0,0 +1,83 @@
+"""Microbenchmark: stock JSON-RPC (de)serialization path vs the fast path in a2a_shared.
+
+Run from the repository root with the A2A common package on the path:
+
+    PYTHONPATH=third_party/google_a2a/samples/python:. python tools/bench_serialization.py [--number N]
+
+Each case is timed with timeit (best of 5) and reported in microseconds per operation.
+"""
+import argparse
+import json
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "a2a_streamlit_app"))
+
+from starlette.responses import JSONResponse, Response
+
+from common.types import (
+    A2ARequest, AgentCapabilities, AgentCard, AgentSkill, Artifact, Message,
+    SendTaskRequest, SendTaskResponse, Task, TaskSendParams, TaskState, TaskStatus, TextPart,
+)
+from a2a_client_utils import get_agent_card_model
+
+
+def _sample_request(text_size: int) -> bytes:
+    params = TaskSendParams(id="task-1", sessionId="session-1", message=Message(role="user", parts=[TextPart(text="x" * text_size)]))
+    return SendTaskRequest(id="req-1", params=params).model_dump_json().encode()
+
+
+def _sample_response(text_size: int) -> SendTaskResponse:
+    task = Task(
+        id="task-1", sessionId="session-1",
+        status=TaskStatus(state=TaskState.COMPLETED),
+        artifacts=[Artifact(name="response", parts=[TextPart(text="y" * text_size)])],
+    )
+    return SendTaskResponse(id="req-1", result=task)
+
+
+def _sample_card() -> dict:
+    return AgentCard(
+        name="bench-agent", description="Benchmark agent", url="http://localhost:8001/", version="0.1.0",
+        capabilities=AgentCapabilities(streaming=True),
+        defaultInputModes=["text", "file"],
+        skills=[AgentSkill(id=f"skill-{i}", name=f"Skill {i}", description="A skill") for i in range(5)],
+    ).model_dump(mode="json")
+
+
+def run(number: int):
+    cases = []
+    for size in (64, 4096):
+        body = _sample_request(size)
+        response = _sample_response(size)
+        response_bytes = response.model_dump_json(exclude_none=True).encode()
+        cases += [
+            (f"parse request ({size} B text): json.loads + validate_python", lambda b=body: A2ARequest.validate_python(json.loads(b))),
+            (f"parse request ({size} B text): validate_json", lambda b=body: A2ARequest.validate_json(b)),
+            (f"render response ({size} B text): JSONResponse(model_dump)", lambda r=response: JSONResponse(r.model_dump(exclude_none=True))),
+            (f"render response ({size} B text): Response(model_dump_json)", lambda r=response: Response(r.model_dump_json(exclude_none=True), media_type="application/json")),
+            (f"client parse ({size} B text): SendTaskResponse(**json.loads)", lambda b=response_bytes: SendTaskResponse(**json.loads(b))),
+            (f"client parse ({size} B text): model_validate_json", lambda b=response_bytes: SendTaskResponse.model_validate_json(b)),
+        ]
+    card = _sample_card()
+    get_agent_card_model(card)
+    cases += [
+        ("agent card: AgentCard.model_validate", lambda: AgentCard.model_validate(card)),
+        ("agent card: cached get_agent_card_model", lambda: get_agent_card_model(card)),
+    ]
+
+    width = max(len(name) for name, _ in cases)
+    for name, fn in cases:
+        best = min(timeit.repeat(fn, number=number, repeat=5))
+        print(f"{name:<{width}}  {best / number * 1e6:8.2f} us/op")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=2000, help="Operations per timing run")
+    run(parser.parse_args().number)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Import-time profile of an agent's main module (python -X importtime), summarized.
+
+Run from the repository root with the agent's dependencies installed:
+
+    PYTHONPATH=third_party/google_a2a/samples/python:. python tools/import_profile.py crewai_agent [--top N]
+
+Imports `main` from the given agent directory in a fresh interpreter and reports the total
+import time and the top-level packages / individual modules with the largest cumulative time.
+"""
+import argparse
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+
+def profile(agent_dir: Path, module: str) -> List[Tuple[int, int, str]]:
+    """Returns (self_us, cumulative_us, module) for every import made while importing module."""
+    # The child runs inside agent_dir, so relative PYTHONPATH entries are resolved against the caller's cwd first
+    pythonpath = [str(Path(p).resolve()) for p in os.environ.get("PYTHONPATH", "").split(os.pathsep) if p]
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=agent_dir, capture_output=True, text=True,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(pythonpath)},
+    )
+    if result.returncode != 0:
+        sys.exit(f"import {module} failed in {agent_dir}:\n{result.stderr}")
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(self_us), int(cumulative_us), name.rstrip()))
+    return rows
+
+
+def report(rows: List[Tuple[int, int, str]], module: str, top: int):
+    by_package: Dict[str, int] = defaultdict(int)
+    for self_us, _, name in rows:
+        by_package[name.strip().split(".")[0]] += self_us
+    target = next((cumulative for _, cumulative, name in rows if name.strip() == module), sum(r[0] for r in rows))
+    print(f"import {module}: {target / 1e6:.2f}s total, {len(rows)} modules\n")
+
+    print(f"Top {top} top-level packages by import time:")
+    for package, us in sorted(by_package.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {us / 1e3:10.1f} ms  {package}")
+
+    print(f"\nTop {top} modules by cumulative import time:")
+    for _, cumulative_us, name in sorted(rows, key=lambda row: -row[1])[:top]:
+        print(f"  {cumulative_us / 1e3:10.1f} ms  {name.strip()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("agent_dir", type=Path, help="Agent directory containing the module, e.g. crewai_agent")
+    parser.add_argument("--module", default="main", help="Module to import (default: main)")
+    parser.add_argument("--top", type=int, default=15, help="Rows per table")
+    args = parser.parse_args()
+    report(profile(args.agent_dir, args.module), args.module, args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""Replays a recorded JSON-RPC traffic log against an agent and reports latencies per method.
+
+Record traffic by enabling the `recording` section of an agent's config, then run from the
+repository root:
+
+    python tools/replay.py traffic.jsonl.gz --target http://localhost:8001/ [--speed 2] [--output new.jsonl] [--baseline old.jsonl]
+
+Requests are issued open-loop at their recorded offsets divided by --speed (2 = twice the
+original rate), so a slow build does not slow down the arrivals. Task and session ids get a
+per-run suffix (consistent within the run, so tasks/get still finds its task) unless --keep-ids
+is given. Streaming requests are read to the end of the SSE stream.
+
+Each run prints p50/p90/p99/max latency per method next to the latencies recorded in production.
+--output saves the per-request results; pass that file as --baseline on a later run (e.g. against
+another build) to print the latency deltas between the two.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from a2a_shared.recording import read_records
+
+PERCENTILES = (50, 90, 99)
+
+
+def _rewrite_ids(request: Dict[str, Any], suffix: str) -> Dict[str, Any]:
+    params = request.get("params")
+    if isinstance(params, dict):
+        for key in ("id", "sessionId"):
+            if isinstance(params.get(key), str):
+                params[key] = f"{params[key]}-{suffix}"
+    return request
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    values = sorted(latencies)
+    if not values:
+        return {}
+    summary = {f"p{pct}": _percentile(values, pct) for pct in PERCENTILES}
+    summary["max"] = values[-1]
+    summary["mean"] = statistics.fmean(values)
+    return summary
+
+
+async def replay_one(client: httpx.AsyncClient, target: str, record: Dict[str, Any]) -> Dict[str, Any]:
+    request = record["request"]
+    headers = dict(record.get("headers") or {})
+    headers.setdefault("content-type", "application/json")
+    body = json.dumps(request, separators=(",", ":")).encode()
+    result = {"method": request.get("method"), "id": (request.get("params") or {}).get("id"), "recorded_ms": record.get("latency_ms")}
+    started = time.perf_counter()
+    first_byte = None
+    try:
+        async with client.stream("POST", target, content=body, headers=headers) as response:
+            chunks = []
+            async for chunk in response.aiter_bytes():
+                if first_byte is None:
+                    first_byte = time.perf_counter()
+                if not record.get("stream"):
+                    chunks.append(chunk)
+        result["status"] = response.status_code
+        ok = response.status_code == 200
+        if ok and chunks:
+            try:
+                ok = "error" not in json.loads(b"".join(chunks))
+            except ValueError:
+                ok = False
+        result["ok"] = ok
+    except httpx.HTTPError as e:
+        result.update(status=None, ok=False, error=str(e))
+    finished = time.perf_counter()
+    result["latency_ms"] = round((finished - started) * 1000, 3)
+    result["ttfb_ms"] = round((first_byte - started) * 1000, 3) if first_byte else None
+    return result
+
+
+async def replay(records: List[Dict[str, Any]], target: str, speed: float, max_concurrency: int, suffix: Optional[str]) -> List[Dict[str, Any]]:
+    semaphore = asyncio.Semaphore(max_concurrency)
+    origin = records[0]["t"] if records else 0
+    lags = []
+
+    async with httpx.AsyncClient(timeout=None, limits=httpx.Limits(max_connections=max_concurrency)) as client:
+        started = time.perf_counter()
+
+        async def scheduled(record):
+            due = started + (record["t"] - origin) / speed
+            await asyncio.sleep(max(0.0, due - time.perf_counter()))
+            async with semaphore:
+                lags.append(time.perf_counter() - due)
+                return await replay_one(client, target, record)
+
+        if suffix:
+            records = [{**record, "request": _rewrite_ids(record["request"], suffix)} for record in records]
+        results = await asyncio.gather(*(scheduled(record) for record in records))
+    if lags:
+        print(f"Replayed {len(results)} requests in {time.perf_counter() - started:.1f}s; "
+              f"issue lag p99 {_percentile(sorted(lags), 99) * 1000:.1f} ms (high values mean the replay client itself is saturated)\n")
+    return results
+
+
+def _by_method(results: List[Dict[str, Any]], key: str) -> Dict[str, List[float]]:
+    grouped: Dict[str, List[float]] = defaultdict(list)
+    for result in results:
+        if result.get(key) is not None and result.get("ok", True):
+            grouped[result["method"]].append(result[key])
+    return grouped
+
+
+def report(results: List[Dict[str, Any]], baseline: Optional[List[Dict[str, Any]]]):
+    replayed = _by_method(results, "latency_ms")
+    recorded = _by_method(results, "recorded_ms")
+    previous = _by_method(baseline, "latency_ms") if baseline else {}
+    errors: Dict[str, int] = defaultdict(int)
+    counts: Dict[str, int] = defaultdict(int)
+    for result in results:
+        counts[result["method"]] += 1
+        errors[result["method"]] += not result["ok"]
+
+    columns = [f"p{pct}" for pct in PERCENTILES] + ["max"]
+    print(f"{'method':24} {'n':>6} {'err':>5}  {'latency ms':14} " + " ".join(f"{c:>9}" for c in columns))
+    for method in sorted(counts):
+        rows = [("replay", summarize(replayed.get(method, [])))]
+        rows.append(("recorded", summarize(recorded.get(method, []))))
+        if baseline:
+            rows.append(("baseline", summarize(previous.get(method, []))))
+        for index, (label, summary) in enumerate(rows):
+            head = f"{method:24} {counts[method]:>6} {errors[method]:>5}" if index == 0 else " " * 37
+            print(f"{head}  {label:14} " + " ".join(f"{summary.get(c, float('nan')):>9.1f}" for c in columns))
+        if baseline:
+            current, old = rows[0][1], rows[2][1]
+            deltas = []
+            for c in columns:
+                if c in current and c in old and old[c]:
+                    deltas.append(f"{(current[c] - old[c]) / old[c] * 100:>+8.1f}%")
+                else:
+                    deltas.append(f"{'-':>9}")
+            print(" " * 37 + f"  {'delta':14} " + " ".join(deltas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("log", help="Traffic log written by the recording middleware (.jsonl or .jsonl.gz)")
+    parser.add_argument("--target", required=True, help="JSON-RPC endpoint of the agent, e.g. http://localhost:8001/")
+    parser.add_argument("--speed", type=float, default=1.0, help="Pacing multiplier: 1 = recorded pacing, 2 = twice as fast, 0 = all at once")
+    parser.add_argument("--limit", type=int, default=None, help="Replay only the first N records")
+    parser.add_argument("--max-concurrency", type=int, default=256, help="Cap on requests in flight")
+    parser.add_argument("--keep-ids", action="store_true", help="Send the recorded task/session ids unchanged")
+    parser.add_argument("--output", type=Path, help="Write the per-request results here (JSONL)")
+    parser.add_argument("--baseline", type=Path, help="Results of an earlier run (--output) to compare against")
+    args = parser.parse_args()
+
+    records = [record for record in read_records(args.log) if record.get("request")]
+    records.sort(key=lambda record: record["t"])
+    if args.limit is not None:
+        records = records[:args.limit]
+    if not records:
+        sys.exit(f"No replayable records in {args.log}")
+    speed = args.speed if args.speed > 0 else float("inf")
+    suffix = None if args.keep_ids else f"r{uuid.uuid4().hex[:8]}"
+
+    results = asyncio.run(replay(records, args.target, speed, args.max_concurrency, suffix))
+    if args.output:
+        with args.output.open("w", encoding="utf-8") as output:
+            for result in results:
+                output.write(json.dumps(result) + "\n")
+    baseline = None
+    if args.baseline:
+        with args.baseline.open(encoding="utf-8") as lines:
+            baseline = [json.loads(line) for line in lines if line.strip()]
+    report(results, baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""Soak test: sustained load against an agent while watching its resources for leaks.
+
+Run from the repository root against a running agent (its profiling admin endpoints enabled, which needs an admin token):
+
+    python tools/soak.py --target http://localhost:8002/ --admin-token <token> --duration 1800 --rate 5 [--traffic traffic.jsonl.gz] [--tracemalloc]
+
+Load is open-loop at --rate requests per second: a mix of blocking tasks/send, tasks/sendSubscribe
+and non-blocking tasks/send followed by tasks/get polling (--mix), or the requests of a recorded
+traffic log (tools/replay.py format) in a loop. GET /admin/resources is sampled every
+--sample-interval seconds. The sample taken after --warmup seconds is the baseline; after the
+load stops and the in-flight requests finish (plus --settle seconds), the final sample is
+compared against it and the test fails (exit status 1) when a growth exceeds its threshold:
+RSS (absolute, and the least-squares slope over the samples after warm-up for runs of at least
+five minutes), open file descriptors, Python and OS threads, asyncio tasks and gc-tracked objects.
+
+With --tracemalloc the agent traces allocations from the start, takes its baseline snapshot at
+the end of the warm-up and the source lines that grew the most are printed at the end.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from a2a_shared.recording import read_records
+
+_WORDS = "agent task message artifact stream session crew result status request response context queue worker".split()
+TERMINAL_STATES = {"completed", "canceled", "failed", "input-required", "unknown"}
+MIN_SLOPE_WINDOW = 300 # Seconds of post-warm-up samples needed before the RSS slope is judged
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, round(pct / 100 * len(values)) - 1))] if values else float("nan")
+
+
+def _slope_per_hour(points: List[tuple]) -> float:
+    """Least-squares slope of (seconds, value) points, per hour."""
+    n = len(points)
+    mean_t = sum(t for t, _ in points) / n
+    mean_v = sum(v for _, v in points) / n
+    var = sum((t - mean_t) ** 2 for t, _ in points)
+    return sum((t - mean_t) * (v - mean_v) for t, v in points) / var * 3600 if var else 0.0
+
+
+class LoadGenerator:
+    """Issues the soak load and keeps per-kind counts, errors and latencies."""
+
+    def __init__(self, client: httpx.AsyncClient, target: str, mix: Dict[str, float], sessions: int, words: tuple,
+                 traffic: Optional[List[Dict[str, Any]]], deadline_ms: Optional[int]):
+        self.client = client
+        self.target = target
+        self.kinds = list(mix)
+        self.weights = [mix[kind] for kind in self.kinds]
+        self.sessions = [f"soak-{uuid.uuid4().hex[:6]}-{n}" for n in range(sessions)]
+        self.words = words
+        self.traffic = traffic
+        self.deadline_ms = deadline_ms
+        self.sequence = 0
+        self.counts: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+
+    def _params(self, blocking: bool = True) -> Dict[str, Any]:
+        self.sequence += 1
+        text = " ".join(random.choices(_WORDS, k=random.randint(*self.words)))
+        metadata = {"priority": "batch"}
+        if not blocking:
+            metadata["blocking"] = False
+        if self.deadline_ms:
+            metadata["timeout_ms"] = self.deadline_ms
+        return {"id": f"soak-task-{self.sequence}", "sessionId": random.choice(self.sessions),
+                "message": {"role": "user", "parts": [{"type": "text", "text": text}]}, "metadata": metadata}
+
+    def _next_request(self) -> tuple:
+        if self.traffic:
+            record = self.traffic[self.sequence % len(self.traffic)]
+            self.sequence += 1
+            request = json.loads(json.dumps(record["request"]))
+            params = request.get("params") or {}
+            for key in ("id", "sessionId"): # Same suffix per pass over the log, so tasks/get still finds its task
+                if isinstance(params.get(key), str):
+                    params[key] = f"{params[key]}-soak{self.sequence // len(self.traffic)}"
+            return request.get("method", "replay"), request, bool(record.get("stream"))
+        kind = random.choices(self.kinds, self.weights)[0]
+        if kind == "stream":
+            return kind, {"jsonrpc": "2.0", "id": self.sequence, "method": "tasks/sendSubscribe", "params": self._params()}, True
+        blocking = kind != "nonblocking"
+        return kind, {"jsonrpc": "2.0", "id": self.sequence, "method": "tasks/send", "params": self._params(blocking)}, False
+
+    async def _post(self, request: Dict[str, Any], stream: bool) -> Optional[Dict[str, Any]]:
+        """POSTs the request; returns the JSON-RPC response (None for streams) or raises on errors."""
+        if stream:
+            async with self.client.stream("POST", self.target, json=request) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if line.startswith("data:") and '"error"' in line and json.loads(line[5:]).get("error"):
+                        raise RuntimeError(f"JSON-RPC error {json.loads(line[5:])['error'].get('code')}")
+            return None
+        response = await self.client.post(self.target, json=request)
+        response.raise_for_status()
+        body = response.json()
+        if body.get("error"):
+            raise RuntimeError(f"JSON-RPC error {body['error'].get('code')}")
+        return body
+
+    async def run_one(self):
+        kind, request, stream = self._next_request()
+        started = time.perf_counter()
+        try:
+            body = await self._post(request, stream)
+            if kind == "nonblocking":
+                task_id = request["params"]["id"]
+                for _ in range(240): # Poll for up to 2 minutes
+                    state = (((body or {}).get("result") or {}).get("status") or {}).get("state")
+                    if state in TERMINAL_STATES:
+                        break
+                    await asyncio.sleep(0.5)
+                    body = await self._post({"jsonrpc": "2.0", "id": task_id, "method": "tasks/get", "params": {"id": task_id, "historyLength": 0}}, False)
+            self.latencies[kind].append(time.perf_counter() - started)
+        except (httpx.HTTPError, RuntimeError, ValueError) as e:
+            self.errors[f"{kind}: {type(e).__name__ if isinstance(e, httpx.HTTPError) else e}"] += 1
+        finally:
+            self.counts[kind] += 1
+
+
+async def _admin(client: httpx.AsyncClient, base: str, method: str, path: str, **kwargs) -> Dict[str, Any]:
+    response = await client.request(method, base + path, **kwargs)
+    response.raise_for_status()
+    return response.json()
+
+
+def _describe(sample: Dict[str, Any]) -> str:
+    return (f"rss {sample['rss_bytes'] / 2**20:7.1f} MiB  fds {sample['open_fds']:>4}  threads {sample['threads']:>3}/{sample['os_threads']}  "
+            f"tasks {sample['asyncio_tasks']:>4}  objects {sample['gc_objects']:>8}  {json.dumps(sample.get('gauges', {}))}")
+
+
+def check(baseline: Dict[str, Any], final: Dict[str, Any], samples: List[tuple], args) -> List[str]:
+    """Returns the threshold violations between the baseline and final samples."""
+    failures = []
+    rss_growth = (final["rss_bytes"] - baseline["rss_bytes"]) / 2**20
+    if rss_growth > args.max_rss_growth_mb:
+        failures.append(f"RSS grew {rss_growth:.1f} MiB (max {args.max_rss_growth_mb})")
+    window = [(t, s["rss_bytes"] / 2**20) for t, s in samples if t >= args.warmup]
+    if len(window) >= 3 and window[-1][0] - window[0][0] >= MIN_SLOPE_WINDOW:
+        slope = _slope_per_hour(window)
+        print(f"RSS slope after warm-up: {slope:+.1f} MiB/h")
+        if slope > args.max_rss_slope_mb_per_hour:
+            failures.append(f"RSS grows {slope:.1f} MiB/h (max {args.max_rss_slope_mb_per_hour})")
+    for key, limit in (("open_fds", args.max_fd_growth), ("threads", args.max_thread_growth),
+                       ("os_threads", args.max_thread_growth), ("asyncio_tasks", args.max_task_growth)):
+        if final.get(key) is not None and baseline.get(key) is not None and final[key] - baseline[key] > limit:
+            failures.append(f"{key} grew from {baseline[key]} to {final[key]} (max +{limit})")
+    objects_growth = (final["gc_objects"] - baseline["gc_objects"]) / max(baseline["gc_objects"], 1)
+    if objects_growth > args.max_objects_growth:
+        failures.append(f"gc objects grew {objects_growth:.0%} (max {args.max_objects_growth:.0%})")
+    return failures
+
+
+async def soak(args) -> int:
+    base = args.target.rstrip("/")
+    headers = {"Authorization": f"Bearer {args.admin_token}"} if args.admin_token else {}
+    mix = {kind: float(weight) for kind, weight in (item.split("=") for item in args.mix.split(","))}
+    traffic = [record for record in read_records(args.traffic) if record.get("request")] if args.traffic else None
+    samples: List[tuple] = []
+    output = args.output.open("w", encoding="utf-8") if args.output else None
+
+    limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+    async with httpx.AsyncClient(timeout=args.request_timeout, limits=limits) as client, \
+            httpx.AsyncClient(timeout=60, headers=headers) as admin:
+        load = LoadGenerator(client, args.target, mix, args.sessions, (args.min_words, args.max_words), traffic, args.deadline_ms)
+        if args.tracemalloc:
+            await _admin(admin, base, "POST", "/admin/resources/tracemalloc", params={"action": "start"})
+        first = await _admin(admin, base, "GET", "/admin/resources")
+        print(f"{'start':>8}  {_describe(first)}")
+
+        in_flight = set()
+        dropped = 0
+        started = time.monotonic()
+        baseline: Optional[Dict[str, Any]] = None
+        next_sample = started + args.sample_interval
+        next_request = started
+        while (now := time.monotonic()) < started + args.duration:
+            if now >= next_request:
+                next_request += 1 / args.rate
+                if len(in_flight) >= args.max_in_flight:
+                    dropped += 1 # The agent is not keeping up; do not pile up client-side work
+                else:
+                    task = asyncio.create_task(load.run_one())
+                    in_flight.add(task)
+                    task.add_done_callback(in_flight.discard)
+            if now >= next_sample:
+                next_sample += args.sample_interval
+                sample = await _admin(admin, base, "GET", "/admin/resources")
+                elapsed = now - started
+                samples.append((elapsed, sample))
+                if output:
+                    output.write(json.dumps({"elapsed": round(elapsed, 1), **sample}) + "\n")
+                done = sum(load.counts.values())
+                print(f"{elapsed:7.0f}s  {_describe(sample)}  requests {done} errors {sum(load.errors.values())} in flight {len(in_flight)}")
+                if baseline is None and elapsed >= args.warmup:
+                    baseline = sample
+                    if args.tracemalloc:
+                        await _admin(admin, base, "POST", "/admin/resources/tracemalloc", params={"action": "baseline"})
+                    print(f"{'':>8}  baseline taken after warm-up")
+            await asyncio.sleep(max(0.0, min(next_request, next_sample) - time.monotonic()))
+
+        print(f"Load stopped; waiting for {len(in_flight)} in-flight requests and {args.settle}s of idle")
+        if in_flight:
+            await asyncio.wait(in_flight)
+        await asyncio.sleep(args.settle)
+        final = await _admin(admin, base, "GET", "/admin/resources", params={"top": args.top})
+        print(f"{'final':>8}  {_describe(final)}")
+        if output:
+            output.write(json.dumps({"elapsed": round(time.monotonic() - started, 1), **final}) + "\n")
+            output.close()
+        if args.tracemalloc:
+            print("\nTop allocation growth since the baseline:")
+            for stat in final.get("tracemalloc", {}).get("top", []):
+                print(f"  {stat.get('size_diff_bytes', stat['size_bytes']) / 1024:+10.1f} KiB {stat.get('count_diff', stat['count']):+8}  {stat['location']}")
+            await _admin(admin, base, "POST", "/admin/resources/tracemalloc", params={"action": "stop"})
+
+    print(f"\n{'kind':14} {'requests':>9} {'p50 s':>8} {'p99 s':>8}")
+    for kind, count in sorted(load.counts.items()):
+        print(f"{kind:14} {count:>9} {_percentile(load.latencies[kind], 50):>8.2f} {_percentile(load.latencies[kind], 99):>8.2f}")
+    for error, count in load.errors.most_common(10):
+        print(f"  error x{count}: {error}")
+    if dropped:
+        print(f"  {dropped} requests not sent: --max-in-flight {args.max_in_flight} reached")
+
+    if baseline is None:
+        print("\nFAIL: the run ended before the warm-up did; no baseline to compare against")
+        return 1
+    failures = check(baseline, final, samples, args)
+    if failures:
+        print("\nFAIL:\n" + "\n".join(f"  {failure}" for failure in failures))
+        return 1
+    print("\nPASS: resources stayed within the thresholds")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", required=True, help="Agent base URL (JSON-RPC endpoint and /admin/resources), e.g. http://localhost:8002/")
+    parser.add_argument("--duration", type=float, default=1800, help="Seconds of load")
+    parser.add_argument("--rate", type=float, default=5, help="Requests started per second")
+    parser.add_argument("--mix", default="send=5,stream=4,nonblocking=1", help="Relative weights of send, stream and nonblocking requests")
+    parser.add_argument("--traffic", help="Replay this recorded traffic log in a loop instead of the synthetic mix")
+    parser.add_argument("--sessions", type=int, default=16, help="Distinct sessionIds used by the synthetic load")
+    parser.add_argument("--min-words", type=int, default=5)
+    parser.add_argument("--max-words", type=int, default=200)
+    parser.add_argument("--deadline-ms", type=int, default=None, help="metadata.timeout_ms of each synthetic request")
+    parser.add_argument("--request-timeout", type=float, default=300)
+    parser.add_argument("--max-in-flight", type=int, default=64)
+    parser.add_argument("--sample-interval", type=float, default=10)
+    parser.add_argument("--warmup", type=float, default=120, help="Seconds before the baseline sample")
+    parser.add_argument("--settle", type=float, default=10, help="Idle seconds before the final sample")
+    parser.add_argument("--tracemalloc", action="store_true", help="Trace allocations on the agent and print the top growth")
+    parser.add_argument("--top", type=int, default=15, help="Allocation lines to print with --tracemalloc")
+    parser.add_argument("--admin-token", help="profiling.admin_token of the agent")
+    parser.add_argument("--output", type=Path, help="Write every resource sample here (JSONL)")
+    parser.add_argument("--max-rss-growth-mb", type=float, default=64)
+    parser.add_argument("--max-rss-slope-mb-per-hour", type=float, default=32)
+    parser.add_argument("--max-fd-growth", type=int, default=16)
+    parser.add_argument("--max-thread-growth", type=int, default=4)
+    parser.add_argument("--max-task-growth", type=int, default=16)
+    parser.add_argument("--max-objects-growth", type=float, default=0.25, help="Fraction")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(soak(args)))
+
+
+if __name__ == "__main__":
+    main()